@@ -1,5 +1,11 @@
+import hashlib
+import heapq
 import re
-from collections import Counter
+import time
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from operator import itemgetter
 
 # ============================================================================
 # DOMAIN-SPECIFIC REQUIRED SKILLS MAPPING
@@ -53,6 +59,143 @@ DOMAIN_REQUIRED_SKILLS = {
 }
 
 
+# ============================================================================
+# SKILL ALIASES / SYNONYMS
+# ============================================================================
+# Surface forms students actually write, mapped to the canonical skill name
+# used in DOMAIN_REQUIRED_SKILLS. Every form must start with a letter or digit
+# and may not be the canonical name of a different skill.
+
+SKILL_ALIASES = {
+    "Machine Learning": ["ML"],
+    "Deep Learning": ["DL"],
+    "NLP": ["Natural Language Processing"],
+    "Scikit-learn": ["sklearn", "scikit learn", "scikitlearn"],
+    "Python": ["Python3"],
+    "JavaScript": ["JS", "ECMAScript", "ES6"],
+    "Node.js": ["NodeJS", "Node JS"],
+    "React": ["ReactJS", "React.js", "React JS"],
+    "Vue.js": ["Vue", "VueJS"],
+    "Angular": ["AngularJS", "Angular.js"],
+    "Express": ["Express.js", "ExpressJS"],
+    "MongoDB": ["Mongo"],
+    "PostgreSQL": ["Postgres", "psql"],
+    "REST API": ["RESTful", "RESTful API", "REST APIs"],
+    "Data Visualization": ["Data Viz", "Dataviz"],
+    "Power BI": ["PowerBI"],
+    "Penetration Testing": ["Pentesting", "Pen Testing", "Pentest"],
+    "Kali Linux": ["Kali"],
+    "AWS": ["Amazon Web Services"],
+    "GCP": ["Google Cloud", "Google Cloud Platform"],
+    "Azure": ["Microsoft Azure"],
+    "Kubernetes": ["K8s"],
+    "CI/CD": ["CICD", "Continuous Integration"],
+    "GitHub Actions": ["GH Actions"],
+}
+
+# Short forms that are also ordinary words in prose ("a REST day", "each node
+# of the tree", "TS" for time series). They are only trusted where the student
+# lists skills (comma-separated fields, see skill_names), never searched for in
+# resume text.
+FIELD_ONLY_SKILL_ALIASES = {
+    "PyTorch": ["Torch"],
+    "Python": ["Py"],
+    "TypeScript": ["TS"],
+    "Node.js": ["Node"],
+    "React Native": ["RN"],
+    "REST API": ["REST"],
+    "Kubernetes": ["Kube"],
+}
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def compile_skill_matcher(aliases: dict = None, field_aliases: dict = None) -> tuple[dict, dict]:
+    """
+    Compile every skill name and alias into a single-pass matcher
+    
+    Args:
+        aliases: text aliases (default SKILL_ALIASES)
+        field_aliases: aliases for skill fields only (default FIELD_ONLY_SKILL_ALIASES)
+    
+    Returns:
+        (index, canonical) where index maps the first word of each text surface
+        form to [(surface form, canonical name), ...] and canonical maps every
+        lowercased surface form, field-only ones included, to its lowercased
+        canonical name
+    """
+    canonical = {}
+    for domain_skills in DOMAIN_REQUIRED_SKILLS.values():
+        for skill in domain_skills:
+            canonical[skill.lower()] = skill.lower()
+    field_only = set()
+    for table, in_text in ((SKILL_ALIASES if aliases is None else aliases, True),
+                           (FIELD_ONLY_SKILL_ALIASES if field_aliases is None else field_aliases, False)):
+        for skill, forms in table.items():
+            for form in forms:
+                form = form.lower()
+                if canonical.get(form, skill.lower()) != skill.lower():
+                    raise ValueError(f"Alias {form!r} of {skill!r} is already the skill {canonical[form]!r}")
+                canonical[form] = skill.lower()
+                if not in_text:
+                    field_only.add(form)
+    
+    index = {}
+    for surface, name in canonical.items():
+        if surface in field_only:
+            continue
+        first_word = _WORD_RE.match(surface)
+        if first_word is None:
+            raise ValueError(f"Skill form {surface!r} must start with a letter or digit")
+        index.setdefault(first_word.group(), []).append((surface, name))
+    return index, canonical
+
+
+SKILL_MATCHER, CANONICAL_SKILLS = compile_skill_matcher()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+def find_skills(text_lower: str, matcher: dict = None) -> set[str]:
+    """
+    Canonical names of every skill mentioned in already-lowercased text
+    
+    Same rule as a word-boundary regex search for each surface form, but done in
+    one pass: the text is tokenized once and only the forms whose first word
+    equals the token at hand are compared, so the cost does not grow with the
+    number of skills and aliases.
+    """
+    matcher = SKILL_MATCHER if matcher is None else matcher
+    length = len(text_lower)
+    found = set()
+    for token in _WORD_RE.finditer(text_lower):
+        candidates = matcher.get(token.group())
+        if not candidates:
+            continue
+        start = token.start()
+        for surface, name in candidates:
+            if name in found or not text_lower.startswith(surface, start):
+                continue
+            # Word boundary after the form, exactly as \b defines it
+            end = start + len(surface)
+            before = _is_word_char(text_lower[end - 1])
+            after = end < length and _is_word_char(text_lower[end])
+            if before != after:
+                found.add(name)
+    return found
+
+
+# ============================================================================
+# ENGINE COUNTERS
+# ============================================================================
+# Plain module-level counts (regex scans etc.). run_smart_allocation reports
+# the per-run delta in stats['counters']; shard workers return their own deltas.
+
+ENGINE_COUNTERS = Counter()
+
+
 def get_domain_skills(domain: str) -> str:
     """
     Get required skills for a given domain
@@ -80,15 +223,91 @@ def get_domain_skills(domain: str) -> str:
 
 
 
-def calculate_skill_match(student_skills: str, required: str) -> float:
-    """Calculate skill match percentage between student and required skills"""
+# ============================================================================
+# SKILL IDS AND BITMASKS
+# ============================================================================
+# Every canonical skill name (stripped, lowercased) has an integer ID; a skill
+# list is a Python int with bit <id> set for each skill in it, so matching is
+# an AND plus popcount. IDs are dense and never reused. database.py persists
+# them in the `skills` table and seeds SKILL_IDS with it (load_skill_ids), so
+# masks computed here and masks stored in the DB share bit positions.
+#
+# Only the database hands out IDs. A skill missing from SKILL_IDS (e.g. a CSV
+# snapshot without a database) gets a temporary ID in a per-run copy of the
+# dictionary (see skill_masks); such masks never leave the run.
+
+SKILL_IDS = {}   # canonical skill name -> bit position
+
+
+def set_skill_ids(skill_ids: dict):
+    """Replace the in-process dictionary (e.g. with database.load_skill_ids) before computing masks"""
+    SKILL_IDS.clear()
+    SKILL_IDS.update(skill_ids)
+
+
+def skill_names(skills: str) -> set[str]:
+    """Canonical skill names (aliases resolved) in a comma-separated skills string"""
+    if not skills:
+        return set()
+    names = {x.strip().lower() for x in skills.split(',') if x.strip()}
+    return {CANONICAL_SKILLS.get(name, name) for name in names}
+
+
+def skill_mask(skills: str, skill_ids: dict = None) -> int:
+    """
+    Bitmask of a comma-separated skills string
+    
+    Unknown skills are added to skill_ids with IDs above every existing one;
+    pass the same run-local dictionary for all masks that are compared with
+    each other. Without skill_ids a copy of SKILL_IDS is used, never SKILL_IDS.
+    """
+    if skill_ids is None:
+        skill_ids = dict(SKILL_IDS)
+    mask = 0
+    for name in sorted(skill_names(skills)):
+        skill_id = skill_ids.get(name)
+        if skill_id is None:
+            skill_id = skill_ids[name] = max(skill_ids.values(), default=0) + 1
+        mask |= 1 << skill_id
+    return mask
+
+
+def skill_masks(students, positions, stored=None):
+    """
+    Skill masks of an allocation run: ({student_id: mask}, {position_id: mask})
+    of the students' extracted skills and the positions' required skills
+    
+    Args:
+        stored: optional ({student_id: mask}, {position_id: mask}) read from the
+            database *_mask columns; only rows missing there are parsed
+    """
+    stored_students, stored_positions = stored or ({}, {})
+    skill_ids = dict(SKILL_IDS)
+    student_masks = {student[0]: stored_students[student[0]] if student[0] in stored_students
+                     else skill_mask(student[9], skill_ids) for student in students}
+    position_masks = {position[0]: stored_positions[position[0]] if position[0] in stored_positions
+                      else skill_mask(position[3], skill_ids) for position in positions}
+    return student_masks, position_masks
+
+
+def calculate_skill_match(student_skills, required) -> float:
+    """
+    Calculate skill match percentage between student and required skills
+    
+    Either both arguments are comma-separated strings or both are masks from
+    skill_mask()/skill_masks(); passing precomputed masks keeps the scoring
+    loop free of string work.
+    """
     if not student_skills or not required:
         return 0.0
-    s = {x.strip().lower() for x in student_skills.split(',') if x.strip()}
-    r = {x.strip().lower() for x in required.split(',') if x.strip()}
-    if not r:
+    if isinstance(student_skills, int) and isinstance(required, int):
+        matched, wanted = (student_skills & required).bit_count(), required.bit_count()
+    else:
+        required_names = skill_names(required)
+        matched, wanted = len(skill_names(student_skills) & required_names), len(required_names)
+    if not wanted:
         return 0.0
-    return round(len(s & r) / len(r) * 100, 2)
+    return round(matched / wanted * 100, 2)
 
 
 def normalize_domain(d: str) -> str:
@@ -110,6 +329,7 @@ def is_resume_fake_or_spam(text: str) -> tuple[bool, str]:
     # ===== CRITICAL CHECKS =====
     
     # Check 1: Too many repeated characters (e.g., "aaaaaaa", "xxxxxxx")
+    ENGINE_COUNTERS['regex_calls'] += 1
     repeated_chars = re.findall(r'(.)\1{6,}', text_lower)
     if repeated_chars:
         return True, "Resume contains excessive repeated characters (detected as spam)"
@@ -218,348 +438,641 @@ def extract_skills_from_text(text: str) -> list[str]:
     
     text_lower = text.lower()
     
-    # Comprehensive skill database
-    all_skills = set()
-    for domain_skills in DOMAIN_REQUIRED_SKILLS.values():
-        all_skills.update([s.lower() for s in domain_skills])
-    
-    # Find skills mentioned in resume
-    found_skills = []
-    for skill in all_skills:
-        # Use word boundaries to avoid partial matches
-        pattern = r'\b' + re.escape(skill.lower()) + r'\b'
-        if re.search(pattern, text_lower):
-            found_skills.append(skill.title())
+    # Find skills (and their aliases) mentioned in resume in a single scan
+    ENGINE_COUNTERS['regex_calls'] += 1
+    found_skills = [skill.title() for skill in find_skills(text_lower)]
     
     return sorted(list(set(found_skills)))
 
 
-def analyze_resume_against_job(resume_text: str, job_description: dict) -> tuple[int, dict]:
+# ============================================================================
+# ATS SCORING: NUMERIC CORE + ON-DEMAND EXPLANATION
+# ============================================================================
+# Bulk allocation only needs the numbers, so score_resume_against_job() and
+# score_student_position() compute them without building any text. The
+# human-readable breakdown is produced afterwards from the same result by
+# explain_resume_score() / explain_student_position_score(), so both paths
+# report identical numbers by construction.
+
+ResumeScore = namedtuple('ResumeScore', [
+    'score', 'resume_quality', 'keyword_match', 'skill_match', 'experience_signals',
+    'has_text', 'word_count', 'sections_found', 'formatting_score',
+    'keywords_found', 'keywords_total', 'skills_matched', 'skills_total',
+    'action_count', 'metrics_found',
+])
+
+PairScore = namedtuple('PairScore', [
+    'score', 'reason', 'ats', 'ats_points', 'cgpa_points', 'exp_points', 'skill_match', 'skill_bonus',
+])
+
+# Weights of score_student_position: share of the ATS score, maximum CGPA and
+# experience points (experience_per_year points per year) and the minimum ATS
+# score a pair needs to be eligible. Allocations use DEFAULT_WEIGHTS; the what-if
+# simulator (simulation.py) runs the engines with other values.
+ScoringWeights = namedtuple('ScoringWeights', [
+    'ats', 'cgpa', 'experience', 'experience_per_year', 'min_ats',
+])
+DEFAULT_WEIGHTS = ScoringWeights(ats=0.6, cgpa=20, experience=10, experience_per_year=3.33, min_ats=0)
+
+# Most points the extracted-skills bonus adds (match percent / 10)
+SKILL_BONUS_MAX = 10
+
+SECTION_KEYWORDS = ['education', 'experience', 'skills', 'projects', 'certifications']
+FORMATTING_KEYWORDS = ['•', '-', ':', 'bachelor', 'master', 'degree', 'gpa', 'cgpa']
+ACTION_VERBS = ['achieved', 'improved', 'developed', 'created', 'designed', 'implemented',
+                'built', 'led', 'managed', 'optimized', 'increased', 'decreased']
+
+
+# Everything scoring and validation read from a resume, without the text (see
+# extract_resume_features): its sha256 digest, the is_resume_fake_or_spam
+# reason (None if it passed), the position-independent counts and a bitmask of
+# the TermIndex terms found in the text. A few hundred bytes per student, where
+# the text is several KB.
+ResumeFeatures = namedtuple('ResumeFeatures', [
+    'digest', 'spam_reason', 'word_count', 'sections_found', 'formatting_score',
+    'action_count', 'metrics_found', 'term_mask', 'terms',
+])
+
+
+class TermIndex:
     """
-    ENHANCED ATS-STYLE RESUME SCORING
+    Numbers every keyword and required skill a set of positions tests resumes
+    for. A ResumeFeatures only records the terms of positions in its
+    student's (normalized) domain, which are the only positions it can be
+    scored against.
+    """
+    __slots__ = ('term_ids', 'domain_terms')
+
+    def __init__(self, positions):
+        self.term_ids = {}
+        self.domain_terms = {}   # normalized domain -> [(term, term_id), ...]
+        for position in positions:
+            terms = self.domain_terms.setdefault(normalize_domain(position[2] or ""), {})
+            keywords = DOMAIN_REQUIRED_SKILLS.get(position[2], DOMAIN_REQUIRED_SKILLS['General'])
+            required = position[3].split(',') if position[3] else []
+            for term in [keyword.lower() for keyword in keywords] + [skill.strip().lower() for skill in required]:
+                terms[term] = self.term_ids.setdefault(term, len(self.term_ids))
+        self.domain_terms = {domain: list(terms.items()) for domain, terms in self.domain_terms.items()}
+
+
+def _has_term(text_lower: str, term: str) -> bool:
+    return re.search(r'\b' + re.escape(term) + r'\b', text_lower) is not None
+
+
+def _text_stats(text_lower: str) -> tuple:
+    """(word_count, sections_found, formatting_score, action_count, metrics_found) of a resume"""
+    word_count = len(text_lower.split())
+    sections_found = sum(1 for section in SECTION_KEYWORDS if section in text_lower)
+    formatting_score = min(sum(2 for kw in FORMATTING_KEYWORDS if kw in text_lower), 5)
+    action_count = sum(1 for verb in ACTION_VERBS if verb in text_lower)
+    ENGINE_COUNTERS['regex_calls'] += 1
+    metrics_found = len(re.findall(r'\d+%|\d+x|\d+\+', text_lower))
+    return word_count, sections_found, formatting_score, action_count, metrics_found
+
+
+def extract_resume_features(resume_text: str, domain: str, term_index: TermIndex):
+    """
+    Reduce a resume to its ResumeFeatures as soon as it is read, so the text can be dropped
     
-    Analyzes resume quality and job-specific keyword matching
+    Scoring the features gives exactly the score of the text for every
+    position of `term_index` in the student's domain.
+    
+    Returns: ResumeFeatures, or None for a missing/empty resume
+    """
+    if not resume_text:
+        return None
+    is_fake, reason = is_resume_fake_or_spam(resume_text)
+    text_lower = resume_text.lower()
+    terms = term_index.domain_terms.get(normalize_domain(domain or ""), ())
+    ENGINE_COUNTERS['regex_calls'] += len(terms)
+    term_mask = 0
+    for term, term_id in terms:
+        if _has_term(text_lower, term):
+            term_mask |= 1 << term_id
+    return ResumeFeatures(hashlib.sha256(resume_text.encode('utf-8')).digest(), reason if is_fake else None,
+                          *_text_stats(text_lower), term_mask, term_index)
+
+
+def score_resume_against_job(resume_text, job_description: dict) -> ResumeScore:
+    """
+    Numeric core of the ATS score (no breakdown strings)
     
     Args:
-        resume_text: Full text content of resume
+        resume_text: Full text content of resume, or its ResumeFeatures
         job_description: Dict with keys 'domain', 'required_skills', 'min_cgpa'
     
     Returns:
-        (score: int, analysis: dict) where score is 0-100
+        ResumeScore with the 0-100 score, the four category scores and the raw
+        counts explain_resume_score() needs
     """
-    score = 0
-    analysis = {
-        'resume_quality': 0,
-        'keyword_match': 0,
-        'skill_match': 0,
-        'experience_signals': 0,
-        'breakdown': []
-    }
-    
     if not resume_text:
-        analysis['breakdown'].append("❌ No resume text provided")
-        return 0, analysis
+        return ResumeScore(0, 0, 0, 0, 0, False, 0, 0, 0, 0, 0, 0, None, 0, 0)
     
-    text_lower = resume_text.lower()
-    words = text_lower.split()
+    domain = job_description.get('domain', 'General')
+    domain_keywords = DOMAIN_REQUIRED_SKILLS.get(domain, DOMAIN_REQUIRED_SKILLS['General'])
+    required_skills = job_description.get('required_skills', '')
+    required_list = [s.strip().lower() for s in required_skills.split(',')] if required_skills else None
     
-    # ===== 1. RESUME QUALITY & STRUCTURE (25 points) =====
-    quality_score = 0
+    if isinstance(resume_text, ResumeFeatures):
+        term_ids = resume_text.terms.term_ids
+        term_mask = resume_text.term_mask
+        has_term = lambda term: term_mask >> term_ids[term] & 1
+        stats = resume_text[2:7]
+    else:
+        text_lower = resume_text.lower()
+        has_term = lambda term: _has_term(text_lower, term)
+        stats = _text_stats(text_lower)
+        ENGINE_COUNTERS['regex_calls'] += len(domain_keywords) + len(required_list or ())
+    word_count, sections_found, formatting_score, action_count, metrics_found = stats
     
+    # ===== 1. RESUME QUALITY & STRUCTURE (25 points) =====
     # Word count (optimal: 200-600 words)
-    word_count = len(words)
     if 200 <= word_count <= 600:
-        quality_score += 10
-        analysis['breakdown'].append(f"✅ Good length: {word_count} words (+10)")
+        quality_score = 10
     elif 100 <= word_count < 200 or 600 < word_count <= 800:
-        quality_score += 5
-        analysis['breakdown'].append(f"⚠️ Acceptable length: {word_count} words (+5)")
+        quality_score = 5
     else:
-        analysis['breakdown'].append(f"⚠️ Length issue: {word_count} words (+0)")
+        quality_score = 0
     
     # Section structure
-    sections = ['education', 'experience', 'skills', 'projects', 'certifications']
-    sections_found = sum(1 for section in sections if section in text_lower)
-    
     if sections_found >= 4:
         quality_score += 10
-        analysis['breakdown'].append(f"✅ Excellent structure: {sections_found}/5 sections (+10)")
     elif sections_found >= 2:
         quality_score += 5
-        analysis['breakdown'].append(f"⚠️ Basic structure: {sections_found}/5 sections (+5)")
-    else:
-        analysis['breakdown'].append(f"❌ Poor structure: {sections_found}/5 sections (+0)")
     
     # Professional formatting indicators
-    formatting_keywords = ['•', '-', ':', 'bachelor', 'master', 'degree', 'gpa', 'cgpa']
-    formatting_score = min(sum(2 for kw in formatting_keywords if kw in text_lower), 5)
     quality_score += formatting_score
     
-    if formatting_score > 0:
-        analysis['breakdown'].append(f"✅ Professional formatting (+{formatting_score})")
-    
-    score += quality_score
-    analysis['resume_quality'] = quality_score
-    
     # ===== 2. JOB-SPECIFIC KEYWORDS (30 points) =====
-    keyword_score = 0
-    
-    domain = job_description.get('domain', 'General')
-    domain_keywords = DOMAIN_REQUIRED_SKILLS.get(domain, DOMAIN_REQUIRED_SKILLS['General'])
-    
-    # Keywords found in resume
-    keywords_found = []
-    for keyword in domain_keywords:
-        pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-        if re.search(pattern, text_lower):
-            keywords_found.append(keyword)
-    
-    keyword_match_percent = (len(keywords_found) / len(domain_keywords)) * 100 if domain_keywords else 0
+    keywords_found = sum(1 for keyword in domain_keywords if has_term(keyword.lower()))
+    keyword_match_percent = (keywords_found / len(domain_keywords)) * 100 if domain_keywords else 0
     keyword_score = min(int(keyword_match_percent * 0.3), 30)
     
-    score += keyword_score
-    analysis['keyword_match'] = keyword_score
-    analysis['breakdown'].append(
-        f"🎯 Domain keywords: {len(keywords_found)}/{len(domain_keywords)} found ({keyword_match_percent:.0f}%) (+{keyword_score})"
-    )
-    
     # ===== 3. TECHNICAL SKILLS MATCH (25 points) =====
     skill_score = 0
-    
-    required_skills = job_description.get('required_skills', '')
-    if required_skills:
-        required_list = [s.strip().lower() for s in required_skills.split(',')]
-        skills_matched = []
-        
-        for req_skill in required_list:
-            pattern = r'\b' + re.escape(req_skill) + r'\b'
-            if re.search(pattern, text_lower):
-                skills_matched.append(req_skill)
-        
-        skill_match_percent = (len(skills_matched) / len(required_list)) * 100 if required_list else 0
+    skills_matched = 0
+    skills_total = None
+    if required_list:
+        skills_matched = sum(1 for req_skill in required_list if has_term(req_skill))
+        skills_total = len(required_list)
+        skill_match_percent = (skills_matched / skills_total) * 100 if required_list else 0
         skill_score = min(int(skill_match_percent * 0.25), 25)
-        
-        score += skill_score
-        analysis['skill_match'] = skill_score
-        analysis['breakdown'].append(
-            f"🔧 Required skills: {len(skills_matched)}/{len(required_list)} matched ({skill_match_percent:.0f}%) (+{skill_score})"
-        )
-    else:
-        analysis['breakdown'].append("⚠️ No specific skills required (+0)")
     
     # ===== 4. EXPERIENCE & IMPACT INDICATORS (20 points) =====
-    experience_score = 0
+    # Action verbs (shows active contribution) + quantifiable results (numbers, percentages, metrics)
+    experience_score = min(action_count * 2, 10) + min(metrics_found * 2, 10)
     
-    # Action verbs (shows active contribution)
-    action_verbs = ['achieved', 'improved', 'developed', 'created', 'designed', 'implemented',
-                    'built', 'led', 'managed', 'optimized', 'increased', 'decreased']
-    action_count = sum(1 for verb in action_verbs if verb in text_lower)
-    experience_score += min(action_count * 2, 10)
+    # ===== FINAL SCORE =====
+    final_score = min(quality_score + keyword_score + skill_score + experience_score, 100)
     
-    if action_count > 0:
-        analysis['breakdown'].append(f"✅ Action verbs: {action_count} found (+{min(action_count * 2, 10)})")
+    return ResumeScore(final_score, quality_score, keyword_score, skill_score, experience_score,
+                       True, word_count, sections_found, formatting_score,
+                       keywords_found, len(domain_keywords), skills_matched, skills_total,
+                       action_count, metrics_found)
+
+
+def explain_resume_score(result: ResumeScore) -> dict:
+    """Category scores plus the emoji `breakdown` lines for a ResumeScore"""
+    analysis = {
+        'resume_quality': result.resume_quality,
+        'keyword_match': result.keyword_match,
+        'skill_match': result.skill_match,
+        'experience_signals': result.experience_signals,
+        'breakdown': []
+    }
+    breakdown = analysis['breakdown']
     
-    # Quantifiable results (numbers, percentages, metrics)
-    numbers = re.findall(r'\d+%|\d+x|\d+\+', text_lower)
-    metrics_score = min(len(numbers) * 2, 10)
-    experience_score += metrics_score
+    if not result.has_text:
+        breakdown.append("❌ No resume text provided")
+        return analysis
     
-    if metrics_score > 0:
-        analysis['breakdown'].append(f"📊 Quantifiable results: {len(numbers)} metrics (+{metrics_score})")
+    word_count = result.word_count
+    if 200 <= word_count <= 600:
+        breakdown.append(f"✅ Good length: {word_count} words (+10)")
+    elif 100 <= word_count < 200 or 600 < word_count <= 800:
+        breakdown.append(f"⚠️ Acceptable length: {word_count} words (+5)")
+    else:
+        breakdown.append(f"⚠️ Length issue: {word_count} words (+0)")
     
-    score += experience_score
-    analysis['experience_signals'] = experience_score
+    sections_found = result.sections_found
+    if sections_found >= 4:
+        breakdown.append(f"✅ Excellent structure: {sections_found}/5 sections (+10)")
+    elif sections_found >= 2:
+        breakdown.append(f"⚠️ Basic structure: {sections_found}/5 sections (+5)")
+    else:
+        breakdown.append(f"❌ Poor structure: {sections_found}/5 sections (+0)")
     
-    # ===== FINAL SCORE =====
-    final_score = min(score, 100)
+    if result.formatting_score > 0:
+        breakdown.append(f"✅ Professional formatting (+{result.formatting_score})")
+    
+    keyword_match_percent = (result.keywords_found / result.keywords_total) * 100 if result.keywords_total else 0
+    breakdown.append(
+        f"🎯 Domain keywords: {result.keywords_found}/{result.keywords_total} found "
+        f"({keyword_match_percent:.0f}%) (+{result.keyword_match})"
+    )
+    
+    if result.skills_total is not None:
+        skill_match_percent = (result.skills_matched / result.skills_total) * 100 if result.skills_total else 0
+        breakdown.append(
+            f"🔧 Required skills: {result.skills_matched}/{result.skills_total} matched "
+            f"({skill_match_percent:.0f}%) (+{result.skill_match})"
+        )
+    else:
+        breakdown.append("⚠️ No specific skills required (+0)")
+    
+    if result.action_count > 0:
+        breakdown.append(f"✅ Action verbs: {result.action_count} found (+{min(result.action_count * 2, 10)})")
+    metrics_score = min(result.metrics_found * 2, 10)
+    if metrics_score > 0:
+        breakdown.append(f"📊 Quantifiable results: {result.metrics_found} metrics (+{metrics_score})")
     
-    return final_score, analysis
+    return analysis
 
 
-def student_company_position_score(student, position, resume_text=None):
+def analyze_resume_against_job(resume_text: str, job_description: dict) -> tuple[int, dict]:
     """
-    Calculate match score for student-position pair
-    Uses RESUME-FIRST approach (60% weight on resume ATS analysis)
+    ENHANCED ATS-STYLE RESUME SCORING
+    
+    Analyzes resume quality and job-specific keyword matching
     
     Args:
-        student: (user_id, name, email, skills, cgpa, domain, exp, resume_path, profile_photo, extracted_skills)
-        position: (position_id, company_id, domain, required_skills, min_cgpa, positions, stipend)
-        resume_text: Full resume text (if available)
+        resume_text: Full text content of resume
+        job_description: Dict with keys 'domain', 'required_skills', 'min_cgpa'
     
     Returns:
-        float: Score 0-100
+        (score: int, analysis: dict) where score is 0-100
+    """
+    result = score_resume_against_job(resume_text, job_description)
+    return result.score, explain_resume_score(result)
+
+
+def score_student_position(student, position, resume_text=None, skill_masks=None,
+                           weights=DEFAULT_WEIGHTS) -> PairScore:
+    """
+    Numeric core of student_company_position_score (no output, no text)
+    
+    Returns:
+        PairScore; `reason` is set (and score is 0) when the pair is ineligible
+        ('domain', 'cgpa', 'no_resume', or 'ats' below weights.min_ats)
     """
-    sid = student[0]
     cgpa = student[4] or 0
     sdomain = student[5] or ""
     exp = student[6] or 0
     extracted_skills = student[9] or ""
     
-    pid = position[0]
     pdomain = position[2]
     req_skills = position[3]
     min_cgpa = position[4]
     
     # Domain must match
     if normalize_domain(sdomain) != normalize_domain(pdomain):
-        print(f"  ❌ Domain mismatch: Student wants {sdomain}, Position is {pdomain}")
-        return 0
+        return PairScore(0, 'domain', None, 0, 0, 0, 0, 0)
     
     # CGPA must meet minimum
     if cgpa < min_cgpa:
-        print(f"  ❌ CGPA too low: {cgpa} < {min_cgpa}")
-        return 0
-    
-    score = 0
+        return PairScore(0, 'cgpa', None, 0, 0, 0, 0, 0)
     
     # Resume-based ATS scoring (60% of total score)
     if not resume_text:
-        print(f"  ❌ Student {sid} has NO RESUME - cannot score")
-        return 0
+        return PairScore(0, 'no_resume', None, 0, 0, 0, 0, 0)
     
-    job_desc = {
+    ats = score_resume_against_job(resume_text, {
         'domain': pdomain,
         'required_skills': req_skills,
         'min_cgpa': min_cgpa
-    }
-    ats_score, analysis = analyze_resume_against_job(resume_text, job_desc)
+    })
+    
+    if ats.score < weights.min_ats:
+        return PairScore(0, 'ats', ats, 0, 0, 0, 0, 0)
     
     # 60% weight on resume ATS score
-    score += ats_score * 0.6
+    score = 0
+    ats_points = ats.score * weights.ats
+    score += ats_points
     
-    print(f"  ✅ Student {sid} ATS Score: {ats_score}/100")
-    print(f"     Domain: {pdomain} | Required Skills: {req_skills[:50]}...")
-
     # CGPA contribution (20 points max)
-    cgpa_points = (cgpa / 10.0) * 20
+    cgpa_points = (cgpa / 10.0) * weights.cgpa
     score += cgpa_points
     
     # Experience contribution (10 points max)
-    exp_points = min(exp * 3.33, 10)
+    exp_points = min(exp * weights.experience_per_year, weights.experience)
     score += exp_points
     
     # Bonus for extracted skills matching (10 points max)
+    resume_skill_match = 0
+    skill_bonus = 0
     if extracted_skills and req_skills:
-        resume_skill_match = calculate_skill_match(extracted_skills, req_skills)
-        skill_bonus = min(resume_skill_match / 10, 10)
+        if skill_masks is not None:
+            resume_skill_match = calculate_skill_match(*skill_masks)
+        else:
+            resume_skill_match = calculate_skill_match(extracted_skills, req_skills)
+        skill_bonus = min(resume_skill_match / 10, SKILL_BONUS_MAX)
         score += skill_bonus
-
-    final_score = min(round(score, 2), 100.0)
-    print(f"  ✅ Student {sid} Final Score: {final_score}/100 (CGPA: {cgpa_points:.1f}, Exp: {exp_points:.1f})")
     
-    return final_score
+    return PairScore(min(round(score, 2), 100.0), None, ats, ats_points, cgpa_points, exp_points,
+                     resume_skill_match, skill_bonus)
 
 
-def run_smart_allocation(students, positions, resume_texts=None):
+def student_company_position_score(student, position, resume_text=None, skill_masks=None):
     """
-    FAIR ROUND-ROBIN ALLOCATION ALGORITHM
+    Calculate match score for student-position pair
+    Uses RESUME-FIRST approach (60% weight on resume ATS analysis)
     
-    Strategy:
-    1. Validate all resumes (existing logic)
-    2. Calculate scores for all student-position pairs
-    3. GROUP matches by position/company
-    4. Use ROUND-ROBIN allocation to ensure fair distribution
-    5. Allocate best student to each company in turns
+    Args:
+        student: (user_id, name, email, skills, cgpa, domain, exp, resume_path, profile_photo, extracted_skills)
+        position: (position_id, company_id, domain, required_skills, min_cgpa, positions, stipend)
+        resume_text: Full resume text (if available)
+        skill_masks: Optional precomputed (extracted_skills mask, required_skills mask)
     
-    Returns: List of allocations (student_id, company_id, position_id, score, rank)
+    Returns:
+        float: Score 0-100
     """
-    if resume_texts is None:
-        resume_texts = {}
+    result = score_student_position(student, position, resume_text, skill_masks)
+    sid = student[0]
     
-    print("\n" + "=" * 80)
-    print("🔍 PHASE 1: STRICT RESUME VALIDATION (RESUME REQUIRED!)")
-    print("=" * 80)
+    if result.reason == 'domain':
+        print(f"  ❌ Domain mismatch: Student wants {student[5] or ''}, Position is {position[2]}")
+    elif result.reason == 'cgpa':
+        print(f"  ❌ CGPA too low: {student[4] or 0} < {position[4]}")
+    elif result.reason == 'no_resume':
+        print(f"  ❌ Student {sid} has NO RESUME - cannot score")
+    else:
+        print(f"  ✅ Student {sid} ATS Score: {result.ats.score}/100")
+        print(f"     Domain: {position[2]} | Required Skills: {position[3][:50]}...")
+        print(f"  ✅ Student {sid} Final Score: {result.score}/100 "
+              f"(CGPA: {result.cgpa_points:.1f}, Exp: {result.exp_points:.1f})")
     
-    valid_students = []
-    no_resume_count = 0
-    fake_count = 0
+    return result.score
+
+
+def explain_student_position_score(student, position, resume_text=None, weights=DEFAULT_WEIGHTS) -> dict:
+    """
+    "Why this score?" for one student-position pair: the same numbers as
+    student_company_position_score plus the ATS breakdown lines
+
+    Args:
+        weights: ScoringWeights the pair is scored and explained with
+    """
+    result = score_student_position(student, position, resume_text, weights=weights)
+    reasons = {
+        'domain': f"Domain mismatch: student wants {student[5] or ''}, position is {position[2]}",
+        'cgpa': f"CGPA too low: {student[4] or 0} < {position[4]}",
+        'no_resume': "No resume uploaded - cannot score",
+        'ats': f"ATS score too low: {result.ats.score if result.ats else 0} < {weights.min_ats}",
+    }
+    explanation = {
+        'student_id': student[0],
+        'position_id': position[0],
+        'score': result.score,
+        'eligible': result.reason is None,
+        'reason': reasons.get(result.reason),
+    }
+    if result.reason is None:
+        explanation.update({
+            'components': {
+                'ats': {'score': result.ats.score, 'weight': weights.ats, 'points': round(result.ats_points, 2)},
+                'cgpa': {'value': student[4] or 0, 'points': round(result.cgpa_points, 2), 'max': weights.cgpa},
+                'experience': {'years': student[6] or 0, 'points': round(result.exp_points, 2),
+                               'max': weights.experience},
+                'skill_bonus': {'match_percent': result.skill_match, 'points': round(result.skill_bonus, 2),
+                                'max': SKILL_BONUS_MAX},
+            },
+            'ats': explain_resume_score(result.ats),
+        })
+    return explanation
+
+
+# ============================================================================
+# PAIR-SCORE KEYS (persistent score cache)
+# ============================================================================
+# score_student_position() is a pure function of the fields hashed below, so a
+# pair's score can be reused for as long as neither key changes (see
+# score_cache.py). Bump SCORING_VERSION whenever the scoring code, keyword
+# tables or SKILL_ALIASES change: every cached score is then ignored.
+
+SCORING_VERSION = 1
+
+
+def _score_key(*parts) -> int:
+    digest = hashlib.blake2b(digest_size=8)
+    for part in (SCORING_VERSION, *parts):
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return int.from_bytes(digest.digest(), 'big', signed=True)   # fits SQLite INTEGER
+
+
+def student_score_key(student, resume_text=None) -> int:
+    """Digest of everything a student contributes to a pair score (resume hash, CGPA, domain, experience, extracted skills)"""
+    if isinstance(resume_text, ResumeFeatures):
+        resume_hash = resume_text.digest.hex()
+    else:
+        resume_hash = hashlib.sha256(resume_text.encode('utf-8')).hexdigest() if resume_text else None
+    return _score_key(resume_hash, student[4] or 0, normalize_domain(student[5] or ""),
+                      student[6] or 0, student[9] or "")
+
+
+def position_score_key(position) -> int:
+    """Digest of everything a position contributes to a pair score (domain, required skills, min CGPA)"""
+    return _score_key(position[2] or "", position[3] or "", position[4])
+
+
+def shard_by_domain(students, positions):
+    """
+    Split an allocation problem into independent per-domain subproblems
+    
+    student_company_position_score() is 0 whenever the normalized domains
+    differ, so a student can only ever be matched to positions of its own
+    domain and shards never compete for the same student.
+    
+    Returns: {domain_key: (students, positions)} in first-seen order,
+             with the input order preserved inside each shard
+    """
+    shards = {}
+    for position in positions:
+        shards.setdefault(normalize_domain(position[2] or ""), ([], []))[1].append(position)
+    for student in students:
+        key = normalize_domain(student[5] or "")
+        if key in shards:
+            shards[key][0].append(student)
+    return shards
+
+
+# Candidates kept per position: its capacity plus a margin for students that
+# other positions in the shard take first. A position can never lose more
+# students than the other positions have seats, so the margin is capped there.
+TOPK_MIN_MARGIN = 10
+
+# Unallocated candidates remembered per position, best first, to fill a seat
+# that frees up later without rescoring (see database.fill_vacancies)
+WAITLIST_SIZE = 20
+
+
+class _PositionSlot:
+    """
+    Allocation state of one position. __slots__ instead of a per-position dict,
+    and the kept candidates as two parallel arrays (student ids, scores) instead
+    of a dict or tuple per candidate. `waitlist` is filled once allocation ends.
+    """
+    __slots__ = ('company_id', 'domain', 'max_positions', 'allocated', 'current_rank',
+                 'candidate_ids', 'candidate_scores', 'next_candidate', 'truncated', 'waitlist')
+
+    def __init__(self, position):
+        self.company_id = position[1]
+        self.domain = position[2]
+        self.max_positions = position[5]
+        self.allocated = 0
+        self.current_rank = 1
+        self.waitlist = []
+        self.set_candidates([], False)
+
+    def set_candidates(self, top, truncated):
+        """Store [(student_id, score), ...] best first; `truncated` if eligible students were left out"""
+        self.candidate_ids = array('q', [student_id for student_id, _ in top])
+        self.candidate_scores = array('d', [score for _, score in top])
+        self.next_candidate = 0   # taken students never come back, so the cursor only moves forward
+        self.truncated = truncated
+
+    def release_candidates(self):
+        self.candidate_ids = self.candidate_scores = None
+
+
+def _candidate_limit(capacity, shard_capacity):
+    return capacity + min(shard_capacity - capacity, max(TOPK_MIN_MARGIN, capacity))
+
+
+def _scored_candidates(position, students, resume_texts, skill_masks, tally, taken=(),
+                       eligible_ids=None, cached=None, fresh=None, weights=DEFAULT_WEIGHTS):
+    """
+    Yield (student_id, score) for every student (not in `taken`) scoring above 0 for `position`
     
+    skill_masks is the (student masks, position masks) pair of skill_masks(). Scores found in `cached` ({student_id: score}) are reused; computed ones are
+    appended to `fresh` as (student_id, score) when it is given.
+    """
+    min_cgpa = position[4]
+    student_skill_masks, position_skill_masks = skill_masks
+    required_mask = position_skill_masks[position[0]]
     for student in students:
         student_id = student[0]
-        resume_text = resume_texts.get(student_id, None)
-        
-        if not resume_text:
-            print(f"❌ Student {student_id} EXCLUDED: NO RESUME UPLOADED (MANDATORY)")
-            no_resume_count += 1
+        if student_id in taken:
             continue
-        
-        is_fake, fake_reason = is_resume_fake_or_spam(resume_text)
-        if is_fake:
-            print(f"❌ Student {student_id} EXCLUDED: {fake_reason}")
-            fake_count += 1
+        # Same rule student_company_position_score applies, checked before any text work
+        if (student[4] or 0) < min_cgpa:
+            tally['pairs_pruned_cgpa'] += 1
             continue
-        
-        print(f"✅ Student {student_id}: Resume validated")
-        valid_students.append(student)
+        if cached is not None and student_id in cached:
+            score = cached[student_id]
+            tally['score_cache_hits'] += 1
+        else:
+            score = score_student_position(student, position, resume_texts.get(student_id, None),
+                                           (student_skill_masks[student_id], required_mask), weights).score
+            tally['pairs_scored'] += 1
+            if fresh is not None:
+                fresh.append((student_id, score))
+                tally['score_cache_misses'] += 1
+        if score > 0:
+            tally['eligible_pairs'] += 1
+            if eligible_ids is not None:
+                eligible_ids.add(student_id)
+            yield student_id, score
+
+
+def _shard_score_cache(students, resume_texts, score_cache):
+    """
+    (cached_scores, store_scores) helpers binding a shard's students to score_cache
     
-    print(f"\n📊 VALIDATION SUMMARY:")
-    print(f"   Total students: {len(students)}")
-    print(f"   Valid resumes: {len(valid_students)}")
-    print(f"   No resume (EXCLUDED): {no_resume_count}")
-    print(f"   Fake resumes (EXCLUDED): {fake_count}")
-    print(f"   Eligible for allocation: {len(valid_students)}")
+    cached_scores(position) -> (cached {student_id: score}, fresh list, position key),
+    all None without a cache; store_scores(position_key, fresh) saves the fresh scores.
+    """
+    if score_cache is not None:
+        student_keys = {student[0]: student_score_key(student, resume_texts.get(student[0], None))
+                        for student in students}
+    
+    def cached_scores(position):
+        if score_cache is None:
+            return None, None, None
+        position_key = position_score_key(position)
+        scores = score_cache.lookup(position_key)
+        cached = {sid: scores[key] for sid, key in student_keys.items() if key in scores}
+        return cached, [], position_key
+    
+    def store_scores(position_key, fresh):
+        if score_cache is not None:
+            score_cache.store(position_key, [(student_keys[sid], score) for sid, score in fresh])
+    
+    return cached_scores, store_scores
+
+
+def _allocate_shard(domain_key, students, positions, resume_texts, score_cache=None, shard_skill_masks=None,
+                    weights=DEFAULT_WEIGHTS):
+    """
+    Score and round-robin allocate a single domain shard (PHASE 2 + 3)
     
-    if not valid_students:
-        print("\n⚠️ NO ELIGIBLE STUDENTS FOUND - ALLOCATION ABORTED")
-        return []
+    Each position keeps only its best _candidate_limit() candidates, selected
+    with a bounded heap (heapq.nlargest, same order as a stable descending
+    sort). If they are all taken by other positions before the position is
+    full, the remaining students are rescored for it.
+    
+    With a score_cache (score_cache.PairScoreCache) pair scores computed by an
+    earlier run are read back instead of recomputed, and new ones are stored.
+    shard_skill_masks are the shard's skill_masks(), computed here when missing.
+    
+    Returns: (allocations, eligible_student_ids, position_info, metrics) where
+             allocations are (round, student_id, company_id, position_id, score, rank)
+    """
+    started = time.perf_counter()
+    counters_before = ENGINE_COUNTERS.copy()
     
     print("\n" + "=" * 80)
-    print("🎯 PHASE 2: CALCULATING MATCH SCORES")
+    print(f"🎯 PHASE 2: CALCULATING MATCH SCORES [shard '{domain_key}']")
     print("=" * 80)
     
     # Build position-specific candidate lists
-    position_candidates_map = {}  # position_id -> [(student_id, company_id, score), ...]
+    position_info = {position[0]: _PositionSlot(position) for position in positions}
+    eligible_ids = set()
+    tally = Counter()
+    shard_capacity = sum(position[5] for position in positions)
+    
+    # Skill strings are parsed once per run, not once per pair
+    if shard_skill_masks is None:
+        shard_skill_masks = skill_masks(students, positions)
+    cached_scores, store_scores = _shard_score_cache(students, resume_texts, score_cache)
     
     for position in positions:
         pid = position[0]
         company_id = position[1]
         domain = position[2]
         pos_num = position[5]
+        limit = _candidate_limit(pos_num, shard_capacity)
         
         print(f"\n📋 Position {pid}: {domain} at Company {company_id} ({pos_num} openings)")
         
-        position_candidates = []
-        for student in valid_students:
-            student_id = student[0]
-            resume_text = resume_texts.get(student_id, None)
-            score = student_company_position_score(student, position, resume_text)
-            
-            if score > 0:
-                position_candidates.append({
-                    'student_id': student_id,
-                    'company_id': company_id,
-                    'position_id': pid,
-                    'score': score
-                })
-        
-        # Sort candidates for this position by score (highest first)
-        position_candidates.sort(key=lambda x: x['score'], reverse=True)
-        position_candidates_map[pid] = position_candidates
+        eligible_before = tally['eligible_pairs']
+        cached, fresh, position_key = cached_scores(position)
+        position_candidates = heapq.nlargest(
+            limit,
+            _scored_candidates(position, students, resume_texts, shard_skill_masks, tally,
+                               eligible_ids=eligible_ids, cached=cached, fresh=fresh, weights=weights),
+            key=itemgetter(1)
+        )
+        store_scores(position_key, fresh)
+        position_info[pid].set_candidates(position_candidates, tally['eligible_pairs'] - eligible_before > limit)
         
         if position_candidates:
-            print(f"   Eligible candidates: {len(position_candidates)}")
-            print(f"   Top 3 scores: {[f'S{c['student_id']}:{c['score']:.1f}' for c in position_candidates[:3]]}")
+            print(f"   Eligible candidates: {tally['eligible_pairs'] - eligible_before} (kept top {len(position_candidates)})")
+            print(f"   Top 3 scores: {[f'S{sid}:{score:.1f}' for sid, score in position_candidates[:3]]}")
+    
+    scored_at = time.perf_counter()
     
     print("\n" + "=" * 80)
-    print("🎓 PHASE 3: FAIR ROUND-ROBIN ALLOCATION")
+    print(f"🎓 PHASE 3: FAIR ROUND-ROBIN ALLOCATION [shard '{domain_key}']")
     print("=" * 80)
     
     # ========== FAIR ALLOCATION LOGIC ==========
     
     allocations = []
     taken_students = set()
-    position_info = {}
-    
-    # Initialize position tracking
-    for position in positions:
-        pid = position[0]
-        position_info[pid] = {
-            'allocated': 0,
-            'max_positions': position[5],
-            'company_id': position[1],
-            'domain': position[2],
-            'current_rank': 1
-        }
+    positions_by_id = {position[0]: position for position in positions}
+    expansions = Counter()
     
     # Create a queue of positions that still need allocations
     active_positions = list(position_info.keys())
@@ -577,42 +1090,57 @@ def run_smart_allocation(students, positions, resume_texts=None):
             info = position_info[pid]
             
             # Check if position is full
-            if info['allocated'] >= info['max_positions']:
+            if info.allocated >= info.max_positions:
                 positions_to_remove.append(pid)
                 continue
             
             # Get next best available student for this position
-            candidates = position_candidates_map.get(pid, [])
-            allocated_to_position = False
+            candidate_ids = info.candidate_ids
+            index = info.next_candidate
+            while True:
+                while index < len(candidate_ids) and candidate_ids[index] in taken_students:
+                    index += 1
+                if index < len(candidate_ids) or not info.truncated:
+                    break
+                # Kept candidates ran dry but more eligible students exist: rescore those still free
+                limit = _candidate_limit(info.max_positions - info.allocated, shard_capacity)
+                print(f"   🔁 Position {pid}: top candidates exhausted, rescoring free students (top {limit})")
+                eligible = Counter()
+                cached, fresh, position_key = cached_scores(positions_by_id[pid])
+                info.set_candidates(heapq.nlargest(
+                    limit,
+                    _scored_candidates(positions_by_id[pid], students, resume_texts, shard_skill_masks,
+                                       eligible, taken_students, cached=cached, fresh=fresh, weights=weights),
+                    key=itemgetter(1)
+                ), eligible['eligible_pairs'] > limit)
+                store_scores(position_key, fresh)
+                expansions['topk_expansions'] += 1
+                expansions['pairs_scored'] += eligible['pairs_scored']
+                expansions['pairs_pruned_cgpa'] += eligible['pairs_pruned_cgpa']
+                expansions['score_cache_hits'] += eligible['score_cache_hits']
+                expansions['score_cache_misses'] += eligible['score_cache_misses']
+                candidate_ids = info.candidate_ids
+                index = 0
             
-            for candidate in candidates:
-                sid = candidate['student_id']
-                
-                # Skip if student already allocated
-                if sid in taken_students:
-                    continue
-                
+            if index < len(candidate_ids):
                 # Allocate this student
-                cid = candidate['company_id']
-                score = candidate['score']
-                rank = info['current_rank']
+                sid = candidate_ids[index]
+                score = info.candidate_scores[index]
+                info.next_candidate = index + 1
+                cid = info.company_id
+                rank = info.current_rank
                 
-                allocations.append((sid, cid, pid, score, rank))
+                allocations.append((allocation_round, sid, cid, pid, score, rank))
                 taken_students.add(sid)
-                info['allocated'] += 1
-                info['current_rank'] += 1
+                info.allocated += 1
+                info.current_rank += 1
                 positions_allocated_this_round += 1
-                allocated_to_position = True
                 
                 print(f"   ✅ Student {sid} → Company {cid}, Position {pid} (Rank #{rank}, Score: {score:.1f})")
-                break
-            
-            # If no student was allocated and position still has space, check if any candidates remain
-            if not allocated_to_position and info['allocated'] < info['max_positions']:
-                # Check if there are any unallocated students left for this position
-                has_available = any(c['student_id'] not in taken_students for c in candidates)
-                if not has_available:
-                    positions_to_remove.append(pid)
+            else:
+                # No unallocated students left for this position
+                info.next_candidate = index
+                positions_to_remove.append(pid)
         
         # Remove positions that are full or have no more candidates
         for pid in positions_to_remove:
@@ -628,6 +1156,238 @@ def run_smart_allocation(students, positions, resume_texts=None):
         allocation_round += 1
         print()
     
+    # Waitlists: the kept candidates nobody took, already in score order
+    for info in position_info.values():
+        info.waitlist = [(sid, score) for sid, score in zip(info.candidate_ids, info.candidate_scores)
+                         if sid not in taken_students][:WAITLIST_SIZE]
+    
+    finished = time.perf_counter()
+    candidates_kept = sum(len(info.candidate_ids) for info in position_info.values())
+    for info in position_info.values():
+        info.release_candidates()   # not needed by the caller; keeps the worker -> parent pickle small
+    counters = ENGINE_COUNTERS - counters_before
+    counters['pairs_scored'] += tally['pairs_scored'] + expansions['pairs_scored']
+    counters['pairs_pruned_cgpa'] += tally['pairs_pruned_cgpa'] + expansions['pairs_pruned_cgpa']
+    counters['topk_expansions'] += expansions['topk_expansions']
+    if score_cache is not None:
+        counters['score_cache_hits'] += tally['score_cache_hits'] + expansions['score_cache_hits']
+        counters['score_cache_misses'] += tally['score_cache_misses'] + expansions['score_cache_misses']
+    metrics = {
+        'domain': domain_key,
+        'students': len(students),
+        'positions': len(positions),
+        'pairs_scored': counters['pairs_scored'],
+        'pairs_pruned_cgpa': counters['pairs_pruned_cgpa'],
+        'eligible_pairs': tally['eligible_pairs'],
+        'candidates_kept': candidates_kept,
+        'allocated': len(allocations),
+        'rounds': allocation_round,
+        'scoring_seconds': round(scored_at - started, 4),
+        'round_robin_seconds': round(finished - scored_at, 4),
+        'seconds': round(finished - started, 4),
+        'counters': dict(counters),
+    }
+    return allocations, eligible_ids, position_info, metrics
+
+
+# Exclusion reasons of valid students left unallocated
+NO_MATCH_REASON = "No position matched domain and minimum CGPA"
+NO_RANKED_MATCH_REASON = "None of the ranked positions matched domain and minimum CGPA"
+
+
+def run_smart_allocation(students, positions, resume_texts=None, stats=None, progress=None,
+                         workers=1, domains=None, score_cache=None, weights=DEFAULT_WEIGHTS,
+                         stored_skill_masks=None):
+    """
+    FAIR ROUND-ROBIN ALLOCATION ALGORITHM
+    
+    Strategy:
+    1. Validate all resumes (existing logic)
+    2. Shard students and positions by normalized domain (see shard_by_domain)
+    3. Per shard: calculate scores for all student-position pairs
+    4. Per shard: use ROUND-ROBIN allocation to ensure fair distribution
+    5. Merge shard results in (round, position order), which reproduces the
+       order of a single global round-robin exactly
+    
+    Args:
+        resume_texts: {student_id: resume text or ResumeFeatures}; pass features
+            (extract_resume_features, with a TermIndex of these positions) to
+            keep memory independent of resume sizes
+        stats: Optional dict filled with run details:
+            'exclusions': {student_id: reason} for every student left unallocated
+            'shards': per-domain metrics (students, positions, pairs, allocated, seconds)
+            'timings': seconds per phase (validation, scoring, round_robin, merge, total);
+                       scoring/round_robin are summed over shards
+            'counters': pairs_scored, pairs_pruned_domain, pairs_pruned_cgpa,
+                        regex_calls, resumes_validated (+ score_cache_hits,
+                        score_cache_misses with a score_cache)
+            'score_cache_hit_rate': share of scored pairs read from score_cache
+            'waitlists': {position_id: [(student_id, score), ...]} for every position
+                         of the run (domains applied), the best WAITLIST_SIZE eligible
+                         students left unallocated
+        progress: Optional callback progress(phase, done, total) with phase in
+            'validation', 'scoring', 'allocation'
+        workers: Allocate shards in this many processes (1 = in-process)
+        domains: Optional iterable of domain names; only those shards are
+            allocated (for re-running a single changed domain)
+        score_cache: Optional score_cache.PairScoreCache; pairs whose student and
+            position are unchanged since an earlier run are not rescored
+        weights: ScoringWeights of the pair scores (the score cache is only
+            used with DEFAULT_WEIGHTS, the weights it was filled with)
+        stored_skill_masks: Optional ({student_id: mask}, {position_id: mask}) of
+            the extracted/required skills, decoded from the database *_mask
+            columns; skills of rows missing there are parsed (see skill_masks)
+    
+    Returns: List of allocations (student_id, company_id, position_id, score, rank)
+    """
+    if weights != DEFAULT_WEIGHTS:
+        score_cache = None
+    return _run_sharded_allocation(_allocate_shard, students, positions, resume_texts, stats, progress,
+                                   workers, domains, score_cache, shard_args=(weights,),
+                                   stored_skill_masks=stored_skill_masks)
+
+
+def _run_sharded_allocation(allocate_shard, students, positions, resume_texts, stats, progress,
+                            workers, domains, score_cache, shard_args=(), allocation_phase='round_robin',
+                            stored_skill_masks=None):
+    """
+    Engine-independent part of an allocation run: resume validation, domain
+    sharding, running allocate_shard per shard (in a process pool when
+    workers > 1), the deterministic merge and the run report
+    
+    allocate_shard(domain_key, students, positions, resume_texts, score_cache, shard_skill_masks, *shard_args)
+    returns (allocations, eligible_student_ids, position_info, metrics) like
+    _allocate_shard, with metrics['<allocation_phase>_seconds'].
+    """
+    if resume_texts is None:
+        resume_texts = {}
+    if stats is None:
+        stats = {}
+    exclusions = stats.setdefault('exclusions', {})
+    timings = stats.setdefault('timings', {})
+    counters = Counter()
+    if progress is None:
+        progress = lambda phase, done, total: None
+    run_started = time.perf_counter()
+    counters_before = ENGINE_COUNTERS.copy()
+    
+    if domains is not None:
+        wanted = {normalize_domain(d) for d in domains}
+        positions = [p for p in positions if normalize_domain(p[2] or "") in wanted]
+        students = [s for s in students if normalize_domain(s[5] or "") in wanted]
+    
+    print("\n" + "=" * 80)
+    print("🔍 PHASE 1: STRICT RESUME VALIDATION (RESUME REQUIRED!)")
+    print("=" * 80)
+    
+    valid_students = []
+    no_resume_count = 0
+    fake_count = 0
+    
+    for index, student in enumerate(students):
+        progress('validation', index, len(students))
+        student_id = student[0]
+        resume_text = resume_texts.get(student_id, None)
+        
+        if not resume_text:
+            print(f"❌ Student {student_id} EXCLUDED: NO RESUME UPLOADED (MANDATORY)")
+            exclusions[student_id] = "No resume uploaded"
+            no_resume_count += 1
+            continue
+        
+        if isinstance(resume_text, ResumeFeatures):
+            is_fake, fake_reason = resume_text.spam_reason is not None, resume_text.spam_reason
+        else:
+            is_fake, fake_reason = is_resume_fake_or_spam(resume_text)
+        if is_fake:
+            print(f"❌ Student {student_id} EXCLUDED: {fake_reason}")
+            exclusions[student_id] = fake_reason
+            fake_count += 1
+            continue
+        
+        print(f"✅ Student {student_id}: Resume validated")
+        valid_students.append(student)
+    
+    print(f"\n📊 VALIDATION SUMMARY:")
+    print(f"   Total students: {len(students)}")
+    print(f"   Valid resumes: {len(valid_students)}")
+    print(f"   No resume (EXCLUDED): {no_resume_count}")
+    print(f"   Fake resumes (EXCLUDED): {fake_count}")
+    print(f"   Eligible for allocation: {len(valid_students)}")
+    
+    timings['validation'] = round(time.perf_counter() - run_started, 4)
+    counters.update(ENGINE_COUNTERS - counters_before)
+    counters['resumes_validated'] = len(students) - no_resume_count
+    stats['counters'] = counters
+    
+    if not valid_students:
+        print("\n⚠️ NO ELIGIBLE STUDENTS FOUND - ALLOCATION ABORTED")
+        timings['total'] = timings['validation']
+        stats['waitlists'] = {position[0]: [] for position in positions}
+        return []
+    
+    shards = shard_by_domain(valid_students, positions)
+    # One skill dictionary for the whole run, so every shard agrees on the bits
+    student_masks, position_masks = skill_masks(valid_students, positions, stored_skill_masks)
+    shard_jobs = [
+        (key, shard_students, shard_positions,
+         {s[0]: resume_texts[s[0]] for s in shard_students}, score_cache,
+         ({s[0]: student_masks[s[0]] for s in shard_students}, {p[0]: position_masks[p[0]] for p in shard_positions}),
+         *shard_args)
+        for key, (shard_students, shard_positions) in shards.items()
+    ]
+    # Largest shards first so parallel workers finish close together
+    shard_jobs.sort(key=lambda job: len(job[1]) * len(job[2]), reverse=True)
+    
+    print(f"\n🧩 {len(shard_jobs)} domain shard(s): "
+          f"{', '.join(f'{key or '(none)'}={len(s)}x{len(p)}' for key, s, p, *_ in shard_jobs)}")
+    
+    results = []
+    progress('scoring', 0, len(shard_jobs))
+    if workers > 1 and len(shard_jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shard_jobs))) as pool:
+            futures = [pool.submit(allocate_shard, *job) for job in shard_jobs]
+            for done, future in enumerate(as_completed(futures), 1):
+                results.append(future.result())
+                progress('scoring', done, len(shard_jobs))
+    else:
+        for done, job in enumerate(shard_jobs, 1):
+            results.append(allocate_shard(*job))
+            progress('scoring', done, len(shard_jobs))
+    
+    # ========== DETERMINISTIC MERGE ==========
+    progress('allocation', 0, 1)
+    merge_started = time.perf_counter()
+    position_order = {position[0]: index for index, position in enumerate(positions)}
+    merged = []
+    eligible_ids = set()
+    position_info = {}
+    shard_metrics = []
+    for shard_allocations, shard_eligible, shard_info, metrics in results:
+        merged.extend(shard_allocations)
+        eligible_ids |= shard_eligible
+        position_info.update(shard_info)
+        shard_metrics.append(metrics)
+    # Shard allocations lead with their round (rank for stable matching)
+    merged.sort(key=lambda a: (a[0], position_order[a[3]]))
+    allocations = [a[1:] for a in merged]
+    taken_students = {a[0] for a in allocations}
+    shard_metrics.sort(key=lambda m: m['domain'])
+    stats['shards'] = shard_metrics
+    stats['waitlists'] = {pid: info.waitlist for pid, info in position_info.items()}
+    
+    for m in shard_metrics:
+        counters.update(m['counters'])
+    counters['pairs_pruned_domain'] = (len(valid_students) * len(positions)
+                                       - sum(m['students'] * m['positions'] for m in shard_metrics))
+    timings['scoring'] = round(sum(m['scoring_seconds'] for m in shard_metrics), 4)
+    timings[allocation_phase] = round(sum(m[f'{allocation_phase}_seconds'] for m in shard_metrics), 4)
+    timings['merge'] = round(time.perf_counter() - merge_started, 4)
+    timings['total'] = round(time.perf_counter() - run_started, 4)
+    if score_cache is not None:
+        looked_up = counters['score_cache_hits'] + counters['score_cache_misses']
+        stats['score_cache_hit_rate'] = round(counters['score_cache_hits'] / looked_up, 4) if looked_up else 0.0
+    
     print("=" * 80)
     print("✅ ALLOCATION COMPLETE")
     print("=" * 80)
@@ -635,6 +1395,27 @@ def run_smart_allocation(students, positions, resume_texts=None):
     print(f"Students allocated: {len(taken_students)}")
     print(f"Students not allocated: {len(valid_students) - len(taken_students)}")
     
+    for student in valid_students:
+        sid = student[0]
+        if sid in taken_students:
+            continue
+        if sid in eligible_ids:
+            exclusions[sid] = "Eligible positions were filled by higher-ranked candidates"
+        else:
+            exclusions[sid] = NO_MATCH_REASON
+    
+    # Shard-wise metrics
+    print("\n🧩 SHARD METRICS:")
+    for m in shard_metrics:
+        print(f"   {m['domain'] or '(none)'}: {m['students']} students x {m['positions']} positions, "
+              f"{m['eligible_pairs']} eligible pairs, {m['allocated']} allocated in {m['seconds']:.3f}s")
+    
+    print("\n⏱️ TIMINGS: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()))
+    print("🔢 COUNTERS: " + ", ".join(f"{name}={value}" for name, value in sorted(counters.items())))
+    if score_cache is not None:
+        print(f"💾 SCORE CACHE: {counters['score_cache_hits']} hits, {counters['score_cache_misses']} misses "
+              f"(hit rate {stats['score_cache_hit_rate']:.1%})")
+    
     # Company-wise distribution
     print("\n📊 COMPANY-WISE DISTRIBUTION:")
     company_distribution = {}
@@ -648,13 +1429,191 @@ def run_smart_allocation(students, positions, resume_texts=None):
     # Position-wise distribution
     print("\n📋 POSITION-WISE DISTRIBUTION:")
     for pid, info in sorted(position_info.items()):
-        print(f"   Position {pid} (Company {info['company_id']}): {info['allocated']}/{info['max_positions']} filled")
+        print(f"   Position {pid} (Company {info.company_id}): {info.allocated}/{info.max_positions} filled")
     
     print("=" * 80 + "\n")
     
     return allocations
 
 
+# ============================================================================
+# STABLE MATCHING (student-proposing deferred acceptance)
+# ============================================================================
+# Students propose to positions in their own order of preference; a position
+# tentatively holds its best `positions` proposals ranked by
+# student_company_position_score and rejects the rest, and rejected students
+# propose to their next choice. The result has no blocking pair: no student
+# and position that both prefer each other to what they got. Each position's
+# held proposals are a min-heap on (score, input order), so the worst one is
+# found in O(1) and replaced in O(log C): O(E log C) over the E eligible pairs.
+
+def _stable_match_shard(domain_key, students, positions, resume_texts, score_cache=None, shard_skill_masks=None,
+                        preferences=None, weights=DEFAULT_WEIGHTS):
+    """
+    Score every pair of one domain shard and run deferred acceptance on it
+    
+    A student who ranked positions (preferences {student_id: [position_id, ...]},
+    best first) only proposes to the eligible ones among them; a student without
+    a ranking proposes to every eligible position, highest pair score first.
+    
+    Returns: like _allocate_shard; the leading "round" of each allocation is its
+             rank, so the merge interleaves positions the way round-robin does
+    """
+    started = time.perf_counter()
+    counters_before = ENGINE_COUNTERS.copy()
+    preferences = preferences or {}
+    
+    print("\n" + "=" * 80)
+    print(f"🎯 PHASE 2: CALCULATING MATCH SCORES [shard '{domain_key}']")
+    print("=" * 80)
+    
+    tally = Counter()
+    if shard_skill_masks is None:
+        shard_skill_masks = skill_masks(students, positions)
+    cached_scores, store_scores = _shard_score_cache(students, resume_texts, score_cache)
+    
+    # Eligible pairs as {student_id: {position_id: score}}
+    edges = {}
+    for position in positions:
+        cached, fresh, position_key = cached_scores(position)
+        for student_id, score in _scored_candidates(position, students, resume_texts, shard_skill_masks,
+                                                    tally, cached=cached, fresh=fresh, weights=weights):
+            edges.setdefault(student_id, {})[position[0]] = score
+        store_scores(position_key, fresh)
+    
+    scored_at = time.perf_counter()
+    
+    print("\n" + "=" * 80)
+    print(f"🤝 PHASE 3: STABLE MATCHING (DEFERRED ACCEPTANCE) [shard '{domain_key}']")
+    print("=" * 80)
+    
+    position_order = {position[0]: index for index, position in enumerate(positions)}
+    student_order = {student[0]: index for index, student in enumerate(students)}
+    choices = {}
+    for student in students:
+        scores = edges.get(student[0])
+        if not scores:
+            continue
+        ranked = preferences.get(student[0])
+        if ranked:
+            choices[student[0]] = [pid for pid in dict.fromkeys(ranked) if pid in scores]
+        else:
+            choices[student[0]] = sorted(scores, key=lambda pid: (-scores[pid], position_order[pid]))
+    
+    held = {position[0]: [] for position in positions}
+    capacity = {position[0]: position[5] for position in positions}
+    next_choice = dict.fromkeys(choices, 0)
+    free = [student[0] for student in reversed(students) if choices.get(student[0])]
+    proposals = 0
+    while free:
+        student_id = free.pop()
+        ranked = choices[student_id]
+        while next_choice[student_id] < len(ranked):
+            pid = ranked[next_choice[student_id]]
+            next_choice[student_id] += 1
+            proposals += 1
+            # Lower score (then later input order) is worse: the heap top is the first to go
+            proposal = (edges[student_id][pid], -student_order[student_id], student_id)
+            heap = held[pid]
+            if len(heap) < capacity[pid]:
+                heapq.heappush(heap, proposal)
+                break
+            if heap and proposal > heap[0]:
+                rejected = heapq.heapreplace(heap, proposal)[2]
+                print(f"   ↩️ Student {rejected} displaced from Position {pid} by Student {student_id}")
+                free.append(rejected)
+                break
+    
+    allocations = []
+    position_info = {}
+    for position in positions:
+        pid = position[0]
+        info = position_info[pid] = _PositionSlot(position)
+        for rank, (score, _, student_id) in enumerate(sorted(held[pid], reverse=True), 1):
+            allocations.append((rank, student_id, info.company_id, pid, score, rank))
+            print(f"   ✅ Student {student_id} → Company {info.company_id}, Position {pid} "
+                  f"(Rank #{rank}, Score: {score:.1f})")
+        info.allocated = info.current_rank = len(held[pid])
+    
+    # Waitlists: unmatched students who would accept the position, in the position's order
+    matched = {student_id for heap in held.values() for _, _, student_id in heap}
+    waiting = {}
+    for student_id, ranked in choices.items():
+        if student_id not in matched:
+            for pid in ranked:
+                waiting.setdefault(pid, []).append((edges[student_id][pid], -student_order[student_id], student_id))
+    for pid, entries in waiting.items():
+        position_info[pid].waitlist = [(student_id, score) for score, _, student_id
+                                       in heapq.nlargest(WAITLIST_SIZE, entries)]
+    
+    finished = time.perf_counter()
+    counters = ENGINE_COUNTERS - counters_before
+    counters['pairs_scored'] += tally['pairs_scored']
+    counters['pairs_pruned_cgpa'] += tally['pairs_pruned_cgpa']
+    counters['proposals'] += proposals
+    if score_cache is not None:
+        counters['score_cache_hits'] += tally['score_cache_hits']
+        counters['score_cache_misses'] += tally['score_cache_misses']
+    metrics = {
+        'domain': domain_key,
+        'students': len(students),
+        'positions': len(positions),
+        'pairs_scored': counters['pairs_scored'],
+        'pairs_pruned_cgpa': counters['pairs_pruned_cgpa'],
+        'eligible_pairs': tally['eligible_pairs'],
+        'candidates_kept': tally['eligible_pairs'],
+        'allocated': len(allocations),
+        'proposals': proposals,
+        'scoring_seconds': round(scored_at - started, 4),
+        'matching_seconds': round(finished - scored_at, 4),
+        'seconds': round(finished - started, 4),
+        'counters': dict(counters),
+    }
+    # Only students who proposed somewhere competed for a seat
+    return allocations, {sid for sid, ranked in choices.items() if ranked}, position_info, metrics
+
+
+def run_stable_allocation(students, positions, resume_texts=None, stats=None, progress=None,
+                          workers=1, domains=None, score_cache=None, preferences=None,
+                          weights=DEFAULT_WEIGHTS, stored_skill_masks=None):
+    """
+    STABLE MATCHING ALLOCATION (student-proposing Gale-Shapley)
+    
+    Same validation, domain sharding, arguments and output as
+    run_smart_allocation, but positions are filled by deferred acceptance
+    (see _stable_match_shard) instead of round-robin, so no student and
+    position would both rather be matched to each other.
+    
+    Args:
+        preferences: {student_id: [position_id, ...]} best first (see
+            database.load_preferences); students without one rank their
+            eligible positions by pair score
+        weights, stored_skill_masks: as for run_smart_allocation
+    
+    Returns: List of allocations (student_id, company_id, position_id, score, rank)
+    """
+    preferences = preferences or {}
+    if stats is None:
+        stats = {}
+    if weights != DEFAULT_WEIGHTS:
+        score_cache = None
+    allocations = _run_sharded_allocation(_stable_match_shard, students, positions, resume_texts, stats,
+                                          progress, workers, domains, score_cache,
+                                          shard_args=(preferences, weights), allocation_phase='matching',
+                                          stored_skill_masks=stored_skill_masks)
+    exclusions = stats['exclusions']
+    for student_id, reason in exclusions.items():
+        if reason == NO_MATCH_REASON and preferences.get(student_id):
+            exclusions[student_id] = NO_RANKED_MATCH_REASON
+    return allocations
+
+
+ALLOCATION_ENGINES = {
+    'round-robin': run_smart_allocation,
+    'stable': run_stable_allocation,
+}
+
+
 def analyze_resume_quality(text: str, domain: str = "General"):
     """
     Analyze resume quality with domain-specific skills
@@ -1,27 +1,53 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, send_file,
+                   Response, stream_with_context, abort, jsonify, g)
 from flask_mail import Mail, Message
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 from werkzeug.utils import secure_filename
-from functools import wraps
+from functools import partial, wraps
 import os
 import traceback
 import sqlite3
-import fitz  # PyMuPDF
+import tempfile
+import time
+import zipfile
 from ai_engine import (
+    ALLOCATION_ENGINES,
     extract_skills_from_text,
     analyze_resume_quality,
-    run_smart_allocation
+    explain_student_position_score,
+    extract_resume_features,
+    normalize_domain,
+    TermIndex
 )
 from email_utils import send_allocation_email, send_bulk_allocation_emails
-from openpyxl import Workbook
-import io
+from export_utils import DATASETS, build_export_query, iter_csv, spooled_xlsx
+from import_utils import IMPORTS, import_rows, read_rows
+from jobs import (RESUME_IMPORT_PHASES, SIMULATION_PHASES, STUDENT_DELETION_PHASES, UPLOAD_GC_PHASES,
+                  submit_run, get_run, get_latest_run)
+from pdf_utils import extract_text_from_pdf
+from resume_ingest import ingest_resume_zip
+from blob_store import blob_digest, discard_blob, store_blob
+from image_utils import THUMBNAIL_PREFIX, THUMBNAIL_SIZE, make_thumbnail, thumbnail_path
+from maintenance import (GC_GRACE_SECONDS, collect_orphaned_uploads, delete_student_rows,
+                         delete_students_job, remove_upload_files)
+from dedup_utils import duplicate_notes, find_duplicate_clusters, load_signatures, store_signature
+from search_utils import index_resume, search_resumes
+from database import (save_allocation_results, encode_skills, load_allocation_inputs, load_preferences,
+                      save_preferences, fill_vacancies, remove_from_waitlists)
+from score_cache import PairScoreCache
+from simulation import parse_variants, simulate
+import cache
+import metrics
+import query_log
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from io import BytesIO
 import base64
 
+# NOTE: fitz (PyMuPDF), Pillow, openpyxl and matplotlib are imported lazily inside the
+# helpers/routes that use them (fitz in pdf_utils, Pillow in image_utils). Each one costs tens of milliseconds and several
+# MB of RSS at import, which every gunicorn worker would otherwise pay on boot.
+# Check with: python benchmarks.py startup
+
 # ────────────────────────────────────────────────
 #  CONFIGURATION
 # ────────────────────────────────────────────────
@@ -31,6 +57,9 @@ app.secret_key = "super_secret_key_please_change_in_production"
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Browser cache lifetime of content-addressed uploads: a blob's bytes never change under its name
+app.config['UPLOAD_MAX_AGE'] = 365 * 24 * 60 * 60
+
 # Email configuration - FIXED WITH YOUR CREDENTIALS
 app.config['MAIL_SERVER']      = 'smtp.gmail.com'
 app.config['MAIL_PORT']        = 587
@@ -41,6 +70,25 @@ app.config['MAIL_DEFAULT_SENDER'] = 'bobxdev5@gmail.com'
 
 mail = Mail(app)
 
+# Processes used to allocate independent domain shards in parallel
+app.config['ALLOCATION_WORKERS'] = int(os.environ.get('ALLOCATION_WORKERS', 1))
+
+# Processes used to run what-if simulation variants (unset: one per variant, up to the CPU count)
+app.config['SIMULATION_WORKERS'] = int(os.environ['SIMULATION_WORKERS']) if os.environ.get('SIMULATION_WORKERS') else None
+
+# Processes used to hash passwords during bulk imports (/admin/import/<kind>)
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', os.cpu_count() or 1))
+
+# Bearer token that lets a Prometheus scraper read /admin/metrics without a session
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# Statements slower than this are logged with EXPLAIN QUERY PLAN (see /admin/debug/queries);
+# requests slower than SLOW_REQUEST_MS or issuing more than N_PLUS_ONE_QUERIES statements are logged
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 100))
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))
+app.config['N_PLUS_ONE_QUERIES'] = int(os.environ.get('N_PLUS_ONE_QUERIES', 20))
+query_log.configure(slow_query_ms=app.config['SLOW_QUERY_MS'])
+
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif'}
 
 # ────────────────────────────────────────────────
@@ -50,8 +98,8 @@ ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def role_required(required_role):
-    """Decorator to ensure user has the correct role"""
+def role_required(*allowed_roles):
+    """Decorator to ensure user has one of the allowed roles"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
@@ -59,8 +107,8 @@ def role_required(required_role):
                 flash("Please log in to access this page.", "error")
                 return redirect(url_for('login'))
             
-            if session.get('role') != required_role:
-                flash(f"Access denied. This page is for {required_role}s only.", "error")
+            if session.get('role') not in allowed_roles:
+                flash(f"Access denied. This page is for {' and '.join(r + 's' for r in allowed_roles)} only.", "error")
                 return render_template('403.html'), 403
             
             return f(*args, **kwargs)
@@ -68,19 +116,69 @@ def role_required(required_role):
     return decorator
 
 def get_connection():
-    return sqlite3.connect("platform.db")
+    return sqlite3.connect("platform.db", factory=query_log.ProfiledConnection)
+
+def with_thumbnails(rows, column):
+    """Rows with the upload path in `column` replaced by its thumbnail path, for list views"""
+    return [row[:column] + (thumbnail_path(row[column]),) + row[column + 1:] for row in rows]
+
+app.jinja_env.globals['thumbnail_path'] = thumbnail_path
+
+def promote_waitlisted(conn, position_id, trigger):
+    """fill_vacancies() for a position that just gained a free seat; logs and counts each promotion"""
+    promoted = fill_vacancies(conn, position_id)
+    for student_id, score, rank in promoted:
+        print(f"[WAITLIST] Student {student_id} promoted to position {position_id} "
+              f"(Rank #{rank}, Score: {score:.1f}) after {trigger}")
+    if promoted:
+        metrics.inc('waitlist_promotions_total', len(promoted), labels={'trigger': trigger})
+    return promoted
+
+def get_pyplot():
+    """Import matplotlib with the headless Agg backend on first use"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+# ────────────────────────────────────────────────
+#  REQUEST INSTRUMENTATION
+# ────────────────────────────────────────────────
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+    query_log.begin_request()
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    endpoint = request.endpoint or 'unmatched'
+    stats = query_log.end_request(endpoint)
+    if started is None or stats is None:
+        return response
+
+    elapsed = time.monotonic() - started
+    labels = {'endpoint': endpoint, 'method': request.method, 'status': response.status_code}
+    metrics.observe('http_request_duration_seconds', elapsed, labels=labels)
+    metrics.observe('http_request_sql_seconds', stats['sql_seconds'], labels={'endpoint': endpoint})
+    metrics.observe('http_request_queries', stats['queries'], labels={'endpoint': endpoint},
+                    buckets=metrics.QUERY_COUNT_BUCKETS)
+
+    # Visible in the browser dev tools' timing tab
+    response.headers['Server-Timing'] = (
+        f'db;dur={stats["sql_seconds"] * 1000:.1f};desc="{stats["queries"]} queries", '
+        f'total;dur={elapsed * 1000:.1f}'
+    )
+
+    if (elapsed * 1000 >= app.config['SLOW_REQUEST_MS']
+            or stats['queries'] > app.config['N_PLUS_ONE_QUERIES']):
+        print(f"[SLOW REQUEST] {request.method} {request.path} -> {response.status_code} "
+              f"{elapsed * 1000:.1f} ms | {stats['queries']} queries, "
+              f"{stats['sql_seconds'] * 1000:.1f} ms in SQLite, {stats['slow_queries']} slow")
+    return response
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF using PyMuPDF"""
-    try:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text.strip()
-    except Exception as e:
-        print(f"[PDF ERROR] {str(e)}")
-        return ""
 
 # ────────────────────────────────────────────────
 #  ROUTES
@@ -184,6 +282,7 @@ def register():
                 elif role == 'company':
                     conn.execute("INSERT INTO company_profile (user_id) VALUES (?)", (user_id,))
 
+                cache.invalidate(conn, 'students' if role == 'student' else 'companies')
                 conn.commit()
 
                 print(f"[REGISTRATION SUCCESS] {email} registered as {role}")
@@ -246,13 +345,10 @@ def student_dashboard():
             # Handle resume upload with AI analysis
             if resume_file and allowed_file(resume_file.filename):
                 filename = secure_filename(resume_file.filename)
-                new_resume_path = os.path.join('students/resumes', f"{session['user_id']}_{filename}")
+                new_resume_path, created = store_blob(app.config['UPLOAD_FOLDER'], resume_file.stream, filename)
                 full_path = os.path.join(app.config['UPLOAD_FOLDER'], new_resume_path)
-                
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                resume_file.save(full_path)
 
-                # Extract and analyze resume
+                # Extract and analyze resume (text is cached under the file's content hash)
                 resume_text = extract_text_from_pdf(full_path)
                 
                 if resume_text:
@@ -295,14 +391,16 @@ def student_dashboard():
                     
                     if resume_score >= 50:
                         resume_path = new_resume_path
+                        index_resume(conn, session['user_id'], resume_text)
+                        store_signature(conn, session['user_id'], resume_text)
                         feedback_lines.append("")
                         feedback_lines.append("✅ Resume accepted and saved!")
                         if extracted_skills:
                             feedback_lines.append(f"🤖 Extracted Skills: {extracted_skills}")
                     else:
-                        # Delete rejected resume
-                        if os.path.exists(full_path):
-                            os.remove(full_path)
+                        # Delete rejected resume, unless another profile holds the same file
+                        if created:
+                            discard_blob(conn, app.config['UPLOAD_FOLDER'], new_resume_path)
                         feedback_lines.append("")
                         feedback_lines.append("❌ Resume score too low (minimum 50/100 required)")
                         feedback_lines.append("Please improve your resume and try again.")
@@ -311,15 +409,13 @@ def student_dashboard():
                 else:
                     feedback_message = "❌ Could not extract text from PDF. Please ensure it's a valid resume."
                     resume_score = 0
+                    if created:
+                        discard_blob(conn, app.config['UPLOAD_FOLDER'], new_resume_path)
 
             # Handle photo upload
             if photo_file and allowed_file(photo_file.filename):
                 filename = secure_filename(photo_file.filename)
-                photo_path = os.path.join('students/photos', f"{session['user_id']}_{filename}")
-                full_path = os.path.join(app.config['UPLOAD_FOLDER'], photo_path)
-                
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                photo_file.save(full_path)
+                photo_path, _ = store_blob(app.config['UPLOAD_FOLDER'], photo_file.stream, filename)
 
             # Update profile
             try:
@@ -327,10 +423,13 @@ def student_dashboard():
                     UPDATE student_profile 
                     SET skills = ?, cgpa = ?, interest_domain = ?, 
                         experience_years = ?, resume_path = ?, 
-                        past_education = ?, profile_photo = ?, extracted_skills = ?
+                        past_education = ?, profile_photo = ?, extracted_skills = ?,
+                        skills_mask = ?, extracted_skills_mask = ?
                     WHERE user_id = ?
                 """, (skills, cgpa, interest_domain, experience_years, 
-                      resume_path, past_education, photo_path, extracted_skills, session['user_id']))
+                      resume_path, past_education, photo_path, extracted_skills,
+                      encode_skills(conn, skills), encode_skills(conn, extracted_skills), session['user_id']))
+                cache.invalidate(conn, f"student:{session['user_id']}", 'students')
                 conn.commit()
 
                 if not feedback_message:
@@ -340,23 +439,30 @@ def student_dashboard():
                 flash(f'Error updating profile: {str(e)}', 'error')
                 print(f"[PROFILE UPDATE ERROR] {str(e)}")
 
-    # Get profile data
+    # Get profile data (cached per student until one of its scopes is invalidated)
+    user_id = session['user_id']
+    own_scope = f"student:{user_id}"
     with get_connection() as conn:
-        profile = conn.execute("""
-            SELECT skills, cgpa, interest_domain, experience_years, 
-                   resume_path, past_education, profile_photo, extracted_skills
-            FROM student_profile 
-            WHERE user_id = ?
-        """, (session['user_id'],)).fetchone()
+        generations = cache.load_generations(conn, [own_scope, 'allocations', 'companies', 'positions'])
+
+        profile = cache.read_through('student_profile', ('student', user_id), [own_scope], generations,
+            lambda: conn.execute("""
+                SELECT skills, cgpa, interest_domain, experience_years, 
+                       resume_path, past_education, profile_photo, extracted_skills
+                FROM student_profile 
+                WHERE user_id = ?
+            """, (user_id,)).fetchone())
 
         # Get allocation data
-        allocation = conn.execute("""
-            SELECT cp.company_name, pos.domain, a.score, a.rank, pos.stipend, cp.location
-            FROM allocations a
-            JOIN company_profile cp ON a.company_id = cp.user_id
-            JOIN company_positions pos ON a.position_id = pos.position_id
-            WHERE a.student_id = ?
-        """, (session['user_id'],)).fetchone()
+        allocation = cache.read_through('student_allocation', ('student', user_id),
+                                        ['allocations', 'companies', 'positions'], generations,
+            lambda: conn.execute("""
+                SELECT cp.company_name, pos.domain, a.score, a.rank, pos.stipend, cp.location
+                FROM allocations a
+                JOIN company_profile cp ON a.company_id = cp.user_id
+                JOIN company_positions pos ON a.position_id = pos.position_id
+                WHERE a.student_id = ?
+            """, (user_id,)).fetchone())
 
     return render_template('student_dashboard.html', 
                           profile=profile, 
@@ -366,6 +472,91 @@ def student_dashboard():
                           detailed_feedback=detailed_feedback)
 
 
+@app.route('/student/preferences', methods=['GET', 'POST'])
+@role_required('student')
+def student_preferences():
+    """
+    The student's ranking of positions, used by the stable matching engine
+
+    POST a JSON {"position_ids": [...]} (or repeated `position_id` form fields),
+    first choice first, to replace the ranking; an empty list clears it.
+    """
+    user_id = session['user_id']
+    with get_connection() as conn:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True) or {}
+            raw_ids = payload.get('position_ids', request.form.getlist('position_id'))
+            try:
+                if not isinstance(raw_ids, list):
+                    raise TypeError
+                position_ids = [int(position_id) for position_id in raw_ids]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'position_ids must be a list of position IDs'}), 400
+            known = {row[0] for row in conn.execute(
+                f"SELECT position_id FROM company_positions WHERE position_id IN ({','.join('?' * len(position_ids))})",
+                position_ids)}
+            unknown = [position_id for position_id in position_ids if position_id not in known]
+            if unknown:
+                return jsonify({'error': f'Unknown position(s): {unknown}'}), 400
+            save_preferences(conn, user_id, position_ids)
+            conn.commit()
+            print(f"[PREFERENCES] Student {user_id} ranked {len(set(position_ids))} position(s)")
+
+        domain = conn.execute("SELECT interest_domain FROM student_profile WHERE user_id = ?",
+                              (user_id,)).fetchone()
+        ranks = dict(conn.execute("SELECT position_id, rank FROM preferences WHERE student_id = ?", (user_id,)))
+        positions = conn.execute("""
+            SELECT pos.position_id, cp.company_name, pos.domain, pos.required_skills,
+                   pos.min_cgpa, pos.positions, pos.stipend
+            FROM company_positions pos
+            LEFT JOIN company_profile cp ON cp.user_id = pos.company_id
+        """).fetchall()
+
+    student_domain = normalize_domain(domain[0] or "") if domain else ""
+    records = [dict(zip(['position_id', 'company_name', 'domain', 'required_skills', 'min_cgpa',
+                         'openings', 'stipend'], row), rank=ranks.get(row[0]))
+               for row in positions
+               if row[0] in ranks or normalize_domain(row[2] or "") == student_domain]
+    return jsonify({
+        'preferences': sorted((r for r in records if r['rank'] is not None), key=lambda r: r['rank']),
+        'available': [r for r in records if r['rank'] is None],
+    })
+
+
+@app.route('/student/withdraw', methods=['POST'])
+@role_required('student')
+def student_withdraw():
+    """Give up the student's allocated seat; the next waitlisted candidate takes it"""
+    user_id = session['user_id']
+    with get_connection() as conn:
+        seat = conn.execute("""
+            SELECT a.position_id, cp.company_name
+            FROM allocations a
+            JOIN company_profile cp ON cp.user_id = a.company_id
+            WHERE a.student_id = ?
+        """, (user_id,)).fetchone()
+
+        if not seat:
+            flash('You have no allocation to withdraw from.', 'warning')
+            return redirect(url_for('student_dashboard'))
+
+        try:
+            conn.execute("DELETE FROM allocations WHERE student_id = ?", (user_id,))
+            remove_from_waitlists(conn, student_ids=[user_id])
+            conn.execute("INSERT OR REPLACE INTO allocation_exclusions (student_id, reason) VALUES (?, ?)",
+                         (user_id, "Withdrew from allocation"))
+            promote_waitlisted(conn, seat[0], 'withdrawal')
+            cache.invalidate(conn, 'allocations')
+            conn.commit()
+            flash(f'You have withdrawn from your allocation at {seat[1]}.', 'success')
+            print(f"[WITHDRAWAL] Student {user_id} withdrew from position {seat[0]}")
+        except Exception as e:
+            flash(f'Error withdrawing: {str(e)}', 'error')
+            print(f"[WITHDRAWAL ERROR] {str(e)}")
+
+    return redirect(url_for('student_dashboard'))
+
+
 # ────────────────────────────────────────────────
 #  COMPANY ROUTES
 # ────────────────────────────────────────────────
@@ -387,9 +578,11 @@ def company_dashboard():
                 try:
                     conn.execute("""
                         INSERT INTO company_positions 
-                        (company_id, domain, required_skills, min_cgpa, positions, stipend)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (session['user_id'], domain, required_skills, min_cgpa, positions, stipend))
+                        (company_id, domain, required_skills, min_cgpa, positions, stipend, required_skills_mask)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (session['user_id'], domain, required_skills, min_cgpa, positions, stipend,
+                          encode_skills(conn, required_skills)))
+                    cache.invalidate(conn, f"company:{session['user_id']}", 'positions')
                     conn.commit()
                     flash('Position added successfully!', 'success')
                 except Exception as e:
@@ -412,11 +605,7 @@ def company_dashboard():
 
                 if logo_file and allowed_file(logo_file.filename):
                     filename = secure_filename(logo_file.filename)
-                    logo_path = os.path.join('companies/logos', f"{session['user_id']}_{filename}")
-                    full_path = os.path.join(app.config['UPLOAD_FOLDER'], logo_path)
-                    
-                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                    logo_file.save(full_path)
+                    logo_path, _ = store_blob(app.config['UPLOAD_FOLDER'], logo_file.stream, filename)
 
                 try:
                     conn.execute("""
@@ -426,36 +615,45 @@ def company_dashboard():
                         WHERE user_id = ?
                     """, (company_name, location, contact_email, contact_no, 
                           logo_path, session['user_id']))
+                    cache.invalidate(conn, f"company:{session['user_id']}", 'companies')
                     conn.commit()
                     flash('Company profile updated successfully!', 'success')
                 except Exception as e:
                     flash(f'Error updating profile: {str(e)}', 'error')
 
-    # Get company data
+    # Get company data (cached per company until one of its scopes is invalidated)
+    user_id = session['user_id']
+    own_scope = f"company:{user_id}"
     with get_connection() as conn:
-        profile = conn.execute("""
-            SELECT company_name, location, contact_email, contact_no, profile_logo
-            FROM company_profile 
-            WHERE user_id = ?
-        """, (session['user_id'],)).fetchone()
-
-        positions = conn.execute("""
-            SELECT position_id, company_id, domain, required_skills, min_cgpa, positions, stipend
-            FROM company_positions 
-            WHERE company_id = ?
-        """, (session['user_id'],)).fetchall()
-
-        allocated_students = conn.execute("""
-            SELECT u.name, sp.skills, sp.cgpa, sp.interest_domain, 
-                   a.score, a.rank, sp.resume_path, sp.experience_years,
-                   sp.profile_photo, pos.domain
-            FROM allocations a
-            JOIN users u ON a.student_id = u.user_id
-            JOIN student_profile sp ON a.student_id = sp.user_id
-            JOIN company_positions pos ON a.position_id = pos.position_id
-            WHERE a.company_id = ?
-            ORDER BY a.rank
-        """, (session['user_id'],)).fetchall()
+        generations = cache.load_generations(conn, [own_scope, 'allocations', 'students', 'positions'])
+
+        profile = cache.read_through('company_profile', ('company', user_id), [own_scope], generations,
+            lambda: conn.execute("""
+                SELECT company_name, location, contact_email, contact_no, profile_logo
+                FROM company_profile 
+                WHERE user_id = ?
+            """, (user_id,)).fetchone())
+
+        positions = cache.read_through('company_positions', ('company', user_id), [own_scope], generations,
+            lambda: conn.execute("""
+                SELECT position_id, company_id, domain, required_skills, min_cgpa, positions, stipend
+                FROM company_positions 
+                WHERE company_id = ?
+            """, (user_id,)).fetchall())
+
+        allocated_students = cache.read_through('company_allocations', ('company', user_id),
+                                                ['allocations', 'students', 'positions'], generations,
+            lambda: with_thumbnails(conn.execute("""
+                SELECT u.name, sp.skills, sp.cgpa, sp.interest_domain, 
+                       a.score, a.rank, sp.resume_path, sp.experience_years,
+                       sp.profile_photo, pos.domain
+                FROM allocations a
+                JOIN users u ON a.student_id = u.user_id
+                JOIN student_profile sp ON a.student_id = sp.user_id
+                JOIN company_positions pos ON a.position_id = pos.position_id
+                WHERE a.company_id = ?
+                ORDER BY a.rank
+            """, (user_id,)).fetchall(), 8))
 
     return render_template('company_dashboard.html', 
                           profile=profile, 
@@ -463,6 +661,88 @@ def company_dashboard():
                           allocated_students=allocated_students)
 
 
+@app.route('/company/position/delete/<int:position_id>', methods=['POST'])
+@role_required('company')
+def delete_position(position_id):
+    """Delete a position posted by the company"""
+    with get_connection() as conn:
+        # Verify the position belongs to this company
+        position = conn.execute("""
+            SELECT position_id FROM company_positions 
+            WHERE position_id = ? AND company_id = ?
+        """, (position_id, session['user_id'])).fetchone()
+        
+        if not position:
+            flash('Position not found or unauthorized access.', 'error')
+            return redirect(url_for('company_dashboard'))
+        
+        # Delete the position
+        try:
+            conn.execute("DELETE FROM company_positions WHERE position_id = ?", (position_id,))
+            conn.execute("DELETE FROM preferences WHERE position_id = ?", (position_id,))
+            remove_from_waitlists(conn, position_ids=[position_id])
+            cache.invalidate(conn, f"company:{session['user_id']}", 'positions')
+            conn.commit()
+            flash('Position deleted successfully!', 'success')
+        except Exception as e:
+            flash(f'Error deleting position: {str(e)}', 'error')
+    
+    return redirect(url_for('company_dashboard'))
+
+
+@app.route('/company/position/edit/<int:position_id>', methods=['GET', 'POST'])
+@role_required('company')
+def edit_position(position_id):
+    """Edit a position posted by the company"""
+    with get_connection() as conn:
+        # Verify the position belongs to this company
+        position = conn.execute("""
+            SELECT position_id, domain, required_skills, min_cgpa, positions, stipend
+            FROM company_positions 
+            WHERE position_id = ? AND company_id = ?
+        """, (position_id, session['user_id'])).fetchone()
+        
+        if not position:
+            flash('Position not found or unauthorized access.', 'error')
+            return redirect(url_for('company_dashboard'))
+        
+        if request.method == 'POST':
+            domain = request.form.get('domain', '').strip()
+            required_skills = request.form.get('required_skills', '').strip()
+            min_cgpa = float(request.form.get('min_cgpa', 0))
+            positions_count = int(request.form.get('positions', 0))
+            stipend = int(request.form.get('stipend', 0))
+            
+            try:
+                conn.execute("""
+                    UPDATE company_positions 
+                    SET domain = ?, required_skills = ?, min_cgpa = ?, positions = ?, stipend = ?,
+                        required_skills_mask = ?
+                    WHERE position_id = ?
+                """, (domain, required_skills, min_cgpa, positions_count, stipend,
+                      encode_skills(conn, required_skills), position_id))
+                if (domain, required_skills, min_cgpa) != (position[1], position[2], position[3]):
+                    # The waitlist was scored against the old requirements
+                    remove_from_waitlists(conn, position_ids=[position_id])
+                elif positions_count > (position[4] or 0):
+                    promote_waitlisted(conn, position_id, 'capacity increase')
+                cache.invalidate(conn, f"company:{session['user_id']}", 'positions')
+                conn.commit()
+                flash('Position updated successfully!', 'success')
+                return redirect(url_for('company_dashboard'))
+            except Exception as e:
+                flash(f'Error updating position: {str(e)}', 'error')
+        
+        # Get company profile for the edit page
+        profile = conn.execute("""
+            SELECT company_name, location, contact_email, contact_no, profile_logo
+            FROM company_profile 
+            WHERE user_id = ?
+        """, (session['user_id'],)).fetchone()
+    
+    return render_template('edit_position.html', position=position, profile=profile)
+
+
 # ────────────────────────────────────────────────
 #  ADMIN ROUTES
 # ────────────────────────────────────────────────
@@ -471,165 +751,428 @@ def company_dashboard():
 @role_required('admin')
 def admin_dashboard():
     """Admin dashboard showing all users and allocations"""
+    admin_key = ('admin', session['user_id'])
     with get_connection() as conn:
-        students = conn.execute("""
-            SELECT u.user_id, u.name, u.email, sp.skills, sp.cgpa, 
-                   sp.interest_domain, sp.experience_years, sp.resume_path, sp.profile_photo
-            FROM users u 
-            LEFT JOIN student_profile sp ON u.user_id = sp.user_id
-            WHERE u.role = 'student'
-            ORDER BY u.name
-        """).fetchall()
+        generations = cache.load_generations(conn, ['students', 'companies', 'positions', 'allocations'])
 
-        companies = conn.execute("""
-            SELECT u.user_id, u.name, u.email, cp.company_name, cp.location
-            FROM users u 
-            LEFT JOIN company_profile cp ON u.user_id = cp.user_id
-            WHERE u.role = 'company'
-            ORDER BY u.name
-        """).fetchall()
+        students = cache.read_through('admin_students', admin_key, ['students'], generations,
+            lambda: with_thumbnails(conn.execute("""
+                SELECT u.user_id, u.name, u.email, sp.skills, sp.cgpa, 
+                       sp.interest_domain, sp.experience_years, sp.resume_path, sp.profile_photo
+                FROM users u 
+                LEFT JOIN student_profile sp ON u.user_id = sp.user_id
+                WHERE u.role = 'student'
+                ORDER BY u.name
+            """).fetchall(), 8))
+
+        companies = cache.read_through('admin_companies', admin_key, ['companies'], generations,
+            lambda: conn.execute("""
+                SELECT u.user_id, u.name, u.email, cp.company_name, cp.location
+                FROM users u 
+                LEFT JOIN company_profile cp ON u.user_id = cp.user_id
+                WHERE u.role = 'company'
+                ORDER BY u.name
+            """).fetchall())
         
         # Get positions for each company
-        company_positions = conn.execute("""
-            SELECT company_id, COUNT(*) as position_count, SUM(positions) as total_openings
-            FROM company_positions
-            GROUP BY company_id
-        """).fetchall()
+        company_positions = cache.read_through('admin_position_counts', admin_key, ['positions'], generations,
+            lambda: conn.execute("""
+                SELECT company_id, COUNT(*) as position_count, SUM(positions) as total_openings
+                FROM company_positions
+                GROUP BY company_id
+            """).fetchall())
         
         # Convert to dict for easy lookup
         positions_dict = {cp[0]: {'count': cp[1], 'openings': cp[2]} for cp in company_positions}
 
-        allocations = conn.execute("""
-            SELECT u.name, cp.company_name, pos.domain, a.score, a.rank,
-                   a.student_id, sp.resume_path, u.email, sp.profile_photo, sp.skills, sp.cgpa
-            FROM allocations a
-            JOIN users u ON a.student_id = u.user_id
-            JOIN company_profile cp ON a.company_id = cp.user_id
-            JOIN company_positions pos ON a.position_id = pos.position_id
-            JOIN student_profile sp ON a.student_id = sp.user_id
-            ORDER BY a.rank
-        """).fetchall()
+        allocations = cache.read_through('admin_allocations', admin_key,
+                                         ['allocations', 'students', 'companies', 'positions'], generations,
+            lambda: with_thumbnails(conn.execute("""
+                SELECT u.name, cp.company_name, pos.domain, a.score, a.rank,
+                       a.student_id, sp.resume_path, u.email, sp.profile_photo, sp.skills, sp.cgpa
+                FROM allocations a
+                JOIN users u ON a.student_id = u.user_id
+                JOIN company_profile cp ON a.company_id = cp.user_id
+                JOIN company_positions pos ON a.position_id = pos.position_id
+                JOIN student_profile sp ON a.student_id = sp.user_id
+                ORDER BY a.rank
+            """).fetchall(), 8))
+
+        duplicate_clusters = cache.read_through('admin_duplicate_clusters', admin_key, ['students'], generations,
+            lambda: find_duplicate_clusters(load_signatures(conn)))
+
+    latest_run = get_latest_run(get_connection)
 
     return render_template('admin_dashboard.html', 
                           students=students, 
                           companies=companies,
                           company_positions=positions_dict,
-                          allocations=allocations)
+                          allocations=allocations,
+                          duplicate_clusters=duplicate_clusters,
+                          latest_run=latest_run)
+
+
+def perform_allocation(reporter, send_emails=False, engine='round-robin'):
+    """
+    Full allocation pipeline, executed as a background job (see jobs.submit_run)
+
+    Loads students/positions/resumes, runs the allocation with the chosen
+    ai_engine.ALLOCATION_ENGINES engine, replaces the allocations table in a
+    single transaction and optionally sends emails.
+    Returns a summary dict stored on the allocation_runs row.
+    """
+    print("\n" + "="*80)
+    print(f"🚀 STARTING ALLOCATION PROCESS (run #{reporter.run_id})")
+    print(f"📧 Send emails: {send_emails}")
+    print(f"⚙️ Engine: {engine}")
+    print("="*80 + "\n")
+
+    phase_timings = {}
+    counters = {}
+    loading_started = time.monotonic()
+    reporter.phase('loading')
+    with get_connection() as conn:
+        students, positions, stored_skill_masks = load_allocation_inputs(conn)
+        signatures = load_signatures(conn)
+        engine_options = {'preferences': load_preferences(conn)} if engine == 'stable' else {}
+
+    if not students or not positions:
+        return {'allocated': 0, 'message': 'Nothing to allocate: no students or no positions.'}
+
+    # Reduce each resume to its feature record as soon as it is parsed, so at most
+    # one resume text is alive at a time (resume_path is already part of the student row)
+    term_index = TermIndex(positions)
+    resume_features = {}
+    backfilled = 0
+    with get_connection() as conn:
+        for index, student in enumerate(students):
+            reporter.progress('loading', index, len(students))
+            if not student[7]:
+                continue
+            full_path = os.path.join(app.config['UPLOAD_FOLDER'], student[7])
+            if not os.path.exists(full_path):
+                continue
+            resume_text = extract_text_from_pdf(full_path)
+            if not resume_text:
+                continue
+            if student[0] not in signatures:
+                # Signature missing for an upload older than duplicate detection
+                signature = store_signature(conn, student[0], resume_text)
+                if signature is not None:
+                    signatures[student[0]] = signature
+                    backfilled += 1
+            resume_features[student[0]] = extract_resume_features(resume_text, student[5], term_index)
+            del resume_text
+        conn.commit()
+    counters['pdfs_parsed'] = len(resume_features)
+    counters['signatures_backfilled'] = backfilled
+    phase_timings['loading'] = time.monotonic() - loading_started
+
+    # Near-duplicate resumes (MinHash/LSH)
+    duplicates_started = time.monotonic()
+    reporter.phase('duplicates')
+    duplicate_clusters = find_duplicate_clusters(
+        {sid: signatures[sid] for sid in resume_features if sid in signatures})
+    del signatures
+    counters['duplicate_resumes'] = sum(len(cluster['student_ids']) for cluster in duplicate_clusters)
+    phase_timings['duplicates'] = time.monotonic() - duplicates_started
+
+    # Run allocation algorithm
+    allocation_stats = {}
+    score_cache = PairScoreCache("platform.db")
+    try:
+        allocations = ALLOCATION_ENGINES[engine](students, positions, resume_features,
+                                                 stats=allocation_stats, progress=reporter.progress,
+                                                 workers=app.config['ALLOCATION_WORKERS'],
+                                                 score_cache=score_cache, stored_skill_masks=stored_skill_masks,
+                                                 **engine_options)
+        # Every student and position took part, so anything else in the cache is stale
+        counters['score_cache_pruned'] = score_cache.prune(students, positions, resume_features)
+    finally:
+        score_cache.close()
+
+    phase_timings.update((phase, seconds) for phase, seconds in allocation_stats.get('timings', {}).items()
+                         if phase != 'total')
+    counters.update(allocation_stats.get('counters', {}))
+    counters['waitlisted'] = sum(len(waiting) for waiting in allocation_stats.get('waitlists', {}).values())
+
+    # Flag near-duplicates (they are not excluded for it): in the exclusion report
+    # for unallocated students, in the run summary for allocated ones
+    exclusions = allocation_stats['exclusions']
+    allocated_duplicates = {}
+    for sid, note in duplicate_notes(duplicate_clusters).items():
+        if sid in exclusions:
+            exclusions[sid] = f"{exclusions[sid]}; {note}"
+        else:
+            allocated_duplicates[str(sid)] = note
+
+    persistence_started = time.monotonic()
+    reporter.phase('persistence')
+    email_data_list = []
+    with get_connection() as conn:
+        save_allocation_results(conn, allocations, allocation_stats['exclusions'],
+                                waitlists=allocation_stats.get('waitlists', {}))
+
+        # Prepare email data if sending emails
+        if send_emails:
+            email_data_list = [{
+                'student_email': row[0],
+                'student_name': row[1],
+                'company_name': row[2],
+                'location': row[3] or 'Not specified',
+                'domain': row[4],
+                'stipend': row[5],
+                'rank': row[6],
+                'match_score': int(row[7])
+            } for row in conn.execute("""
+                SELECT u.email, u.name, cp.company_name, cp.location, pos.domain, pos.stipend,
+                       a.rank, a.score
+                FROM allocations a
+                JOIN users u ON u.user_id = a.student_id
+                JOIN company_profile cp ON cp.user_id = a.company_id
+                JOIN company_positions pos ON pos.position_id = a.position_id
+            """)]
+    phase_timings['persistence'] = time.monotonic() - persistence_started
+
+    summary = {'engine': engine,
+               'allocated': len(allocations), 'excluded': len(allocation_stats['exclusions']),
+               'shards': allocation_stats.get('shards', []),
+               'score_cache_hit_rate': allocation_stats.get('score_cache_hit_rate'),
+               'duplicate_clusters': [cluster['student_ids'] for cluster in duplicate_clusters],
+               'allocated_duplicates': allocated_duplicates}
+    email_status = ""
+
+    # Send emails if enabled
+    if send_emails and email_data_list:
+        email_started = time.monotonic()
+        reporter.phase('emails')
+        print(f"\n📧 Sending {len(email_data_list)} allocation emails...")
+        success_count, failed_count, errors = send_bulk_allocation_emails(
+            mail, email_data_list,
+            progress=lambda done, total: reporter.progress('emails', done, total)
+        )
+        summary.update(emails_sent=success_count, emails_failed=failed_count)
+        counters.update(emails_sent=success_count, emails_failed=failed_count)
+        email_status = f" | Emails sent: {success_count}, Failed: {failed_count}"
+        phase_timings['email'] = time.monotonic() - email_started
+
+        if failed_count > 0:
+            print(f"⚠️ Email failures:")
+            for error in errors:
+                print(f"   - {error['student']}: {error['error']}")
+
+    summary['timings'] = {phase: round(seconds, 4) for phase, seconds in phase_timings.items()}
+    summary['counters'] = counters
+    record_allocation_metrics(phase_timings, counters)
+
+    summary['message'] = f'Allocation completed! {len(allocations)} students matched{email_status}'
+    print(f"\n✅ Allocation complete: {len(allocations)} matches made\n")
+    return summary
+
+
+def record_allocation_metrics(phase_timings, counters):
+    """Publish the timings/counters of a finished allocation run to /admin/metrics"""
+    for phase, seconds in phase_timings.items():
+        metrics.set_gauge('allocation_phase_seconds', seconds, labels={'phase': phase})
+    for name, value in counters.items():
+        metrics.set_gauge('allocation_last_run_count', value, labels={'counter': name})
+        metrics.inc('allocation_count_total', value, labels={'counter': name})
 
 
 @app.route('/admin/allocate', methods=['POST'])
 @role_required('admin')
 def admin_allocate():
-    """Run allocation algorithm with email notifications"""
+    """Submit an allocation run as a background job (single-flight)"""
     send_emails = request.form.get('send_emails') == 'on'
-    
-    print("\n" + "="*80)
-    print("🚀 STARTING ALLOCATION PROCESS")
-    print(f"📧 Send emails: {send_emails}")
-    print("="*80 + "\n")
-    
+    engine = request.form.get('engine', 'round-robin')
+    if engine not in ALLOCATION_ENGINES:
+        flash(f"Unknown allocation engine '{engine}'.", 'error')
+        return redirect(url_for('admin_dashboard'))
+
     with get_connection() as conn:
-        # Get all students with profiles
-        students = conn.execute("""
-            SELECT u.user_id, u.name, u.email, sp.skills, sp.cgpa, 
-                   sp.interest_domain, sp.experience_years, sp.resume_path,
-                   sp.profile_photo, sp.extracted_skills
-            FROM users u
+        has_students = conn.execute("""
+            SELECT 1 FROM users u
             JOIN student_profile sp ON u.user_id = sp.user_id
-            WHERE u.role = 'student' AND sp.cgpa IS NOT NULL
-        """).fetchall()
+            WHERE u.role = 'student' AND sp.cgpa IS NOT NULL LIMIT 1
+        """).fetchone()
+        has_positions = conn.execute("SELECT 1 FROM company_positions LIMIT 1").fetchone()
 
-        # Get all positions
-        positions = conn.execute("""
-            SELECT position_id, company_id, domain, required_skills, 
-                   min_cgpa, positions, stipend
-            FROM company_positions
-        """).fetchall()
+    if not has_students:
+        flash('No students with complete profiles found.', 'warning')
+        return redirect(url_for('admin_dashboard'))
 
-        if not students:
-            flash('No students with complete profiles found.', 'warning')
-            return redirect(url_for('admin_dashboard'))
+    if not has_positions:
+        flash('No positions available. Companies must add positions first.', 'warning')
+        return redirect(url_for('admin_dashboard'))
 
-        if not positions:
-            flash('No positions available. Companies must add positions first.', 'warning')
-            return redirect(url_for('admin_dashboard'))
+    run_id, created = submit_run(
+        get_connection, perform_allocation,
+        requested_by=session['user_id'],
+        options={'send_emails': send_emails, 'engine': engine},
+        wrap=app.app_context
+    )
 
-        # Load resume texts
-        resume_texts = {}
-        for student in students:
-            student_id = student[0]
-            resume_path_row = conn.execute(
-                "SELECT resume_path FROM student_profile WHERE user_id = ?",
-                (student_id,)
-            ).fetchone()
-            
-            if resume_path_row and resume_path_row[0]:
-                full_path = os.path.join(app.config['UPLOAD_FOLDER'], resume_path_row[0])
-                if os.path.exists(full_path):
-                    resume_texts[student_id] = extract_text_from_pdf(full_path)
+    if created:
+        flash(f'Allocation run #{run_id} started. Progress is shown on the dashboard.', 'info')
+        print(f"[ALLOCATION] Run #{run_id} submitted by {session.get('email')}")
+    else:
+        flash(f'Allocation run #{run_id} is already in progress - following it instead of starting another.', 'info')
+        print(f"[ALLOCATION] {session.get('email')} attached to running run #{run_id}")
 
-        # Run allocation algorithm
-        allocations = run_smart_allocation(students, positions, resume_texts)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'run_id': run_id, 'created': created,
+                        'status_url': url_for('allocation_run_status', run_id=run_id)}), 202
+    return redirect(url_for('admin_dashboard'))
 
-        # Clear previous allocations
-        conn.execute("DELETE FROM allocations")
-        conn.commit()
 
-        # Save new allocations
-        email_data_list = []
-        
-        for sid, cid, pid, score, rank in allocations:
-            conn.execute("""
-                INSERT INTO allocations (student_id, company_id, position_id, score, rank)
-                VALUES (?, ?, ?, ?, ?)
-            """, (sid, cid, pid, score, rank))
-            
-            # Prepare email data if sending emails
-            if send_emails:
-                student_info = conn.execute("""
-                    SELECT u.email, u.name
-                    FROM users u
-                    WHERE u.user_id = ?
-                """, (sid,)).fetchone()
-                
-                company_info = conn.execute("""
-                    SELECT cp.company_name, cp.location, pos.domain, pos.stipend
-                    FROM company_profile cp
-                    JOIN company_positions pos ON pos.position_id = ?
-                    WHERE cp.user_id = ?
-                """, (pid, cid)).fetchone()
-                
-                if student_info and company_info:
-                    email_data_list.append({
-                        'student_email': student_info[0],
-                        'student_name': student_info[1],
-                        'company_name': company_info[0],
-                        'location': company_info[1] or 'Not specified',
-                        'domain': company_info[2],
-                        'stipend': company_info[3],
-                        'rank': rank,
-                        'match_score': int(score)
-                    })
-        
-        conn.commit()
+@app.route('/admin/allocation_runs/<int:run_id>')
+@role_required('admin')
+def allocation_run_status(run_id):
+    """Polling endpoint: phase, percent complete and timings of an allocation run"""
+    run = get_run(get_connection, run_id)
+    if run is None:
+        return jsonify({'error': f'Allocation run {run_id} not found'}), 404
+    return jsonify(run)
 
-        # Send emails if enabled
-        email_status = ""
-        if send_emails and email_data_list:
-            print(f"\n📧 Sending {len(email_data_list)} allocation emails...")
-            success_count, failed_count, errors = send_bulk_allocation_emails(mail, email_data_list)
-            
-            email_status = f" | Emails sent: {success_count}, Failed: {failed_count}"
-            
-            if failed_count > 0:
-                print(f"⚠️ Email failures:")
-                for error in errors:
-                    print(f"   - {error['student']}: {error['error']}")
-        
-        flash(f'Allocation completed! {len(allocations)} students matched{email_status}', 'success')
-        print(f"\n✅ Allocation complete: {len(allocations)} matches made\n")
 
-    return redirect(url_for('admin_dashboard'))
+@app.route('/admin/allocation_runs/latest')
+@role_required('admin')
+def latest_allocation_run():
+    run = get_latest_run(get_connection)
+    if run is None:
+        return jsonify({'error': 'No allocation runs yet'}), 404
+    return jsonify(run)
+
+
+def simulate_allocation(reporter, variants):
+    """
+    What-if simulation, executed as a background job: allocates the current
+    students and positions once per variant (see simulation.py) and compares the
+    outcomes with the allocations table, which is left untouched.
+    Returns the comparison report stored on the simulation_runs row.
+    """
+    variants = parse_variants(variants)
+    reporter.phase('loading')
+    with get_connection() as conn:
+        students, positions, stored_skill_masks = load_allocation_inputs(conn)
+        preferences = load_preferences(conn) if any(engine == 'stable' for _, engine, _ in variants) else {}
+        baseline = conn.execute(
+            "SELECT student_id, company_id, position_id, score, rank FROM allocations").fetchall()
+
+    if not students or not positions:
+        return {'message': 'Nothing to simulate: no students or no positions.', 'variants': []}
+
+    # One feature snapshot shared by every variant: each resume is parsed once
+    term_index = TermIndex(positions)
+    resume_features = {}
+    for index, student in enumerate(students):
+        reporter.progress('loading', index, len(students))
+        full_path = os.path.join(app.config['UPLOAD_FOLDER'], student[7]) if student[7] else None
+        if full_path and os.path.exists(full_path):
+            features = extract_resume_features(extract_text_from_pdf(full_path), student[5], term_index)
+            if features is not None:
+                resume_features[student[0]] = features
+
+    report = simulate(students, positions, resume_features, variants, preferences=preferences,
+                      baseline=baseline, workers=app.config['SIMULATION_WORKERS'], progress=reporter.progress,
+                      stored_skill_masks=stored_skill_masks)
+    report.update(students=len(students), positions=len(positions), resumes=len(resume_features))
+    return report
+
+
+@app.route('/admin/simulate', methods=['POST'])
+@role_required('admin')
+def admin_simulate():
+    """
+    Submit a what-if simulation (JSON body {"variants": [...]}, see simulation.py)
+    as a background job. Allocations are never written.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        parse_variants(payload.get('variants'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    run_id, created = submit_run(
+        get_connection, simulate_allocation,
+        requested_by=session['user_id'],
+        options={'variants': payload['variants']},
+        table='simulation_runs', phases=SIMULATION_PHASES
+    )
+    if not created:
+        return jsonify({'error': f'Simulation run #{run_id} is still running', 'run_id': run_id,
+                        'status_url': url_for('simulation_run_status', run_id=run_id)}), 409
+
+    print(f"[SIMULATION] Run #{run_id} submitted by {session.get('email')} "
+          f"({len(payload['variants'])} variants)")
+    return jsonify({'run_id': run_id, 'status_url': url_for('simulation_run_status', run_id=run_id)}), 202
+
+
+@app.route('/admin/simulation_runs/<int:run_id>')
+@role_required('admin')
+def simulation_run_status(run_id):
+    """Polling endpoint: progress of a what-if simulation and, once done, its comparison report"""
+    run = get_run(get_connection, run_id, table='simulation_runs')
+    if run is None:
+        return jsonify({'error': f'Simulation run {run_id} not found'}), 404
+    return jsonify(run)
+
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    """
+    Prometheus scrape endpoint: request latency histograms, allocation phase
+    timings/counters and job outcomes. Accepts an admin session or
+    `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    token = app.config.get('METRICS_TOKEN')
+    authorized = session.get('role') == 'admin' or (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorized:
+        return 'Forbidden', 403
+    return Response(metrics.render_prometheus({'pid': os.getpid()}),
+                    mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin/debug/queries')
+@role_required('admin')
+def admin_debug_queries():
+    """Slow-query log (SQL, parameter shape, duration, query plan) and per-endpoint query stats"""
+    return jsonify(query_log.debug_report())
+
+
+@app.route('/admin/score_explanation/<int:student_id>/<int:position_id>')
+@role_required('admin')
+def score_explanation(student_id, position_id):
+    """"Why this score?" - the allocation score of one student-position pair with its breakdown (JSON)"""
+    with get_connection() as conn:
+        student = conn.execute("""
+            SELECT u.user_id, u.name, u.email, sp.skills, sp.cgpa, 
+                   sp.interest_domain, sp.experience_years, sp.resume_path,
+                   sp.profile_photo, sp.extracted_skills
+            FROM users u
+            JOIN student_profile sp ON u.user_id = sp.user_id
+            WHERE u.user_id = ? AND u.role = 'student'
+        """, (student_id,)).fetchone()
+        position = conn.execute("""
+            SELECT position_id, company_id, domain, required_skills, 
+                   min_cgpa, positions, stipend
+            FROM company_positions
+            WHERE position_id = ?
+        """, (position_id,)).fetchone()
+        if not student or not position:
+            return jsonify({'error': 'Student or position not found'}), 404
+        # Indexed text is what was extracted at upload; only fall back to the PDF if it is missing
+        indexed = conn.execute("SELECT resume_text FROM resume_fts WHERE rowid = ?", (student_id,)).fetchone()
+
+    resume_text = indexed[0] if indexed else None
+    if resume_text is None and student[7]:
+        full_path = os.path.join(app.config['UPLOAD_FOLDER'], student[7])
+        if os.path.exists(full_path):
+            resume_text = extract_text_from_pdf(full_path)
+
+    return jsonify(explain_student_position_score(student, position, resume_text))
 
 
 @app.route('/admin/deallocate/<int:student_id>', methods=['POST'])
@@ -639,7 +1182,7 @@ def deallocate_student(student_id):
     with get_connection() as conn:
         # Check if student is allocated
         allocation = conn.execute("""
-            SELECT a.allocation_id, u.name, cp.company_name
+            SELECT a.allocation_id, u.name, cp.company_name, a.position_id
             FROM allocations a
             JOIN users u ON u.user_id = a.student_id
             JOIN company_profile cp ON cp.user_id = a.company_id
@@ -653,11 +1196,14 @@ def deallocate_student(student_id):
         # Delete the allocation
         try:
             conn.execute("DELETE FROM allocations WHERE student_id = ?", (student_id,))
+            promoted = promote_waitlisted(conn, allocation[3], 'deallocation')
+            cache.invalidate(conn, 'allocations')
             conn.commit()
             
             student_name = allocation[1]
             company_name = allocation[2]
-            flash(f'Successfully deallocated {student_name} from {company_name}!', 'success')
+            backfill = f" Student {promoted[0][0]} was promoted from the waitlist." if promoted else ""
+            flash(f'Successfully deallocated {student_name} from {company_name}!{backfill}', 'success')
             print(f"[DEALLOCATION] Student {student_id} ({student_name}) removed from {company_name}")
         except Exception as e:
             flash(f'Error deallocating student: {str(e)}', 'error')
@@ -674,6 +1220,8 @@ def deallocate_all():
         try:
             count = conn.execute("SELECT COUNT(*) FROM allocations").fetchone()[0]
             conn.execute("DELETE FROM allocations")
+            conn.execute("DELETE FROM waitlists")
+            cache.invalidate(conn, 'allocations')
             conn.commit()
             
             flash(f'Successfully cleared all {count} allocations! You can now run allocation again.', 'success')
@@ -687,57 +1235,27 @@ def deallocate_all():
 @app.route('/admin/delete_students_without_resume', methods=['POST'])
 @role_required('admin')
 def delete_students_without_resume():
-    """Delete all students who don't have a resume uploaded"""
-    with get_connection() as conn:
-        try:
-            # Find students without resumes
-            students_without_resume = conn.execute("""
-                SELECT u.user_id, u.name, u.email
-                FROM users u
-                LEFT JOIN student_profile sp ON u.user_id = sp.user_id
-                WHERE u.role = 'student' 
-                AND (sp.resume_path IS NULL OR sp.resume_path = '')
-            """).fetchall()
-            
-            if not students_without_resume:
-                flash('No students found without resumes.', 'info')
-                return redirect(url_for('admin_dashboard'))
-            
-            count = len(students_without_resume)
-            student_ids = [s[0] for s in students_without_resume]
-            
-            # Delete allocations first (if any)
-            conn.execute(f"""
-                DELETE FROM allocations 
-                WHERE student_id IN ({','.join('?' * len(student_ids))})
-            """, student_ids)
-            
-            # Delete student profiles
-            conn.execute(f"""
-                DELETE FROM student_profile 
-                WHERE user_id IN ({','.join('?' * len(student_ids))})
-            """, student_ids)
-            
-            # Delete user accounts
-            conn.execute(f"""
-                DELETE FROM users 
-                WHERE user_id IN ({','.join('?' * len(student_ids))})
-            """, student_ids)
-            
-            conn.commit()
-            
-            flash(f'Successfully deleted {count} student(s) without resumes!', 'success')
-            print(f"[DELETE STUDENTS] Removed {count} students without resumes")
-            
-            # Log deleted students
-            for student in students_without_resume:
-                print(f"  - Deleted: {student[1]} ({student[2]})")
-                
-        except Exception as e:
-            flash(f'Error deleting students: {str(e)}', 'error')
-            print(f"[DELETE STUDENTS ERROR] {str(e)}")
-            traceback.print_exc()
-    
+    """
+    Delete all students who don't have a resume uploaded, as a background job
+
+    Rows are deleted in chunks (see maintenance.delete_students_job) and the
+    students' upload files are removed with them.
+    """
+    run_id, created = submit_run(
+        get_connection, partial(delete_students_job, get_connection=get_connection),
+        requested_by=session['user_id'],
+        options={'upload_folder': app.config['UPLOAD_FOLDER'], 'criteria': 'without_resume'},
+        table='maintenance_runs', phases=STUDENT_DELETION_PHASES
+    )
+    if created:
+        flash(f'Deleting students without resumes in the background (run #{run_id}).', 'info')
+        print(f"[DELETE STUDENTS] Run #{run_id} submitted by {session.get('email')}")
+    else:
+        flash(f'Maintenance run #{run_id} is still in progress - try again when it has finished.', 'warning')
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'run_id': run_id, 'created': created,
+                        'status_url': url_for('maintenance_run_status', run_id=run_id)}), 202 if created else 409
     return redirect(url_for('admin_dashboard'))
 
 
@@ -761,16 +1279,12 @@ def delete_student(student_id):
             student_name = student[0]
             student_email = student[1]
             
-            # Delete allocation (if any)
-            conn.execute("DELETE FROM allocations WHERE student_id = ?", (student_id,))
-            
-            # Delete student profile
-            conn.execute("DELETE FROM student_profile WHERE user_id = ?", (student_id,))
-            
-            # Delete user account
-            conn.execute("DELETE FROM users WHERE user_id = ?", (student_id,))
-            
+            # Delete the account and everything keyed by it; a held seat goes to the position's waitlist
+            files, freed_positions = delete_student_rows(conn, [student_id])
+            for position_id in freed_positions:
+                promote_waitlisted(conn, position_id, 'student deletion')
             conn.commit()
+            remove_upload_files(app.config['UPLOAD_FOLDER'], files, time.time() - GC_GRACE_SECONDS)
             
             flash(f'Successfully deleted student: {student_name} ({student_email})', 'success')
             print(f"[DELETE STUDENT] Removed student {student_id}: {student_name} ({student_email})")
@@ -793,6 +1307,7 @@ def admin_analytics():
         success_rate = round((allocated / total_students * 100) if total_students > 0 else 0, 1)
         
         # Create pie chart
+        plt = get_pyplot()
         fig, ax = plt.subplots(figsize=(8, 6))
         sizes = [allocated, total_students - allocated]
         labels = [f'Allocated ({allocated})', f'Not Allocated ({total_students - allocated})']
@@ -820,44 +1335,236 @@ def admin_analytics():
 @role_required('admin')
 def export_students():
     """Export students to Excel"""
-    with get_connection() as conn:
-        students = conn.execute("""
-            SELECT u.name, u.email, sp.skills, sp.cgpa, sp.interest_domain, 
-                   sp.experience_years
-            FROM users u
-            LEFT JOIN student_profile sp ON u.user_id = sp.user_id
-            WHERE u.role = 'student'
-        """).fetchall()
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Students"
-    
-    # Headers
-    headers = ['Name', 'Email', 'Skills', 'CGPA', 'Domain', 'Experience (years)']
-    ws.append(headers)
-    
-    # Data
-    for student in students:
-        ws.append(list(student))
-    
-    # Save to bytes
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=f'students_{datetime.now().strftime("%Y%m%d")}.xlsx'
+    return export_dataset('students')
+
+
+@app.route('/admin/export/<dataset>')
+@role_required('admin')
+def export_dataset(dataset):
+    """
+    Stream an export of students, allocations, positions or exclusions
+
+    Query string:
+        format:  xlsx (default) or csv
+        columns: comma-separated column keys (see export_utils.DATASETS)
+        any other key is treated as a filter, e.g. ?domain=AI&min_cgpa=7
+    """
+    if dataset not in DATASETS:
+        abort(404)
+
+    fmt = request.args.get('format', 'xlsx').lower()
+    columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()] or None
+    filters = {k: v for k, v in request.args.items() if k not in ('format', 'columns')}
+    filename = f'{dataset}_{datetime.now().strftime("%Y%m%d")}.{fmt}'
+
+    try:
+        if fmt == 'csv':
+            def generate():
+                conn = get_connection()
+                try:
+                    yield from iter_csv(conn, dataset, columns, filters)
+                finally:
+                    conn.close()
+
+            # Validate up front so a bad column/filter is a 400, not a broken stream
+            build_export_query(dataset, columns, filters)
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+
+        if fmt == 'xlsx':
+            conn = get_connection()
+            try:
+                output = spooled_xlsx(conn, dataset, columns, filters)
+            finally:
+                conn.close()
+            return send_file(
+                output,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=filename
+            )
+    except ValueError as e:
+        return str(e), 400
+
+    return f"Unsupported export format '{fmt}'", 400
+
+
+@app.route('/admin/import/<kind>', methods=['POST'])
+@role_required('admin')
+def import_dataset(kind):
+    """
+    Bulk-create students, companies or positions from an uploaded CSV/XLSX ('file' field)
+
+    Columns per kind are listed in import_utils.IMPORTS. Valid rows are saved
+    even when others fail; the JSON response reports every failed row.
+    """
+    if kind not in IMPORTS:
+        abort(404)
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    started = time.monotonic()
+    try:
+        with get_connection() as conn:
+            report = import_rows(conn, kind, read_rows(upload.stream, upload.filename),
+                                 workers=app.config['IMPORT_WORKERS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    report['seconds'] = round(time.monotonic() - started, 3)
+    print(f"[IMPORT] {kind}: {report['imported']}/{report['rows']} rows imported, "
+          f"{report['failed']} failed in {report['seconds']}s")
+    return jsonify(report)
+
+
+@app.route('/admin/import_resumes', methods=['POST'])
+@role_required('admin')
+def import_resumes():
+    """
+    Attach a ZIP of resume PDFs ('file' field) to existing students as a background job
+
+    Files are matched by student email or user ID in their name or folder
+    (see resume_ingest.match_entry) and go through the same analysis and
+    acceptance rule as the upload form. Poll the returned status_url.
+    """
+    upload = request.files.get('file')
+    if not upload or not upload.filename.lower().endswith('.zip'):
+        return jsonify({'error': 'Upload a .zip file'}), 400
+
+    # The job outlives this request, so the archive is kept on disk until the job removes it
+    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'tmp'), exist_ok=True)
+    zip_file = tempfile.NamedTemporaryFile(suffix='.zip', dir=os.path.join(app.config['UPLOAD_FOLDER'], 'tmp'),
+                                           delete=False)
+    with zip_file:
+        upload.save(zip_file)
+    if not zipfile.is_zipfile(zip_file.name):
+        os.remove(zip_file.name)
+        return jsonify({'error': 'Not a valid ZIP archive'}), 400
+
+    run_id, created = submit_run(
+        get_connection, partial(ingest_resume_zip, get_connection=get_connection),
+        requested_by=session['user_id'],
+        options={'zip_path': zip_file.name, 'upload_folder': app.config['UPLOAD_FOLDER'],
+                 'workers': app.config['IMPORT_WORKERS']},
+        table='resume_import_runs', phases=RESUME_IMPORT_PHASES
+    )
+    if not created:
+        os.remove(zip_file.name)
+        return jsonify({'error': f'Resume import #{run_id} is still running', 'run_id': run_id,
+                        'status_url': url_for('resume_import_status', run_id=run_id)}), 409
+
+    print(f"[RESUME ZIP] Import #{run_id} submitted by {session.get('email')}")
+    return jsonify({'run_id': run_id, 'status_url': url_for('resume_import_status', run_id=run_id)}), 202
+
+
+@app.route('/admin/import_resumes/<int:run_id>')
+@role_required('admin')
+def resume_import_status(run_id):
+    """Polling endpoint: phase, percent complete and summary of a resume ZIP import"""
+    run = get_run(get_connection, run_id, table='resume_import_runs')
+    if run is None:
+        return jsonify({'error': f'Resume import {run_id} not found'}), 404
+    return jsonify(run)
+
+
+@app.route('/admin/uploads/gc', methods=['POST'])
+@role_required('admin')
+def collect_upload_garbage():
+    """
+    Remove upload files no profile references, as a background job
+    (see maintenance.collect_orphaned_uploads). dry_run=1 only lists them.
+    """
+    dry_run = request.values.get('dry_run') in ('1', 'true', 'on')
+    run_id, created = submit_run(
+        get_connection, partial(collect_orphaned_uploads, get_connection=get_connection),
+        requested_by=session['user_id'],
+        options={'upload_folder': app.config['UPLOAD_FOLDER'], 'dry_run': dry_run},
+        table='maintenance_runs', phases=UPLOAD_GC_PHASES
     )
+    if not created:
+        return jsonify({'error': f'Maintenance run #{run_id} is still running', 'run_id': run_id,
+                        'status_url': url_for('maintenance_run_status', run_id=run_id)}), 409
+
+    print(f"[UPLOAD GC] Run #{run_id} submitted by {session.get('email')} (dry run: {dry_run})")
+    return jsonify({'run_id': run_id, 'status_url': url_for('maintenance_run_status', run_id=run_id)}), 202
+
+
+@app.route('/admin/maintenance_runs/<int:run_id>')
+@role_required('admin')
+def maintenance_run_status(run_id):
+    """Polling endpoint: phase, percent complete and summary of a bulk deletion or upload GC"""
+    run = get_run(get_connection, run_id, table='maintenance_runs')
+    if run is None:
+        return jsonify({'error': f'Maintenance run {run_id} not found'}), 404
+    return jsonify(run)
+
+
+# ────────────────────────────────────────────────
+#  SEARCH ROUTES
+# ────────────────────────────────────────────────
+
+@app.route('/search/resumes')
+@role_required('admin', 'company')
+def search_resume_text():
+    """
+    Full-text search over indexed resume text (JSON)
+
+    Query string:
+        q:                  words that must all appear; a trailing * matches prefixes (e.g. pyth*)
+        domain:             interest domain (case-insensitive)
+        min_cgpa, max_cgpa: CGPA range
+        page, per_page:     pagination (per_page is capped at 100)
+    """
+    try:
+        with get_connection() as conn:
+            result = search_resumes(
+                conn,
+                request.args.get('q', ''),
+                domain=request.args.get('domain') or None,
+                min_cgpa=request.args.get('min_cgpa') or None,
+                max_cgpa=request.args.get('max_cgpa') or None,
+                page=request.args.get('page', 1),
+                per_page=request.args.get('per_page', 20),
+            )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid search parameter: {e}'}), 400
+
+    result['query'] = request.args.get('q', '')
+    return jsonify(result)
 
 
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_file(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    """
+    Serve uploaded files
+
+    Blobs are named by their SHA-256, which is sent as a strong ETag with a
+    year-long immutable Cache-Control. Other files are revalidated on each use
+    (no-cache + ETag). If-None-Match is answered with 304 and Range requests
+    (PDF viewers) with 206. 'thumbs/<path>' serves an image's thumbnail.
+    """
+    thumbnail = filename.startswith(THUMBNAIL_PREFIX)
+    if thumbnail:
+        filename = filename[len(THUMBNAIL_PREFIX):]
+    full_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+
+    digest = blob_digest(filename)
+    if digest is None:
+        return send_file(full_path, conditional=True)
+
+    etag = digest
+    if thumbnail:
+        thumbnail_file = make_thumbnail(full_path)
+        if thumbnail_file:
+            full_path, etag = thumbnail_file, f"{digest}-{THUMBNAIL_SIZE}"
+    response = send_file(full_path, etag=etag, conditional=True, max_age=app.config['UPLOAD_MAX_AGE'])
+    response.cache_control.immutable = True
+    return response
 
 
 # ────────────────────────────────────────────────
@@ -894,73 +1601,3 @@ if __name__ == '__main__':
     print("="*80 + "\n")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
-
-@app.route('/company/position/delete/<int:position_id>', methods=['POST'])
-@role_required('company')
-def delete_position(position_id):
-    """Delete a position posted by the company"""
-    with get_connection() as conn:
-        # Verify the position belongs to this company
-        position = conn.execute("""
-            SELECT position_id FROM company_positions 
-            WHERE position_id = ? AND company_id = ?
-        """, (position_id, session['user_id'])).fetchone()
-        
-        if not position:
-            flash('Position not found or unauthorized access.', 'error')
-            return redirect(url_for('company_dashboard'))
-        
-        # Delete the position
-        try:
-            conn.execute("DELETE FROM company_positions WHERE position_id = ?", (position_id,))
-            conn.commit()
-            flash('Position deleted successfully!', 'success')
-        except Exception as e:
-            flash(f'Error deleting position: {str(e)}', 'error')
-    
-    return redirect(url_for('company_dashboard'))
-
-
-@app.route('/company/position/edit/<int:position_id>', methods=['GET', 'POST'])
-@role_required('company')
-def edit_position(position_id):
-    """Edit a position posted by the company"""
-    with get_connection() as conn:
-        # Verify the position belongs to this company
-        position = conn.execute("""
-            SELECT position_id, domain, required_skills, min_cgpa, positions, stipend
-            FROM company_positions 
-            WHERE position_id = ? AND company_id = ?
-        """, (position_id, session['user_id'])).fetchone()
-        
-        if not position:
-            flash('Position not found or unauthorized access.', 'error')
-            return redirect(url_for('company_dashboard'))
-        
-        if request.method == 'POST':
-            domain = request.form.get('domain', '').strip()
-            required_skills = request.form.get('required_skills', '').strip()
-            min_cgpa = float(request.form.get('min_cgpa', 0))
-            positions_count = int(request.form.get('positions', 0))
-            stipend = int(request.form.get('stipend', 0))
-            
-            try:
-                conn.execute("""
-                    UPDATE company_positions 
-                    SET domain = ?, required_skills = ?, min_cgpa = ?, positions = ?, stipend = ?
-                    WHERE position_id = ?
-                """, (domain, required_skills, min_cgpa, positions_count, stipend, position_id))
-                conn.commit()
-                flash('Position updated successfully!', 'success')
-                return redirect(url_for('company_dashboard'))
-            except Exception as e:
-                flash(f'Error updating position: {str(e)}', 'error')
-        
-        # Get company profile for the edit page
-        profile = conn.execute("""
-            SELECT company_name, location, contact_email, contact_no, profile_logo
-            FROM company_profile 
-            WHERE user_id = ?
-        """, (session['user_id'],)).fetchone()
-    
-    return render_template('edit_position.html', position=position, profile=profile)
\ No newline at end of file
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+📈 Performance benchmarks for the Internship Allocation Platform
+
+Usage:
+    python benchmarks.py startup [--module app] [--max-ms 800] [--max-rss-mb 120]
+    python benchmarks.py export [--rows 50000] [--max-peak-mb 5]
+    python benchmarks.py allocation [--students 3000] [--positions 60] [--max-peak-mb 2]
+
+Each benchmark prints its numbers and exits non-zero when a budget is exceeded,
+so it can be wired into CI to catch regressions.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Modules that must never be imported just by loading the web app
+LAZY_MODULES = ('fitz', 'PIL', 'matplotlib', 'openpyxl')
+
+
+# ============================================================================
+# STARTUP: IMPORT TIME + RSS
+# ============================================================================
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+_STARTUP_PROBE = """
+import resource, sys
+import {module}
+lazy = [m for m in {lazy!r} if m in sys.modules]
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print('PROBE', rss_kb, ','.join(lazy))
+"""
+
+
+def parse_importtime(stderr: str):
+    """
+    Parse `python -X importtime` output
+    Returns: list of (module, self_us, cumulative_us, depth)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def bench_startup(args):
+    """Measure cold import time and peak RSS of the app module in a fresh interpreter"""
+    probe = _STARTUP_PROBE.format(module=args.module, lazy=LAZY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        print(f"❌ Could not import {args.module}")
+        return 1
+
+    rows = parse_importtime(proc.stderr)
+    probe_line = [l for l in proc.stdout.splitlines() if l.startswith('PROBE')][-1].split(' ')
+    rss_mb = int(probe_line[1]) / 1024
+    eagerly_loaded = [m for m in probe_line[2:] if m]
+
+    top_level = [r for r in rows if r[3] == 0]
+    total_ms = sum(r[2] for r in top_level) / 1000
+    target = [r for r in rows if r[0] == args.module]
+    module_ms = target[-1][2] / 1000 if target else total_ms
+
+    print("=" * 80)
+    print(f"🚀 STARTUP BENCHMARK: import {args.module}")
+    print("=" * 80)
+    print(f"   Total import time:  {total_ms:.1f} ms")
+    print(f"   '{args.module}' cumulative: {module_ms:.1f} ms")
+    print(f"   Peak RSS:           {rss_mb:.1f} MB")
+    print(f"\n   Slowest top-level imports:")
+    for module, _, cumulative_us, _ in sorted(top_level, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"     {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failures = []
+    if eagerly_loaded:
+        failures.append(f"heavy modules imported at startup: {', '.join(eagerly_loaded)}")
+    if args.max_ms and total_ms > args.max_ms:
+        failures.append(f"import time {total_ms:.1f} ms > budget {args.max_ms} ms")
+    if args.max_rss_mb and rss_mb > args.max_rss_mb:
+        failures.append(f"RSS {rss_mb:.1f} MB > budget {args.max_rss_mb} MB")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    print("=" * 80)
+    return 1 if failures else 0
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def make_fixture_db(path, students=1000, companies=10, positions_per_company=3):
+    """Create a platform.db-shaped SQLite file filled with synthetic rows"""
+    import database
+
+    database.DB_PATH = path
+    database.create_tables()
+
+    domains = ['AI', 'Data Science', 'Web Development', 'Cyber Security', 'Cloud Computing']
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO users (user_id, name, email, password, role) VALUES (?, ?, ?, 'x', 'student')",
+            ((i, f"Student {i}", f"student{i}@example.com") for i in range(1, students + 1))
+        )
+        conn.executemany(
+            """INSERT INTO student_profile (user_id, skills, cgpa, interest_domain, experience_years,
+                                            resume_path, extracted_skills)
+               VALUES (?, 'Python, SQL', ?, ?, ?, ?, 'Python, Sql')""",
+            ((i, 6 + (i % 40) / 10, domains[i % len(domains)], i % 3,
+              f"students/resumes/{i}_resume.pdf") for i in range(1, students + 1))
+        )
+        first_company = students + 1
+        conn.executemany(
+            "INSERT INTO users (user_id, name, email, password, role) VALUES (?, ?, ?, 'x', 'company')",
+            ((first_company + c, f"Company {c}", f"company{c}@example.com") for c in range(companies))
+        )
+        conn.executemany(
+            "INSERT INTO company_profile (user_id, company_name, location) VALUES (?, ?, 'Pune')",
+            ((first_company + c, f"Company {c}") for c in range(companies))
+        )
+        conn.executemany(
+            """INSERT INTO company_positions (company_id, domain, required_skills, min_cgpa, positions, stipend)
+               VALUES (?, ?, 'Python, SQL, Git', 7.0, 5, 15000)""",
+            ((first_company + c, domains[(c + p) % len(domains)])
+             for c in range(companies) for p in range(positions_per_company))
+        )
+        conn.commit()
+    return path
+
+
+def measure_peak(fn):
+    """Run fn() under tracemalloc; returns (result, seconds, peak_bytes)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+# ============================================================================
+# EXPORT: CONSTANT-MEMORY CSV / XLSX
+# ============================================================================
+
+def bench_export(args):
+    """Export N students as CSV (and XLSX if openpyxl is installed) and check peak memory"""
+    import database
+    import export_utils
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        make_fixture_db(os.path.join(tmp, 'bench.db'), students=args.rows)
+
+        print("=" * 80)
+        print(f"📤 EXPORT BENCHMARK: {args.rows} students")
+        print("=" * 80)
+
+        def csv_export():
+            conn = database.get_connection()
+            try:
+                return sum(len(chunk) for chunk in export_utils.iter_csv(conn, 'students'))
+            finally:
+                conn.close()
+
+        size, elapsed, peak = measure_peak(csv_export)
+        print(f"   CSV:  {size / 1e6:6.1f} MB in {elapsed:.2f}s, peak traced memory {peak / 1e6:.2f} MB")
+        if args.max_peak_mb and peak / 1e6 > args.max_peak_mb:
+            failures.append(f"CSV export peak {peak / 1e6:.2f} MB > budget {args.max_peak_mb} MB")
+
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            print("   XLSX: skipped (openpyxl not installed)")
+        else:
+            def xlsx_export():
+                conn = database.get_connection()
+                try:
+                    with tempfile.TemporaryFile() as output:
+                        export_utils.write_xlsx(conn, 'students', output)
+                        return output.seek(0, os.SEEK_END)
+                finally:
+                    conn.close()
+
+            size, elapsed, peak = measure_peak(xlsx_export)
+            print(f"   XLSX: {size / 1e6:6.1f} MB in {elapsed:.2f}s, peak traced memory {peak / 1e6:.2f} MB")
+            if args.max_peak_mb and peak / 1e6 > args.max_peak_mb:
+                failures.append(f"XLSX export peak {peak / 1e6:.2f} MB > budget {args.max_peak_mb} MB")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Export within budget")
+    print("=" * 80)
+    return 1 if failures else 0
+
+
+# ============================================================================
+# ALLOCATION: ALLOCATOR MEMORY
+# ============================================================================
+
+RESUME_WORDS = ("education university bachelor degree cgpa experience internship developed implemented "
+                "designed built improved optimized achieved led managed skills projects certifications").split()
+
+
+def make_allocation_fixture(students=3000, positions=60, seed=7):
+    """
+    (students, positions, resume_text) in the shapes run_smart_allocation takes;
+    resume_text(student_id) regenerates that student's text on demand, so the
+    texts never all exist at once - as when PDFs are parsed one by one
+    """
+    from ai_engine import DOMAIN_REQUIRED_SKILLS
+
+    rng = random.Random(seed)
+    domains = ['AI', 'Data Science', 'Web Development', 'Cyber Security', 'Cloud Computing']
+    # Pronounceable filler words, so resumes pass the spam/repetition checks
+    syllables = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo']
+    vocabulary = RESUME_WORDS + [''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(1500)]
+    student_rows = []
+    for sid in range(1, students + 1):
+        domain = domains[sid % len(domains)]
+        student_rows.append((sid, f"Student {sid}", f"student{sid}@example.com", 'Python, SQL',
+                             round(rng.uniform(6, 10), 1), domain, rng.randint(0, 3),
+                             f"students/resumes/{sid}_resume.pdf", None,
+                             ', '.join(rng.sample(DOMAIN_REQUIRED_SKILLS[domain], 4))))
+    position_rows = [
+        (10000 + p, 20000 + p // 3, domains[p % len(domains)],
+         ', '.join(rng.sample(DOMAIN_REQUIRED_SKILLS[domains[p % len(domains)]], 5)),
+         rng.choice([0, 6.5, 7.5]), rng.randint(1, 8), 15000)
+        for p in range(positions)
+    ]
+
+    def resume_text(sid):
+        text_rng = random.Random(seed * 1_000_003 + sid)
+        skills = DOMAIN_REQUIRED_SKILLS[domains[sid % len(domains)]]
+        words = [text_rng.choice(skills) if text_rng.random() < 0.15 else text_rng.choice(vocabulary)
+                 for _ in range(text_rng.randint(150, 450))]
+        return ' '.join(words) + f" {text_rng.randint(5, 60)}%"
+
+    return student_rows, position_rows, resume_text
+
+
+def bench_allocation(args):
+    """
+    Peak traced memory of the allocation pipeline (parse -> feature record ->
+    allocate) per student, plus candidate storage: per-pair dicts vs kept arrays
+    """
+    from array import array
+    from ai_engine import TermIndex, extract_resume_features, run_smart_allocation
+
+    students, positions, resume_text = make_allocation_fixture(args.students, args.positions)
+    print("=" * 80)
+    print(f"🧮 ALLOCATION BENCHMARK: {len(students)} students x {len(positions)} positions")
+    print("=" * 80)
+
+    stats = {}
+    sizes = {'text_bytes': 0}
+
+    def load_features():
+        term_index = TermIndex(positions)
+        features = {}
+        for student in students:
+            text = resume_text(student[0])
+            sizes['text_bytes'] += len(text)
+            features[student[0]] = extract_resume_features(text, student[5], term_index)
+        return features
+
+    def allocate():
+        features = load_features()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return run_smart_allocation(students, positions, features, stats=stats)
+
+    allocations, elapsed, peak = measure_peak(allocate)
+    eligible_pairs = sum(m['eligible_pairs'] for m in stats['shards'])
+    kept = sum(m['candidates_kept'] for m in stats['shards'])
+    per_student = peak / len(students)
+    print(f"   Allocated {len(allocations)} in {elapsed:.2f}s, peak traced memory {peak / 1e6:.2f} MB "
+          f"({per_student:.0f} bytes/student)")
+    print(f"   Eligible pairs: {eligible_pairs}, candidates kept: {kept}")
+
+    # Size of the retained feature records against the resume texts they replace
+    sizes['text_bytes'] = 0
+    tracemalloc.start()
+    features = load_features()
+    record_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del features
+    print(f"   Resume texts {sizes['text_bytes'] / len(students):.0f} bytes/student "
+          f"-> feature records {record_bytes / len(students):.0f} bytes/student")
+
+    # What the candidate lists cost in the previous layout (one dict per eligible pair, all kept)
+    # against the current one (two array columns holding only the kept candidates)
+    _, _, dict_bytes = measure_peak(lambda: [
+        {'student_id': i, 'company_id': 20000, 'position_id': 10000, 'score': i / 7}
+        for i in range(eligible_pairs)
+    ])
+    _, _, array_bytes = measure_peak(lambda: (array('q', range(kept)), array('d', [i / 7 for i in range(kept)])))
+    print(f"   Candidate storage: dict per eligible pair {dict_bytes / 1e6:.2f} MB "
+          f"-> arrays of kept candidates {array_bytes / 1e6:.2f} MB")
+
+    failures = []
+    if args.max_peak_mb and peak / 1e6 > args.max_peak_mb:
+        failures.append(f"allocation peak {peak / 1e6:.2f} MB > budget {args.max_peak_mb} MB")
+    if args.max_bytes_per_student and per_student > args.max_bytes_per_student:
+        failures.append(f"allocation peak {per_student:.0f} bytes/student > budget {args.max_bytes_per_student}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Allocation within budget")
+    print("=" * 80)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Platform performance benchmarks")
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    startup = sub.add_parser('startup', help="import time and RSS of the web app")
+    startup.add_argument('--module', default='app')
+    startup.add_argument('--max-ms', type=float, default=0, help="fail above this import time")
+    startup.add_argument('--max-rss-mb', type=float, default=0, help="fail above this peak RSS")
+    startup.add_argument('--top', type=int, default=10)
+    startup.set_defaults(func=bench_startup)
+
+    export = sub.add_parser('export', help="peak memory of streaming CSV/XLSX exports")
+    export.add_argument('--rows', type=int, default=50000)
+    export.add_argument('--max-peak-mb', type=float, default=5)
+    export.set_defaults(func=bench_export)
+
+    allocation = sub.add_parser('allocation', help="peak memory of the allocator")
+    allocation.add_argument('--students', type=int, default=3000)
+    allocation.add_argument('--positions', type=int, default=60)
+    allocation.add_argument('--max-peak-mb', type=float, default=2, help="fail above this peak")
+    allocation.add_argument('--max-bytes-per-student', type=float, default=600,
+                            help="fail when peak / students exceeds this")
+    allocation.set_defaults(func=bench_allocation)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
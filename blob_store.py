@@ -0,0 +1,178 @@
+import glob
+import hashlib
+import os
+import re
+import tempfile
+
+# ============================================================================
+# CONTENT-ADDRESSED UPLOAD STORE
+# ============================================================================
+# Uploaded files are stored once per content, under the SHA-256 of their bytes:
+#
+#     uploads/blobs/3f/a2/3fa2...e9.pdf
+#
+# Two levels of 256 shard directories keep every directory small however many
+# files there are. The path relative to the upload folder is what the profile
+# columns store, so readers simply join it with UPLOAD_FOLDER. The extension is
+# kept for content-type detection when the file is served.
+#
+# A file is streamed into blobs/tmp while being hashed, fsynced, then renamed
+# into place (atomic on POSIX), so a reader never sees a partial blob. If the
+# blob already exists the temporary copy is dropped: identical uploads share
+# one file (different extensions aside).
+#
+# The blobs table counts the profile rows referencing each blob; triggers on
+# the columns of database.UPLOAD_REFERENCES keep it current for every write
+# path. Blobs whose count drops to 0 are removed by the upload GC
+# (maintenance.collect_orphaned_uploads), or right away when their last owner
+# is deleted.
+#
+# Data derived from a blob (extracted PDF text, thumbnails) is cached under
+# uploads/cache/<kind>/ with the same digest and sharding, and removed with it.
+
+BLOB_DIR = 'blobs'
+CACHE_DIR = 'cache'
+COPY_CHUNK_BYTES = 1024 * 1024
+
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+
+
+def _shards(digest):
+    return digest[:2], digest[2:4]
+
+
+def blob_path(digest, extension=''):
+    """Upload-relative path of a blob"""
+    return os.path.join(BLOB_DIR, *_shards(digest), digest + extension.lower())
+
+
+def blob_digest(path):
+    """SHA-256 hex digest of an (upload-relative or absolute) blob path, or None for other files"""
+    if not path:
+        return None
+    parts = os.path.normpath(path).split(os.sep)
+    if len(parts) < 4 or parts[-4] != BLOB_DIR:
+        return None
+    match = _BLOB_NAME.match(parts[-1])
+    if not match or (parts[-3], parts[-2]) != _shards(match.group(1)):
+        return None
+    return match.group(1)
+
+
+def is_blob(path):
+    return blob_digest(path) is not None
+
+
+def store_blob(upload_folder, stream, filename):
+    """
+    Store the bytes of a readable binary stream, once per content
+
+    Args:
+        filename: original name; only its extension is kept
+
+    Returns: (upload-relative blob path, created) - created is False when an
+             identical file was already stored; that blob's mtime is refreshed
+             so the upload GC leaves it alone until the new reference is saved
+    """
+    extension = os.path.splitext(filename or '')[1]
+    if not re.fullmatch(r'\.[A-Za-z0-9]{1,10}', extension):
+        extension = ''
+    tmp_dir = os.path.join(upload_folder, BLOB_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            while chunk := stream.read(COPY_CHUNK_BYTES):
+                digest.update(chunk)
+                target.write(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+        relative_path = blob_path(digest.hexdigest(), extension)
+        full_path = os.path.join(upload_folder, relative_path)
+        created = not os.path.exists(full_path)
+        if not created:
+            os.remove(tmp_path)
+            os.utime(full_path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return relative_path, created
+
+
+# ============================================================================
+# DERIVED DATA CACHE
+# ============================================================================
+
+def cache_path(blob_full_path, kind, suffix):
+    """
+    Absolute path of derived data for a blob, e.g. cache_path(pdf, 'text', '.txt'),
+    or None when the file is not a blob
+    """
+    digest = blob_digest(blob_full_path)
+    if digest is None:
+        return None
+    upload_folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(blob_full_path)))))
+    return os.path.join(upload_folder, CACHE_DIR, kind, *_shards(digest), digest + suffix)
+
+
+def write_atomic(full_path, data):
+    """Write bytes to full_path through a temporary file and rename"""
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_derived(upload_folder, path):
+    """Delete every cached derivative of a blob (no-op for other files)"""
+    digest = blob_digest(path)
+    if digest is None:
+        return
+    pattern = os.path.join(upload_folder, CACHE_DIR, '*', *_shards(digest), digest + '*')
+    for derived in glob.glob(pattern):
+        try:
+            os.remove(derived)
+        except FileNotFoundError:
+            pass
+
+
+# ============================================================================
+# REFERENCE COUNTS
+# ============================================================================
+
+def unreferenced(conn, paths):
+    """
+    The paths among `paths` that no profile row references any more, so their
+    files may be deleted (caller commits). Blob rows of those paths are dropped.
+    Files outside the blob store belong to a single row and are always returned.
+    """
+    blobs = [path for path in paths if is_blob(path)]
+    counts = dict(conn.execute(
+        f"SELECT path, refcount FROM blobs WHERE path IN ({','.join('?' * len(blobs))})", blobs))
+    free = [path for path in blobs if counts.get(path, 0) <= 0]
+    conn.executemany("DELETE FROM blobs WHERE path = ?", [(path,) for path in free])
+    return [path for path in paths if not is_blob(path)] + free
+
+
+def discard_blob(conn, upload_folder, path):
+    """
+    Delete a blob created by this request that ended up unused (e.g. a rejected
+    resume), unless a profile references it meanwhile
+    """
+    if unreferenced(conn, [path]):
+        full_path = os.path.join(upload_folder, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        remove_derived(upload_folder, path)
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# ============================================================================
+# READ-THROUGH CACHE FOR DASHBOARD QUERIES
+# ============================================================================
+# Results are cached per process in a bounded LRU. Invalidation is explicit
+# and shared between gunicorn workers through the cache_generations table:
+# every cached query declares the scopes it depends on, and write paths bump
+# those scopes' generation in the same transaction as the write. The current
+# generations are part of the cache key, so after a bump every worker misses
+# and reloads; the superseded entries simply age out of the LRU.
+#
+# Scopes used by the app:
+#   student:<id>, company:<id>            one user's profile (and a company's positions)
+#   students, companies, positions        any row of that kind changed
+#   allocations                           allocation table changed
+
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_AGE_SECONDS = 300   # upper bound on staleness for writes that bypass invalidate()
+
+_MISS = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a maximum size and per-entry age limit"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_age=CACHE_MAX_AGE_SECONDS):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISS)
+            if entry is _MISS:
+                return _MISS
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.max_age:
+                del self._data[key]
+                return _MISS
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+dashboard_cache = LRUCache()
+
+
+def load_generations(conn, scopes):
+    """Current generation of each scope (0 if never bumped), in one query"""
+    scopes = list(dict.fromkeys(scopes))
+    rows = conn.execute(
+        f"SELECT scope, generation FROM cache_generations WHERE scope IN ({','.join('?' * len(scopes))})",
+        scopes
+    ).fetchall()
+    generations = dict.fromkeys(scopes, 0)
+    generations.update(rows)
+    return generations
+
+
+def invalidate(conn, *scopes):
+    """
+    Bump the generation of each scope. Call inside the write's transaction
+    (before conn.commit()) so readers never see new data with an old generation.
+    """
+    conn.executemany("""
+        INSERT INTO cache_generations (scope, generation) VALUES (?, 1)
+        ON CONFLICT(scope) DO UPDATE SET generation = generation + 1
+    """, [(scope,) for scope in scopes])
+
+
+def read_through(name, user_key, depends_on, generations, loader):
+    """
+    Return the cached result of `loader()` for this query/user, loading it on a miss
+
+    Args:
+        name: Query name (also the metrics label)
+        user_key: (role, user_id) the result belongs to, or None for shared results
+        depends_on: Scopes whose writes invalidate this result
+        generations: Output of load_generations() covering depends_on
+        loader: Zero-argument callable running the actual query
+    """
+    key = (name, user_key, tuple(generations[scope] for scope in depends_on))
+    value = dashboard_cache.get(key)
+    if value is not _MISS:
+        metrics.inc('dashboard_cache_requests_total', labels={'query': name, 'result': 'hit'})
+        return value
+
+    metrics.inc('dashboard_cache_requests_total', labels={'query': name, 'result': 'miss'})
+    value = loader()
+    dashboard_cache.put(key, value)
+    return value
@@ -1,8 +1,20 @@
 import sqlite3
 import os
 
+import cache
+from ai_engine import set_skill_ids, skill_names
+
 DB_PATH = os.path.join(os.getcwd(), "platform.db")
 
+JOB_RUN_TABLES = ('allocation_runs', 'resume_import_runs', 'maintenance_runs', 'simulation_runs')
+
+# (table, column) pairs holding upload-relative paths
+UPLOAD_REFERENCES = [
+    ('student_profile', 'resume_path'),
+    ('student_profile', 'profile_photo'),
+    ('company_profile', 'profile_logo'),
+]
+
 def get_connection():
     return sqlite3.connect(DB_PATH)
 
@@ -29,6 +41,8 @@ def create_tables():
             past_education TEXT,
             profile_photo TEXT,
             extracted_skills TEXT,
+            skills_mask TEXT,
+            extracted_skills_mask TEXT,
             FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
         )
         """)
@@ -52,6 +66,7 @@ def create_tables():
             min_cgpa REAL DEFAULT 0,
             positions INTEGER DEFAULT 0,
             stipend INTEGER DEFAULT 0,
+            required_skills_mask TEXT,
             FOREIGN KEY(company_id) REFERENCES users(user_id) ON DELETE CASCADE
         )
         """)
@@ -69,5 +84,353 @@ def create_tables():
             FOREIGN KEY(position_id) REFERENCES company_positions(position_id)
         )
         """)
+        # One run table per background job kind (see jobs.py); single-flight applies per table
+        for run_table in JOB_RUN_TABLES:
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {run_table} (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL CHECK(status IN ('queued','running','completed','failed')),
+                phase TEXT,
+                percent REAL DEFAULT 0,
+                requested_by INTEGER,
+                options TEXT,
+                timings TEXT,
+                summary TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL
+            )
+            """)
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{run_table}_status ON {run_table}(status)")
+        # Next-best unallocated candidates per position, written with the allocations (rank 1 = next in line)
+        # foreign_keys is off: the delete paths remove these rows themselves (remove_from_waitlists)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS waitlists (
+            position_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY(position_id, student_id),
+            FOREIGN KEY(position_id) REFERENCES company_positions(position_id),
+            FOREIGN KEY(student_id) REFERENCES users(user_id)
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_waitlists_rank ON waitlists(position_id, rank)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_waitlists_student ON waitlists(student_id)")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS allocation_exclusions (
+            student_id INTEGER PRIMARY KEY,
+            reason TEXT NOT NULL,
+            FOREIGN KEY(student_id) REFERENCES users(user_id)
+        )
+        """)
+        # Canonical skill dictionary; bit <skill_id> of a *_mask column marks the skill
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS skills (
+            skill_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """)
+        _migrate_skill_masks(conn)
+        # Full-text index of extracted resume text, rowid = student user_id (see search_utils.py)
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5(
+            resume_text,
+            tokenize = 'porter unicode61'
+        )
+        """)
+        # MinHash signature of each accepted resume, for near-duplicate detection (see dedup_utils.py)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS resume_signatures (
+            student_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            FOREIGN KEY(student_id) REFERENCES users(user_id)
+        )
+        """)
+        # Bumped by write paths to invalidate cached dashboard queries (see cache.py)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            scope TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        # Student ranking of positions for the stable matching engine (rank 1 = first choice)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS preferences (
+            student_id INTEGER NOT NULL,
+            position_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY(student_id, position_id),
+            FOREIGN KEY(student_id) REFERENCES users(user_id),
+            FOREIGN KEY(position_id) REFERENCES company_positions(position_id)
+        )
+        """)
+        # Pair scores reused across allocation runs, keyed by content digests (see score_cache.py)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS pair_scores (
+            position_key INTEGER NOT NULL,
+            student_key INTEGER NOT NULL,
+            scoring_version INTEGER NOT NULL,
+            score REAL NOT NULL,
+            created_at REAL,
+            PRIMARY KEY(position_key, student_key)
+        )
+        """)
+        # Content-addressed uploads and how many profile rows reference each (see blob_store.py)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            path TEXT PRIMARY KEY,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at REAL
+        )
+        """)
+        for table, column in UPLOAD_REFERENCES:
+            _create_blob_triggers(cur, table, column)
         conn.commit()
-    print("Database schema ready")
\ No newline at end of file
+    print("Database schema ready")
+
+
+def _create_blob_triggers(cur, table, column):
+    """Keep blobs.refcount in step with the blob paths stored in table.column"""
+    register = f"""
+        INSERT OR IGNORE INTO blobs (path, refcount, created_at)
+        SELECT NEW.{column}, 0, CAST(strftime('%s', 'now') AS REAL) WHERE NEW.{column} LIKE 'blobs/%';
+        UPDATE blobs SET refcount = refcount + 1 WHERE path = NEW.{column};"""
+    release = f"""
+        UPDATE blobs SET refcount = refcount - 1 WHERE path = OLD.{column};"""
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_{table}_{column}_insert AFTER INSERT ON {table}
+    WHEN NEW.{column} LIKE 'blobs/%'
+    BEGIN {register}
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_{table}_{column}_update AFTER UPDATE OF {column} ON {table}
+    WHEN OLD.{column} IS NOT NEW.{column}
+    BEGIN {release} {register}
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_{table}_{column}_delete AFTER DELETE ON {table}
+    WHEN OLD.{column} LIKE 'blobs/%'
+    BEGIN {release}
+    END
+    """)
+
+
+# Skill masks are stored as hex TEXT: they outgrow SQLite's 64-bit INTEGER
+# as soon as the dictionary has more than 63 skills.
+SKILL_MASK_COLUMNS = {
+    'student_profile': ('user_id', {'skills_mask': 'skills', 'extracted_skills_mask': 'extracted_skills'}),
+    'company_positions': ('position_id', {'required_skills_mask': 'required_skills'}),
+}
+
+
+def load_skill_ids(conn):
+    """The skill dictionary as {canonical name: skill_id}"""
+    return dict(conn.execute("SELECT name, skill_id FROM skills"))
+
+
+def encode_skills(conn, skills):
+    """
+    Normalize a comma-separated skills string into a hex bitmask of skill IDs,
+    adding unknown skills to the dictionary. Returns None for a NULL string.
+    """
+    if skills is None:
+        return None
+    names = sorted(skill_names(skills))
+    if not names:
+        return '0'
+    conn.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(name,) for name in names])
+    rows = conn.execute(
+        f"SELECT skill_id FROM skills WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    mask = 0
+    for (skill_id,) in rows:
+        mask |= 1 << skill_id
+    return format(mask, 'x')
+
+
+def decode_skill_mask(value):
+    """Hex mask column -> int (0 for NULL)"""
+    return int(value, 16) if value else 0
+
+
+def _migrate_skill_masks(conn):
+    """Add the *_mask columns to databases created before them and backfill existing rows"""
+    for table, (key, columns) in SKILL_MASK_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for mask_column in columns:
+            if mask_column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {mask_column} TEXT")
+
+        for mask_column, source_column in columns.items():
+            rows = conn.execute(f"""
+                SELECT {key}, {source_column} FROM {table}
+                WHERE {source_column} IS NOT NULL AND {mask_column} IS NULL
+            """).fetchall()
+            if rows:
+                conn.executemany(
+                    f"UPDATE {table} SET {mask_column} = ? WHERE {key} = ?",
+                    [(encode_skills(conn, skills), row_id) for row_id, skills in rows]
+                )
+                print(f"[MIGRATION] Backfilled {len(rows)} {table}.{mask_column} values")
+
+
+def load_allocation_inputs(conn):
+    """
+    Inputs of an allocation run, shared by the admin job and the internship CLI
+
+    Returns: (students, positions, stored_skill_masks) - rows in the shape the
+             ai_engine allocators take, and the decoded extracted/required skills
+             *_mask columns ({student_id: mask}, {position_id: mask}) so the
+             engine does not reparse them
+    """
+    # Get all students with profiles
+    rows = conn.execute("""
+        SELECT u.user_id, u.name, u.email, sp.skills, sp.cgpa,
+               sp.interest_domain, sp.experience_years, sp.resume_path,
+               sp.profile_photo, sp.extracted_skills, sp.extracted_skills_mask
+        FROM users u
+        JOIN student_profile sp ON u.user_id = sp.user_id
+        WHERE u.role = 'student' AND sp.cgpa IS NOT NULL
+    """).fetchall()
+    students = [row[:-1] for row in rows]
+    student_masks = {row[0]: decode_skill_mask(row[-1]) for row in rows if row[-1] is not None}
+
+    # Get all positions
+    rows = conn.execute("""
+        SELECT position_id, company_id, domain, required_skills,
+               min_cgpa, positions, stipend, required_skills_mask
+        FROM company_positions
+    """).fetchall()
+    positions = [row[:-1] for row in rows]
+    position_masks = {row[0]: decode_skill_mask(row[-1]) for row in rows if row[-1] is not None}
+
+    # Loaded after the masks, so it knows every skill ID they use; skills the
+    # engine still has to parse get bit positions of the same dictionary
+    set_skill_ids(load_skill_ids(conn))
+    return students, positions, (student_masks, position_masks)
+
+
+def save_allocation_results(conn, allocations, exclusions, scope_student_ids=None, waitlists=None,
+                            scope_position_ids=None):
+    """
+    Replace the allocations and exclusion report in a single transaction
+
+    Args:
+        allocations: List of (student_id, company_id, position_id, score, rank)
+        exclusions: Dict of student_id -> reason
+        scope_student_ids: When set (e.g. a single re-run domain shard), only
+            rows of these students are replaced; everything else is kept
+        waitlists: Optional {position_id: [(student_id, score), ...]} best first
+            (the engine's stats['waitlists']); replaces the waitlists of all
+            positions, or only of scope_position_ids with scope_student_ids
+        scope_position_ids: The positions of the re-run scope; their waitlists
+            are cleared even when `waitlists` has no entry for them. Defaults
+            to the keys of `waitlists`
+    """
+    if scope_student_ids is None:
+        conn.execute("DELETE FROM allocations")
+        conn.execute("DELETE FROM allocation_exclusions")
+        if waitlists is not None:
+            conn.execute("DELETE FROM waitlists")
+    else:
+        scope = [(sid,) for sid in scope_student_ids]
+        conn.executemany("DELETE FROM allocations WHERE student_id = ?", scope)
+        conn.executemany("DELETE FROM allocation_exclusions WHERE student_id = ?", scope)
+        if waitlists is not None:
+            scope_positions = set(waitlists if scope_position_ids is None else scope_position_ids)
+            conn.executemany("DELETE FROM waitlists WHERE position_id = ?", [(pid,) for pid in scope_positions])
+            waitlists = {pid: waiting for pid, waiting in waitlists.items() if pid in scope_positions}
+    if waitlists is not None:
+        conn.executemany(
+            "INSERT INTO waitlists (position_id, student_id, score, rank) VALUES (?, ?, ?, ?)",
+            [(pid, sid, score, rank) for pid, waiting in waitlists.items()
+             for rank, (sid, score) in enumerate(waiting, 1)]
+        )
+    conn.executemany("""
+        INSERT INTO allocations (student_id, company_id, position_id, score, rank)
+        VALUES (?, ?, ?, ?, ?)
+    """, allocations)
+    conn.executemany(
+        "INSERT INTO allocation_exclusions (student_id, reason) VALUES (?, ?)",
+        exclusions.items()
+    )
+    cache.invalidate(conn, 'allocations')
+    conn.commit()
+
+
+def load_preferences(conn):
+    """Every student's ranking as {student_id: [position_id, ...]}, first choice first"""
+    preferences = {}
+    for student_id, position_id in conn.execute(
+            "SELECT student_id, position_id FROM preferences ORDER BY student_id, rank"):
+        preferences.setdefault(student_id, []).append(position_id)
+    return preferences
+
+
+def save_preferences(conn, student_id, position_ids):
+    """Replace a student's ranking with position_ids (best first, duplicates dropped); caller commits"""
+    conn.execute("DELETE FROM preferences WHERE student_id = ?", (student_id,))
+    conn.executemany(
+        "INSERT INTO preferences (student_id, position_id, rank) VALUES (?, ?, ?)",
+        [(student_id, position_id, rank) for rank, position_id in enumerate(dict.fromkeys(position_ids), 1)]
+    )
+
+
+def remove_from_waitlists(conn, student_ids=(), position_ids=()):
+    """Drop waitlist rows of these students and/or positions (caller commits)"""
+    conn.executemany("DELETE FROM waitlists WHERE student_id = ?", [(sid,) for sid in student_ids])
+    conn.executemany("DELETE FROM waitlists WHERE position_id = ?", [(pid,) for pid in position_ids])
+
+
+def fill_vacancies(conn, position_id):
+    """
+    Give a position's free seats to the head of its waitlist, without rescoring
+
+    Waitlisted students allocated elsewhere in the meantime are skipped. A
+    promoted student gets the next rank of the position, leaves every waitlist
+    and the exclusion report. Caller commits.
+
+    Returns: [(student_id, score, rank), ...] of the promoted students
+    """
+    position = conn.execute(
+        "SELECT company_id, positions FROM company_positions WHERE position_id = ?", (position_id,)
+    ).fetchone()
+    if position is None:
+        return []
+    company_id, capacity = position
+    filled, last_rank = conn.execute(
+        "SELECT COUNT(*), COALESCE(MAX(rank), 0) FROM allocations WHERE position_id = ?", (position_id,)
+    ).fetchone()
+
+    promoted = []
+    while filled < (capacity or 0):
+        head = conn.execute("""
+            SELECT w.student_id, w.score, a.allocation_id
+            FROM waitlists w LEFT JOIN allocations a ON a.student_id = w.student_id
+            WHERE w.position_id = ?
+            ORDER BY w.rank LIMIT 1
+        """, (position_id,)).fetchone()
+        if head is None:
+            break
+        student_id, score, allocated = head
+        if allocated is None:
+            last_rank += 1
+            filled += 1
+            conn.execute("""
+                INSERT INTO allocations (student_id, company_id, position_id, score, rank)
+                VALUES (?, ?, ?, ?, ?)
+            """, (student_id, company_id, position_id, score, last_rank))
+            conn.execute("DELETE FROM allocation_exclusions WHERE student_id = ?", (student_id,))
+            remove_from_waitlists(conn, student_ids=[student_id])
+            promoted.append((student_id, score, last_rank))
+        else:
+            conn.execute("DELETE FROM waitlists WHERE position_id = ? AND student_id = ?",
+                         (position_id, student_id))
+    if promoted:
+        cache.invalidate(conn, 'allocations')
+    return promoted
@@ -0,0 +1,156 @@
+import hashlib
+import random
+import re
+from array import array
+
+# ============================================================================
+# NEAR-DUPLICATE RESUME DETECTION (MinHash + LSH)
+# ============================================================================
+# A resume is reduced to the set of its word 3-grams ("shingles") and then to a
+# MinHash signature of NUM_PERM values: the fraction of positions where two
+# signatures agree estimates the Jaccard similarity of the shingle sets.
+# Signatures are computed when a resume is uploaded and stored in
+# resume_signatures (keyed by student user_id), so detection never reads a PDF.
+#
+# Comparing every pair is quadratic. Locality-sensitive hashing splits each
+# signature into LSH_BANDS bands; only resumes sharing an identical band are
+# compared, which keeps the cost close to linear in the number of resumes.
+# With 16 bands of 4 rows a pair at 0.8 similarity is compared with
+# probability > 0.999, a pair at 0.3 with about 0.12.
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+LSH_BANDS = 16
+DUPLICATE_THRESHOLD = 0.8   # estimated Jaccard similarity from which two resumes count as copies
+
+_ROWS_PER_BAND = NUM_PERM // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD = re.compile(r'\w+')
+
+# Fixed seed: signatures stored in the database must stay comparable across processes and restarts
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERM)]
+
+
+def resume_shingles(text, size=SHINGLE_SIZE):
+    """64-bit hashes of the lowercased word `size`-grams of a text"""
+    words = _WORD.findall((text or '').lower())
+    if not words:
+        return set()
+    grams = [' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))]
+    return {int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+            for gram in grams}
+
+
+def minhash_signature(text):
+    """
+    MinHash signature of a resume text
+
+    Returns: array('Q') of NUM_PERM values, or None if the text has no words
+    """
+    shingles = resume_shingles(text)
+    if not shingles:
+        return None
+    return array('Q', [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+                       for a, b in _PERMUTATIONS])
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two resumes behind the signatures"""
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERM
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def store_signature(conn, student_id, resume_text):
+    """Replace the stored signature of a student's resume (caller commits)"""
+    signature = minhash_signature(resume_text)
+    conn.execute("DELETE FROM resume_signatures WHERE student_id = ?", (student_id,))
+    if signature is not None:
+        conn.execute("INSERT INTO resume_signatures (student_id, signature) VALUES (?, ?)",
+                     (student_id, signature.tobytes()))
+    return signature
+
+
+def remove_signatures(conn, student_ids):
+    conn.executemany("DELETE FROM resume_signatures WHERE student_id = ?", [(sid,) for sid in student_ids])
+
+
+def load_signatures(conn):
+    """All stored signatures as {student_id: array('Q')}"""
+    signatures = {}
+    for student_id, blob in conn.execute("SELECT student_id, signature FROM resume_signatures"):
+        signature = array('Q')
+        signature.frombytes(blob)
+        if len(signature) == NUM_PERM:   # written with another NUM_PERM: ignore until re-uploaded
+            signatures[student_id] = signature
+    return signatures
+
+
+# ============================================================================
+# LSH CLUSTERING
+# ============================================================================
+
+def find_duplicate_clusters(signatures, threshold=DUPLICATE_THRESHOLD):
+    """
+    Group resumes whose estimated similarity reaches `threshold`
+
+    Args:
+        signatures: {student_id: signature}
+
+    Returns: [{'student_ids': [...], 'similarity': highest pair similarity}, ...]
+             clusters of two or more students, ordered by their smallest student_id
+    """
+    buckets = {}
+    for student_id, signature in signatures.items():
+        for band in range(LSH_BANDS):
+            start = band * _ROWS_PER_BAND
+            key = (band, signature[start:start + _ROWS_PER_BAND].tobytes())
+            buckets.setdefault(key, []).append(student_id)
+
+    parent = {}
+
+    def root(student_id):
+        while parent.get(student_id, student_id) != student_id:
+            student_id = parent[student_id]
+        return student_id
+
+    compared = set()
+    best = {}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pair = (first, second) if first < second else (second, first)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                similarity = estimate_similarity(signatures[first], signatures[second])
+                if similarity < threshold:
+                    continue
+                a, b = root(first), root(second)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+                for student_id in pair:
+                    best[student_id] = max(best.get(student_id, 0.0), similarity)
+
+    clusters = {}
+    for student_id in best:
+        clusters.setdefault(root(student_id), []).append(student_id)
+    return sorted(({'student_ids': sorted(members), 'similarity': max(best[sid] for sid in members)}
+                   for members in clusters.values()), key=lambda cluster: cluster['student_ids'][0])
+
+
+def duplicate_notes(clusters):
+    """{student_id: note} naming the other students of each student's duplicate cluster"""
+    notes = {}
+    for cluster in clusters:
+        for student_id in cluster['student_ids']:
+            others = ', '.join(str(sid) for sid in cluster['student_ids'] if sid != student_id)
+            notes[student_id] = (f"Possible duplicate resume: near-identical to student(s) {others} "
+                                 f"({cluster['similarity']:.0%} similar)")
+    return notes
@@ -155,7 +155,7 @@ def send_allocation_email(mail, student_email, student_name, company_name, domai
         return False, error_msg
 
 
-def send_bulk_allocation_emails(mail, allocations_data):
+def send_bulk_allocation_emails(mail, allocations_data, progress=None):
     """
     Send allocation emails to multiple students
     
@@ -170,6 +170,7 @@ def send_bulk_allocation_emails(mail, allocations_data):
             - location
             - rank
             - match_score
+        progress: Optional callback progress(done, total) called after each email
     
     Returns:
         tuple: (success_count, failed_count, errors)
@@ -203,6 +204,9 @@ def send_bulk_allocation_emails(mail, allocations_data):
                 'error': message
             })
             print(f"[BULK EMAIL] Failed for {data['student_email']}: {message}")
+        
+        if progress:
+            progress(success_count + failed_count, len(allocations_data))
     
     print(f"[BULK EMAIL SUMMARY] Sent: {success_count} | Failed: {failed_count}")
     return success_count, failed_count, errors
\ No newline at end of file
@@ -0,0 +1,239 @@
+import csv
+import io
+import tempfile
+
+# ============================================================================
+# EXPORTABLE DATASETS
+# ============================================================================
+# Each dataset is a FROM/JOIN clause plus whitelisted columns and filters, so
+# user-supplied column/filter names never reach the SQL text directly.
+#   columns: key -> (sql expression, header)
+#   filters: key -> (sql condition with one placeholder, value parser)
+
+def _parse_bool(value):
+    return 1 if str(value).strip().lower() in ('1', 'true', 'yes', 'on') else 0
+
+
+DATASETS = {
+    'students': {
+        'from': """
+            FROM users u
+            LEFT JOIN student_profile sp ON u.user_id = sp.user_id
+            LEFT JOIN allocations a ON a.student_id = u.user_id
+        """,
+        'where': "u.role = 'student'",
+        'order_by': "u.user_id",
+        'columns': {
+            'student_id': ("u.user_id", 'Student ID'),
+            'name': ("u.name", 'Name'),
+            'email': ("u.email", 'Email'),
+            'skills': ("sp.skills", 'Skills'),
+            'cgpa': ("sp.cgpa", 'CGPA'),
+            'domain': ("sp.interest_domain", 'Domain'),
+            'experience_years': ("sp.experience_years", 'Experience (years)'),
+            'extracted_skills': ("sp.extracted_skills", 'Extracted Skills'),
+            'has_resume': ("CASE WHEN sp.resume_path IS NULL OR sp.resume_path = '' THEN 'No' ELSE 'Yes' END",
+                           'Resume Uploaded'),
+            'allocated': ("CASE WHEN a.student_id IS NULL THEN 'No' ELSE 'Yes' END", 'Allocated'),
+        },
+        'default_columns': ['name', 'email', 'skills', 'cgpa', 'domain', 'experience_years'],
+        'filters': {
+            'domain': ("sp.interest_domain = ?", str),
+            'min_cgpa': ("sp.cgpa >= ?", float),
+            'max_cgpa': ("sp.cgpa <= ?", float),
+            'has_resume': ("(CASE WHEN sp.resume_path IS NULL OR sp.resume_path = '' THEN 0 ELSE 1 END) = ?",
+                           _parse_bool),
+            'allocated': ("(CASE WHEN a.student_id IS NULL THEN 0 ELSE 1 END) = ?", _parse_bool),
+        },
+    },
+    'allocations': {
+        'from': """
+            FROM allocations a
+            JOIN users u ON a.student_id = u.user_id
+            LEFT JOIN company_profile cp ON a.company_id = cp.user_id
+            LEFT JOIN company_positions pos ON a.position_id = pos.position_id
+        """,
+        'where': "1 = 1",
+        'order_by': "a.company_id, a.position_id, a.rank",
+        'columns': {
+            'student_id': ("a.student_id", 'Student ID'),
+            'student_name': ("u.name", 'Student'),
+            'student_email': ("u.email", 'Email'),
+            'company_id': ("a.company_id", 'Company ID'),
+            'company_name': ("cp.company_name", 'Company'),
+            'position_id': ("a.position_id", 'Position ID'),
+            'domain': ("pos.domain", 'Domain'),
+            'stipend': ("pos.stipend", 'Stipend'),
+            'location': ("cp.location", 'Location'),
+            'score': ("a.score", 'Score'),
+            'rank': ("a.rank", 'Rank'),
+        },
+        'default_columns': ['student_name', 'student_email', 'company_name', 'domain',
+                            'stipend', 'score', 'rank'],
+        'filters': {
+            'company_id': ("a.company_id = ?", int),
+            'position_id': ("a.position_id = ?", int),
+            'domain': ("pos.domain = ?", str),
+            'min_score': ("a.score >= ?", float),
+        },
+    },
+    'positions': {
+        'from': """
+            FROM company_positions pos
+            LEFT JOIN company_profile cp ON pos.company_id = cp.user_id
+        """,
+        'where': "1 = 1",
+        'order_by': "pos.company_id, pos.position_id",
+        'columns': {
+            'position_id': ("pos.position_id", 'Position ID'),
+            'company_id': ("pos.company_id", 'Company ID'),
+            'company_name': ("cp.company_name", 'Company'),
+            'domain': ("pos.domain", 'Domain'),
+            'required_skills': ("pos.required_skills", 'Required Skills'),
+            'min_cgpa': ("pos.min_cgpa", 'Min CGPA'),
+            'positions': ("pos.positions", 'Openings'),
+            'stipend': ("pos.stipend", 'Stipend'),
+            'filled': ("(SELECT COUNT(*) FROM allocations a WHERE a.position_id = pos.position_id)", 'Filled'),
+        },
+        'default_columns': ['position_id', 'company_name', 'domain', 'required_skills',
+                            'min_cgpa', 'positions', 'filled', 'stipend'],
+        'filters': {
+            'company_id': ("pos.company_id = ?", int),
+            'domain': ("pos.domain = ?", str),
+            'min_stipend': ("pos.stipend >= ?", int),
+        },
+    },
+    'exclusions': {
+        'from': """
+            FROM allocation_exclusions ex
+            JOIN users u ON ex.student_id = u.user_id
+            LEFT JOIN student_profile sp ON ex.student_id = sp.user_id
+        """,
+        'where': "1 = 1",
+        'order_by': "ex.student_id",
+        'columns': {
+            'student_id': ("ex.student_id", 'Student ID'),
+            'name': ("u.name", 'Name'),
+            'email': ("u.email", 'Email'),
+            'domain': ("sp.interest_domain", 'Domain'),
+            'cgpa': ("sp.cgpa", 'CGPA'),
+            'reason': ("ex.reason", 'Reason'),
+        },
+        'default_columns': ['student_id', 'name', 'email', 'domain', 'cgpa', 'reason'],
+        'filters': {
+            'domain': ("sp.interest_domain = ?", str),
+            'reason': ("ex.reason LIKE '%' || ? || '%'", str),
+        },
+    },
+}
+
+EXPORT_FETCH_SIZE = 500   # rows pulled from SQLite per fetchmany()
+CSV_FLUSH_ROWS = 500      # rows buffered before a chunk is yielded
+
+
+def build_export_query(dataset: str, columns=None, filters=None):
+    """
+    Build the SELECT for an export
+
+    Args:
+        dataset: One of DATASETS
+        columns: Column keys to include (None = dataset defaults)
+        filters: Dict of filter key -> raw string value; unknown keys are ignored
+
+    Returns:
+        (sql, params, headers)
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown export dataset '{dataset}'")
+    spec = DATASETS[dataset]
+
+    columns = [c for c in (columns or spec['default_columns']) if c in spec['columns']]
+    if not columns:
+        raise ValueError(f"No valid columns selected for '{dataset}'")
+
+    conditions = [spec['where']]
+    params = []
+    for key, raw_value in (filters or {}).items():
+        if key not in spec['filters'] or raw_value in (None, ''):
+            continue
+        condition, parse = spec['filters'][key]
+        try:
+            params.append(parse(raw_value))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for filter '{key}': {raw_value!r}")
+        conditions.append(condition)
+
+    select = ", ".join(spec['columns'][c][0] for c in columns)
+    sql = f"SELECT {select} {spec['from']} WHERE {' AND '.join(conditions)} ORDER BY {spec['order_by']}"
+    headers = [spec['columns'][c][1] for c in columns]
+    return sql, params, headers
+
+
+def iter_export_rows(conn, sql, params):
+    """Stream rows from a cursor in fetchmany() batches instead of fetchall()"""
+    cursor = conn.execute(sql, params)
+    while True:
+        batch = cursor.fetchmany(EXPORT_FETCH_SIZE)
+        if not batch:
+            break
+        yield from batch
+
+
+def iter_csv(conn, dataset, columns=None, filters=None):
+    """
+    Generate CSV text chunks for a dataset
+
+    Memory stays flat regardless of row count: at most CSV_FLUSH_ROWS rows are
+    buffered before a chunk is yielded to the caller (e.g. a chunked response).
+    """
+    sql, params, headers = build_export_query(dataset, columns, filters)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+
+    pending = 0
+    for row in iter_export_rows(conn, sql, params):
+        writer.writerow(row)
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+def write_xlsx(conn, dataset, fileobj, columns=None, filters=None):
+    """
+    Write a dataset to an .xlsx file using openpyxl's write-only worksheet
+
+    Rows go straight from the cursor to the worksheet's temp XML stream, so no
+    cell objects are kept in memory. Pass a real file (e.g. TemporaryFile) as
+    fileobj to keep the finished archive off the heap as well.
+
+    Returns: number of data rows written
+    """
+    from openpyxl import Workbook
+
+    sql, params, headers = build_export_query(dataset, columns, filters)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=dataset.capitalize())
+    ws.append(headers)
+
+    row_count = 0
+    for row in iter_export_rows(conn, sql, params):
+        ws.append(list(row))
+        row_count += 1
+
+    wb.save(fileobj)
+    fileobj.seek(0)
+    return row_count
+
+
+def spooled_xlsx(conn, dataset, columns=None, filters=None):
+    """Write an export to an anonymous temp file and return it rewound"""
+    output = tempfile.TemporaryFile()
+    write_xlsx(conn, dataset, output, columns, filters)
+    return output
@@ -0,0 +1,62 @@
+import os
+from io import BytesIO
+
+import metrics
+from blob_store import cache_path, is_blob, write_atomic
+
+# ============================================================================
+# THUMBNAILS
+# ============================================================================
+# List views (admin and company dashboards) show profile photos and logos at
+# avatar size. They link to 'thumbs/<blob path>' instead of the original; the
+# upload route answers it with a small JPEG made by Pillow on first request
+# and cached under uploads/cache/thumbs/ with the blob's digest, so it is
+# removed with the blob. Files outside the blob store are served as they are.
+
+THUMBNAIL_PREFIX = 'thumbs/'
+THUMBNAIL_SIZE = 96             # px, longest side
+THUMBNAIL_QUALITY = 80
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+
+
+def thumbnail_path(path):
+    """Upload-relative URL path of an image upload's thumbnail (the path itself for other files)"""
+    if path and is_blob(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+        return THUMBNAIL_PREFIX + path
+    return path
+
+
+def make_thumbnail(full_path, size=THUMBNAIL_SIZE):
+    """
+    Cached JPEG thumbnail of an image blob, created on first use
+
+    Returns: absolute path of the thumbnail, or None when the file is not an
+             image blob or cannot be decoded
+    """
+    thumbnail = cache_path(full_path, 'thumbs', f"_{size}.jpg")
+    if thumbnail is None or os.path.splitext(full_path)[1].lower() not in IMAGE_EXTENSIONS:
+        return None
+    if os.path.exists(thumbnail):
+        return thumbnail
+
+    try:
+        from PIL import Image, ImageOps  # Pillow - loaded on first thumbnail, not at startup
+        with Image.open(full_path) as image:
+            image.draft('RGB', (size, size))    # JPEGs are decoded at a reduced scale
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                flattened = Image.new('RGB', image.size, 'white')
+                flattened.paste(image, mask=image.getchannel('A'))
+                image = flattened
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    except Exception as e:
+        print(f"[THUMBNAIL ERROR] {full_path}: {str(e)}")
+        return None
+    write_atomic(thumbnail, buffer.getvalue())
+    metrics.inc('thumbnails_generated_total')
+    return thumbnail
@@ -0,0 +1,313 @@
+import csv
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+import cache
+from database import encode_skills
+
+# ============================================================================
+# IMPORTABLE ENTITIES
+# ============================================================================
+# Each kind lists its accepted columns as key -> (required, parser). Header
+# cells are matched case-insensitively with spaces turned into underscores;
+# unknown columns are ignored. A parser returns the stored value or raises
+# ValueError with the message that ends up in the per-row error report.
+
+IMPORT_BATCH_SIZE = 500   # rows validated and written per transaction
+MAX_ERRORS_REPORTED = 1000
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _text(value):
+    return str(value).strip()
+
+
+def _email(value):
+    value = _text(value)
+    if not _EMAIL.match(value):
+        raise ValueError(f"invalid email {value!r}")
+    return value
+
+
+def _password(value):
+    value = str(value)
+    if len(value) < 6:
+        raise ValueError("password must have at least 6 characters")
+    return value
+
+
+def _number(kind, low=None, high=None):
+    def parse(value):
+        try:
+            number = kind(float(value)) if kind is int else kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"not a number: {value!r}")
+        if (low is not None and number < low) or (high is not None and number > high):
+            raise ValueError(f"{number} is outside {low}..{high}")
+        return number
+    return parse
+
+
+IMPORTS = {
+    'students': {
+        'role': 'student',
+        'columns': {
+            'name': (True, _text),
+            'email': (True, _email),
+            'password': (True, _password),
+            'cgpa': (False, _number(float, 0, 10)),
+            'interest_domain': (False, _text),
+            'experience_years': (False, _number(int, 0, 60)),
+            'skills': (False, _text),
+            'past_education': (False, _text),
+        },
+        'aliases': {'domain': 'interest_domain', 'experience': 'experience_years'},
+    },
+    'companies': {
+        'role': 'company',
+        'columns': {
+            'name': (True, _text),
+            'email': (True, _email),
+            'password': (True, _password),
+            'company_name': (False, _text),
+            'location': (False, _text),
+            'contact_email': (False, _email),
+            'contact_no': (False, _text),
+        },
+        'aliases': {},
+    },
+    'positions': {
+        'role': None,
+        'columns': {
+            'company_email': (False, _email),
+            'company_id': (False, _number(int, 1)),
+            'domain': (True, _text),
+            'required_skills': (False, _text),
+            'min_cgpa': (False, _number(float, 0, 10)),
+            'positions': (False, _number(int, 0)),
+            'stipend': (False, _number(int, 0)),
+        },
+        'aliases': {'openings': 'positions'},
+    },
+}
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def read_rows(file, filename):
+    """
+    Stream (row_number, {header: cell}) pairs from an uploaded .csv or .xlsx file
+
+    XLSX is read with openpyxl in read-only mode, which parses the sheet lazily
+    instead of loading the whole workbook. Row numbers match the spreadsheet
+    (the header is row 1); empty rows are skipped.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        rows = enumerate(reader, 1)
+        workbook = None
+    elif extension == 'xlsx':
+        from openpyxl import load_workbook   # lazy: keeps app startup light
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = enumerate(workbook.active.iter_rows(values_only=True), 1)
+    else:
+        raise ValueError("Upload a .csv or .xlsx file")
+
+    try:
+        header = None
+        for row_number, cells in rows:
+            if not any(cell not in (None, '') for cell in cells):
+                continue
+            if header is None:
+                header = [str(cell or '').strip().lower().replace(' ', '_') for cell in cells]
+                continue
+            yield row_number, {key: cell for key, cell in zip(header, cells) if key}
+    finally:
+        if workbook is not None:
+            workbook.close()
+
+
+def validate_row(kind, raw):
+    """
+    Parse one raw row of an import kind
+
+    Returns: (values, errors) - values holds every known column (None if empty)
+    """
+    spec = IMPORTS[kind]
+    raw = {spec['aliases'].get(key, key): value for key, value in raw.items()}
+    values = {}
+    errors = []
+    for column, (required, parse) in spec['columns'].items():
+        value = raw.get(column)
+        if value is None or str(value).strip() == '':
+            values[column] = None
+            if required:
+                errors.append(f"{column} is required")
+            continue
+        try:
+            values[column] = parse(value)
+        except ValueError as e:
+            errors.append(f"{column}: {e}")
+    if kind == 'positions' and values['company_email'] is None and values['company_id'] is None:
+        errors.append("company_email or company_id is required")
+    return values, errors
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _in_clause(values):
+    return ','.join('?' * len(values))
+
+
+def hash_passwords(passwords, pool=None):
+    """generate_password_hash over a list, in the process pool when given (hashing is deliberately slow)"""
+    if pool is None:
+        return [generate_password_hash(password) for password in passwords]
+    return list(pool.map(generate_password_hash, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def _write_users(conn, kind, rows, pool):
+    """Insert users + their profile rows; returns {row_number: error} for rows skipped"""
+    role = IMPORTS[kind]['role']
+    failed = {}
+    emails = [values['email'] for _, values in rows]
+    existing = {row[0] for row in conn.execute(
+        f"SELECT email FROM users WHERE email IN ({_in_clause(emails)})", emails)}
+    accepted = []
+    for row_number, values in rows:
+        if values['email'] in existing:
+            failed[row_number] = f"email {values['email']} is already registered"
+        else:
+            existing.add(values['email'])   # also rejects a repeat further down the same batch
+            accepted.append(values)
+    if not accepted:
+        return failed
+
+    hashes = hash_passwords([values['password'] for values in accepted], pool)
+    conn.executemany("INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)",
+                     [(values['name'], values['email'], hashed, role) for values, hashed in zip(accepted, hashes)])
+    emails = [values['email'] for values in accepted]
+    user_ids = dict(conn.execute(f"SELECT email, user_id FROM users WHERE email IN ({_in_clause(emails)})", emails))
+
+    if kind == 'students':
+        conn.executemany("""
+            INSERT INTO student_profile
+            (user_id, skills, cgpa, interest_domain, experience_years, past_education, skills_mask)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(user_ids[v['email']], v['skills'], v['cgpa'] if v['cgpa'] is not None else 0, v['interest_domain'],
+               v['experience_years'] or 0, v['past_education'], encode_skills(conn, v['skills']))
+              for v in accepted])
+        cache.invalidate(conn, 'students')
+    else:
+        conn.executemany("""
+            INSERT INTO company_profile (user_id, company_name, location, contact_email, contact_no)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(user_ids[v['email']], v['company_name'], v['location'], v['contact_email'], v['contact_no'])
+              for v in accepted])
+        cache.invalidate(conn, 'companies')
+    return failed
+
+
+def _write_positions(conn, rows):
+    """Insert positions for existing companies; returns {row_number: error} for rows skipped"""
+    failed = {}
+    emails = sorted({values['company_email'] for _, values in rows if values['company_email']})
+    ids = sorted({values['company_id'] for _, values in rows if values['company_id']})
+    by_email = dict(conn.execute(
+        f"SELECT email, user_id FROM users WHERE role = 'company' AND email IN ({_in_clause(emails)})", emails))
+    known_ids = {row[0] for row in conn.execute(
+        f"SELECT user_id FROM users WHERE role = 'company' AND user_id IN ({_in_clause(ids)})", ids)}
+
+    inserts = []
+    for row_number, values in rows:
+        if values['company_email']:
+            company_id = by_email.get(values['company_email'])
+            if company_id is None:
+                failed[row_number] = f"no company with email {values['company_email']}"
+                continue
+        else:
+            company_id = values['company_id']
+            if company_id not in known_ids:
+                failed[row_number] = f"no company with id {company_id}"
+                continue
+        required_skills = values['required_skills'] or ''
+        inserts.append((company_id, values['domain'], required_skills, values['min_cgpa'] or 0,
+                        values['positions'] or 0, values['stipend'] or 0, encode_skills(conn, required_skills)))
+
+    conn.executemany("""
+        INSERT INTO company_positions
+        (company_id, domain, required_skills, min_cgpa, positions, stipend, required_skills_mask)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, inserts)
+    cache.invalidate(conn, 'positions', *sorted({f"company:{row[0]}" for row in inserts}))
+    return failed
+
+
+def import_rows(conn, kind, rows, workers=1, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert (row_number, raw_row) pairs of one import kind
+
+    Rows are handled in batches of `batch_size`, each validated together and
+    written with executemany in its own transaction, so a failing batch never
+    leaves half its rows behind and memory stays flat for any file size.
+
+    Args:
+        workers: processes used for password hashing (1 = in-process)
+
+    Returns: {'kind', 'rows', 'imported', 'failed', 'errors': [{'row', 'errors'}, ...]}
+             errors holds at most MAX_ERRORS_REPORTED entries
+    """
+    if kind not in IMPORTS:
+        raise ValueError(f"Unknown import kind {kind!r}")
+    report = {'kind': kind, 'rows': 0, 'imported': 0, 'failed': 0, 'errors': []}
+
+    def reject(row_number, errors):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_ERRORS_REPORTED:
+            report['errors'].append({'row': row_number, 'errors': errors})
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and IMPORTS[kind]['role'] else None
+    try:
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            report['rows'] += len(batch)
+            valid = []
+            for row_number, raw in batch:
+                values, errors = validate_row(kind, raw)
+                if errors:
+                    reject(row_number, errors)
+                else:
+                    valid.append((row_number, values))
+            if not valid:
+                continue
+
+            try:
+                if kind == 'positions':
+                    failed = _write_positions(conn, valid)
+                else:
+                    failed = _write_users(conn, kind, valid, pool)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                failed = {row_number: f"batch not saved: {e}" for row_number, _ in valid}
+            for row_number, error in sorted(failed.items()):
+                reject(row_number, [error])
+            report['imported'] += len(valid) - len(failed)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+🎓 Headless command line for the Internship Allocation Platform
+
+Runs validation, scoring and allocation without the web app, against
+platform.db or a JSON/CSV snapshot:
+
+    python -m internship alloc                         # read platform.db, print summary
+    python -m internship alloc --write-db              # ... and replace the allocations table
+    python -m internship alloc --snapshot snap.json --output result.json
+    python -m internship alloc --students s.csv --positions p.csv --workers 4
+    python -m internship alloc --domain "Data Science" --write-db   # re-run one shard
+    python -m internship alloc --score-cache           # only score pairs that changed since the last run
+    python -m internship alloc --engine stable         # deferred acceptance over student preferences
+    python -m internship score --output scores.csv     # every eligible pair with its score
+    python -m internship snapshot --output snap.json   # dump platform.db (+ resume text)
+    python -m internship reindex --workers 4           # fill the resume full-text index and signatures
+    python -m internship migrate-uploads               # move pre-blob-store uploads into the blob store
+    python -m internship simulate --variants v.json    # what-if runs, nothing written
+
+Snapshot records use the column names of student_profile / company_positions.
+A student record may carry `resume_text` directly; otherwise `resume_path` is
+resolved against --uploads and the PDF is parsed. Student rankings for the
+stable engine come from the preferences table, a snapshot's `preferences` list
+or --preferences (records with student_id, position_id, rank).
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+from ai_engine import (
+    ALLOCATION_ENGINES,
+    TermIndex,
+    extract_resume_features,
+    is_resume_fake_or_spam,
+    normalize_domain,
+    skill_masks,
+    student_company_position_score
+)
+from dedup_utils import store_signature
+from maintenance import migrate_legacy_uploads
+from pdf_utils import extract_text_from_pdf
+from score_cache import PairScoreCache
+from search_utils import index_resume
+from simulation import parse_variants, simulate
+
+STUDENT_FIELDS = ['user_id', 'name', 'email', 'skills', 'cgpa', 'interest_domain',
+                  'experience_years', 'resume_path', 'profile_photo', 'extracted_skills']
+POSITION_FIELDS = ['position_id', 'company_id', 'domain', 'required_skills',
+                   'min_cgpa', 'positions', 'stipend']
+
+STUDENT_TYPES = {'user_id': int, 'cgpa': float, 'experience_years': int}
+POSITION_TYPES = {'position_id': int, 'company_id': int, 'min_cgpa': float,
+                  'positions': int, 'stipend': int}
+
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+class PhaseTimer:
+    """Collects wall time per phase; progress() matches the ai_engine callback"""
+
+    def __init__(self):
+        self.timings = {}
+        self.current = None
+        self._started = None
+
+    def phase(self, name):
+        now = time.monotonic()
+        if self.current is not None:
+            self.timings[self.current] = self.timings.get(self.current, 0) + now - self._started
+        self.current = name
+        self._started = now
+
+    def progress(self, phase, done, total):
+        if phase != self.current:
+            self.phase(phase)
+
+    def stop(self):
+        self.phase(None)
+        self.current = None
+        return self.timings
+
+    def report(self):
+        print("\n⏱️  PHASE TIMINGS")
+        for name, seconds in self.timings.items():
+            print(f"   {name:<12} {seconds:8.3f} s")
+        print(f"   {'total':<12} {sum(self.timings.values()):8.3f} s")
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def _read_records(path):
+    """Read a list of dicts from a .json (list) or .csv file"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _to_row(record, fields, types):
+    row = []
+    for field in fields:
+        value = record.get(field)
+        if value == '':
+            value = None
+        if value is not None and field in types:
+            value = types[field](value)
+        row.append(value)
+    return tuple(row)
+
+
+def load_from_db(db_path):
+    """
+    Return (students, positions, inline_resume_texts, stored_skill_masks) the
+    way admin allocation loads them (database.load_allocation_inputs)
+    """
+    database.DB_PATH = db_path
+    database.create_tables()   # the *_mask columns may not exist yet in an older --db
+    with database.get_connection() as conn:
+        students, positions, stored_skill_masks = database.load_allocation_inputs(conn)
+    return students, positions, {}, stored_skill_masks
+
+
+def load_from_files(snapshot=None, students_path=None, positions_path=None):
+    """
+    Load students/positions from a JSON snapshot and/or separate JSON/CSV files
+
+    Returns: (students, positions, inline_resume_texts)
+    """
+    student_records, position_records = [], []
+    if snapshot:
+        with open(snapshot, encoding='utf-8') as f:
+            data = json.load(f)
+        student_records = data.get('students', [])
+        position_records = data.get('positions', [])
+    if students_path:
+        student_records = _read_records(students_path)
+    if positions_path:
+        position_records = _read_records(positions_path)
+
+    students = [_to_row(r, STUDENT_FIELDS, STUDENT_TYPES) for r in student_records]
+    positions = [_to_row(r, POSITION_FIELDS, POSITION_TYPES) for r in position_records]
+    inline_texts = {int(r['user_id']): r['resume_text'] for r in student_records if r.get('resume_text')}
+    return students, positions, inline_texts
+
+
+def load_preferences(args):
+    """
+    Student rankings {student_id: [position_id, ...]} from --preferences, the
+    snapshot's `preferences` list or the preferences table of --db
+    """
+    if args.preferences:
+        records = _read_records(args.preferences)
+    elif args.snapshot:
+        with open(args.snapshot, encoding='utf-8') as f:
+            records = json.load(f).get('preferences', [])
+    elif args.students or args.positions:
+        return {}
+    else:
+        database.DB_PATH = args.db
+        database.create_tables()   # preferences may not exist yet in an older --db
+        with database.get_connection() as conn:
+            return database.load_preferences(conn)
+    preferences = {}
+    for record in sorted(records, key=lambda r: (int(r['student_id']), int(r['rank']))):
+        preferences.setdefault(int(record['student_id']), []).append(int(record['position_id']))
+    return preferences
+
+
+def load_resume_texts(students, uploads_dir, inline_texts=None, workers=1, reduce=None):
+    """
+    Parse resume PDFs (in a process pool when workers > 1) for students without inline text
+
+    With reduce(student_id, text), each text is replaced by reduce's result as
+    soon as it is parsed, so no more than a few texts are held at once.
+    """
+    inline_texts = inline_texts or {}
+    if reduce is None:
+        reduce = lambda sid, text: text
+    resume_texts = {sid: reduce(sid, text) for sid, text in inline_texts.items()}
+    pending = []
+    for student in students:
+        sid, resume_path = student[0], student[7]
+        if sid in inline_texts or not resume_path:
+            continue
+        full_path = os.path.join(uploads_dir, resume_path)
+        if os.path.exists(full_path):
+            pending.append((sid, full_path))
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            texts = pool.map(extract_text_from_pdf, [p for _, p in pending],
+                             chunksize=max(1, len(pending) // (workers * 4)))
+            for (sid, _), text in zip(pending, texts):
+                resume_texts[sid] = reduce(sid, text)
+    else:
+        for sid, full_path in pending:
+            resume_texts[sid] = reduce(sid, extract_text_from_pdf(full_path))
+    return resume_texts
+
+
+def load_inputs(args, timer, features=False):
+    """
+    Students, positions, their resumes and the stored skill masks (None for
+    file inputs); with features=True every resume is reduced to its
+    ResumeFeatures while loading (see ai_engine.extract_resume_features)
+    """
+    timer.phase('load')
+    if args.snapshot or args.students or args.positions:
+        students, positions, inline_texts = load_from_files(args.snapshot, args.students, args.positions)
+        stored_skill_masks = None
+    else:
+        students, positions, inline_texts, stored_skill_masks = load_from_db(args.db)
+
+    timer.phase('resumes')
+    reduce = None
+    if features:
+        term_index = TermIndex(positions)
+        domains = {student[0]: student[5] for student in students}
+        reduce = lambda sid, text: extract_resume_features(text, domains[sid], term_index)
+    resume_texts = load_resume_texts(students, args.uploads, inline_texts, args.workers, reduce)
+    del inline_texts
+    print(f"📥 Loaded {len(students)} students, {len(positions)} positions, {len(resume_texts)} resumes")
+    return students, positions, resume_texts, stored_skill_masks
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def write_rows(path, headers, rows, extra=None):
+    """Write rows as CSV, or as JSON (list of dicts plus `extra` keys) for .json paths"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(rows)
+        return
+    payload = {'rows': [dict(zip(headers, row)) for row in rows]}
+    payload.update(extra or {})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+
+
+@contextlib.contextmanager
+def _engine_output(verbose):
+    """ai_engine prints per-pair diagnostics; silence them unless --verbose"""
+    if verbose:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ============================================================================
+# COMMANDS
+# ============================================================================
+
+def cmd_alloc(args):
+    timer = PhaseTimer()
+    students, positions, resume_texts, stored_skill_masks = load_inputs(args, timer, features=True)
+
+    engine = ALLOCATION_ENGINES[args.engine]
+    stats = {}
+    options = {}
+    if args.engine == 'stable':
+        options['preferences'] = load_preferences(args)
+        print(f"🗳️ Loaded preferences of {len(options['preferences'])} students")
+    if args.score_cache:
+        database.DB_PATH = args.db
+        database.create_tables()   # pair_scores may not exist yet in an older --db
+        options['score_cache'] = PairScoreCache(args.db)
+    with _engine_output(args.verbose):
+        allocations = engine(students, positions, resume_texts, stats=stats, progress=timer.progress,
+                             workers=args.workers, domains=args.domain, stored_skill_masks=stored_skill_masks,
+                             **options)
+    if args.score_cache:
+        options['score_cache'].close()
+    del resume_texts
+
+    if args.write_db:
+        timer.phase('persistence')
+        database.DB_PATH = args.db
+        scope = scope_positions = None
+        if args.domain:
+            wanted = {normalize_domain(d) for d in args.domain}
+            scope = [s[0] for s in students if normalize_domain(s[5] or "") in wanted]
+            scope_positions = [p[0] for p in positions if normalize_domain(p[2] or "") in wanted]
+        database.create_tables()   # waitlists may not exist yet in an older --db
+        waitlists = stats.get('waitlists', {})
+        with database.get_connection() as conn:
+            database.save_allocation_results(conn, allocations, stats['exclusions'], scope, waitlists,
+                                             scope_position_ids=scope_positions)
+        print(f"💾 Wrote {len(allocations)} allocations and "
+              f"{sum(len(waiting) for waiting in waitlists.values())} waitlist entries to {args.db}")
+
+    if args.output:
+        timer.phase('output')
+        write_rows(args.output, ['student_id', 'company_id', 'position_id', 'score', 'rank'], allocations,
+                   extra={'exclusions': {str(k): v for k, v in stats['exclusions'].items()},
+                          'timings': timer.timings})
+        print(f"📝 Wrote {len(allocations)} allocations to {args.output}")
+
+    timer.stop()
+    print(f"✅ Engine '{args.engine}': {len(allocations)} allocated, {len(stats['exclusions'])} not allocated")
+    print("🔢 " + ", ".join(f"{name}={value}" for name, value in sorted(stats.get('counters', {}).items())))
+    if 'score_cache_hit_rate' in stats:
+        print(f"💾 Score cache hit rate: {stats['score_cache_hit_rate']:.1%}")
+    print("\n🧩 SHARDS")
+    for m in stats.get('shards', []):
+        print(f"   {m['domain'] or '(none)':<20} {m['students']:>6} students {m['positions']:>4} positions "
+              f"{m['allocated']:>5} allocated {m['seconds']:8.3f} s")
+    timer.report()
+    return 0
+
+
+def cmd_score(args):
+    timer = PhaseTimer()
+    students, positions, resume_texts, stored_skill_masks = load_inputs(args, timer)
+
+    timer.phase('validation')
+    valid = [s for s in students
+             if resume_texts.get(s[0]) and not is_resume_fake_or_spam(resume_texts[s[0]])[0]]
+
+    timer.phase('scoring')
+    rows = []
+    student_masks, position_masks = skill_masks(valid, positions, stored_skill_masks)
+    with _engine_output(args.verbose):
+        for position in positions:
+            for student in valid:
+                score = student_company_position_score(student, position, resume_texts[student[0]],
+                                                       (student_masks[student[0]], position_masks[position[0]]))
+                if score > 0:
+                    rows.append((student[0], position[1], position[0], score))
+
+    if args.output:
+        timer.phase('output')
+        write_rows(args.output, ['student_id', 'company_id', 'position_id', 'score'], rows)
+        print(f"📝 Wrote {len(rows)} scored pairs to {args.output}")
+
+    timer.stop()
+    print(f"✅ {len(valid)} valid resumes x {len(positions)} positions -> {len(rows)} eligible pairs")
+    timer.report()
+    return 0
+
+
+def cmd_snapshot(args):
+    """Dump students (with resume text) and positions from the DB into a JSON snapshot"""
+    timer = PhaseTimer()
+    args.snapshot = args.students = args.positions = None
+    students, positions, resume_texts, _ = load_inputs(args, timer)
+
+    student_records = []
+    for student in students:
+        record = dict(zip(STUDENT_FIELDS, student))
+        record['resume_text'] = resume_texts.get(student[0])
+        student_records.append(record)
+    args.preferences = None
+    preference_records = [{'student_id': sid, 'position_id': pid, 'rank': rank}
+                          for sid, ranked in load_preferences(args).items()
+                          for rank, pid in enumerate(ranked, 1)]
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'students': student_records,
+                   'positions': [dict(zip(POSITION_FIELDS, p)) for p in positions],
+                   'preferences': preference_records}, f)
+
+    timer.stop()
+    print(f"📝 Snapshot written to {args.output}")
+    timer.report()
+    return 0
+
+
+def cmd_reindex(args):
+    """Add resumes uploaded before the full-text index / duplicate signatures existed (or all with --all)"""
+    timer = PhaseTimer()
+    timer.phase('load')
+    students, _, _, _ = load_from_db(args.db)
+    with database.get_connection() as conn:
+        indexed = set() if args.all else (
+            {row[0] for row in conn.execute("SELECT rowid FROM resume_fts")}
+            & {row[0] for row in conn.execute("SELECT student_id FROM resume_signatures")}
+        )
+    pending = [student for student in students if student[0] not in indexed]
+
+    timer.phase('resumes')
+    resume_texts = load_resume_texts(pending, args.uploads, workers=args.workers)
+
+    timer.phase('index')
+    with database.get_connection() as conn:
+        for student_id, text in resume_texts.items():
+            index_resume(conn, student_id, text)
+            store_signature(conn, student_id, text)
+        conn.commit()
+
+    timer.stop()
+    print(f"🔎 Indexed {len(resume_texts)} resumes ({len(indexed)} already indexed)")
+    timer.report()
+    return 0
+
+
+def cmd_simulate(args):
+    """Allocate the inputs once per variant of --variants and compare the outcomes (see simulation.py)"""
+    with open(args.variants, encoding='utf-8') as f:
+        variants = parse_variants(json.load(f))
+    timer = PhaseTimer()
+    students, positions, resume_features, stored_skill_masks = load_inputs(args, timer, features=True)
+    preferences = load_preferences(args) if any(engine == 'stable' for _, engine, _ in variants) else {}
+
+    baseline = None
+    if not (args.snapshot or args.students or args.positions):
+        with database.get_connection() as conn:
+            baseline = conn.execute(
+                "SELECT student_id, company_id, position_id, score, rank FROM allocations").fetchall()
+
+    report = simulate(students, positions, resume_features, variants, preferences=preferences,
+                      baseline=baseline, workers=args.variant_workers, progress=timer.progress,
+                      stored_skill_masks=stored_skill_masks)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Wrote the simulation report to {args.output}")
+
+    timer.stop()
+    print("\n🧪 VARIANTS" + (" (students changed vs. current allocations)" if baseline is not None else
+                           " (students changed vs. the first variant)"))
+    rows = ([('current allocations', report['baseline'])] if report['baseline'] else []) + \
+        [(v['name'], v) for v in report['variants']]
+    for name, m in rows:
+        print(f"   {name:<24} fill {m['fill_rate']:7.1%}  mean {m['mean_score']:6.2f}  "
+              f"company spread {m['company_fill_spread']:.2f}  changed {m.get('students_changed', '-')}")
+    timer.report()
+    return 0
+
+
+def cmd_migrate_uploads(args):
+    """Store uploads saved before the content-addressed blob store in it"""
+    database.create_tables()
+    migrate_legacy_uploads(args.uploads, database.get_connection)
+    return 0
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m internship', description=__doc__.split('\n')[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_input_args(p):
+        p.add_argument('--db', default=database.DB_PATH, help="SQLite database (default: ./platform.db)")
+        p.add_argument('--uploads', default=os.path.join(os.getcwd(), 'uploads'),
+                       help="upload folder used to resolve resume_path")
+        p.add_argument('--snapshot', help="JSON file with 'students' and 'positions' lists")
+        p.add_argument('--students', help="students .json/.csv (overrides the DB/snapshot)")
+        p.add_argument('--positions', help="positions .json/.csv (overrides the DB/snapshot)")
+        p.add_argument('--workers', type=int, default=1,
+                       help="processes used to parse resume PDFs and allocate domain shards")
+        p.add_argument('--verbose', action='store_true', help="show the engine's per-pair output")
+
+    alloc = sub.add_parser('alloc', help="validate, score and allocate")
+    add_input_args(alloc)
+    alloc.add_argument('--engine', choices=sorted(ALLOCATION_ENGINES), default='round-robin')
+    alloc.add_argument('--preferences', help="student rankings .json/.csv for --engine stable "
+                                              "(student_id, position_id, rank; overrides the DB/snapshot)")
+    alloc.add_argument('--domain', action='append',
+                       help="only (re-)allocate this domain shard; repeatable. With --write-db only "
+                            "that shard's students are replaced")
+    alloc.add_argument('--output', help="write allocations to .json or .csv")
+    alloc.add_argument('--score-cache', action='store_true',
+                       help="reuse pair scores stored in --db by earlier runs and store new ones")
+    alloc.add_argument('--write-db', action='store_true',
+                       help="replace the allocations table in --db with the result")
+    alloc.set_defaults(func=cmd_alloc)
+
+    score = sub.add_parser('score', help="score every eligible student-position pair")
+    add_input_args(score)
+    score.add_argument('--output', help="write pair scores to .json or .csv")
+    score.set_defaults(func=cmd_score)
+
+    snapshot = sub.add_parser('snapshot', help="dump the DB (with resume text) to a JSON snapshot")
+    add_input_args(snapshot)
+    snapshot.add_argument('--output', required=True)
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    reindex = sub.add_parser('reindex', help="index resume text for full-text search")
+    reindex.add_argument('--db', default=database.DB_PATH, help="SQLite database (default: ./platform.db)")
+    reindex.add_argument('--uploads', default=os.path.join(os.getcwd(), 'uploads'),
+                         help="upload folder used to resolve resume_path")
+    reindex.add_argument('--workers', type=int, default=1, help="processes used to parse resume PDFs")
+    reindex.add_argument('--all', action='store_true', help="re-index every resume, not only missing ones")
+    reindex.set_defaults(func=cmd_reindex)
+
+    sim = sub.add_parser('simulate', help="compare allocation variants without writing anything")
+    add_input_args(sim)
+    sim.add_argument('--variants', required=True,
+                     help="JSON list of variants: name, engine, min_ats, weights {ats, cgpa, experience, "
+                          "experience_per_year}")
+    sim.add_argument('--preferences', help="student rankings .json/.csv for stable variants")
+    sim.add_argument('--variant-workers', type=int,
+                     help="processes running variants (default: one per variant, up to the CPU count)")
+    sim.add_argument('--output', help="write the comparison report to .json")
+    sim.set_defaults(func=cmd_simulate)
+
+    migrate = sub.add_parser('migrate-uploads', help="move uploads saved before the blob store into it")
+    migrate.add_argument('--uploads', default=os.path.join(os.getcwd(), 'uploads'),
+                         help="upload folder holding the files")
+    migrate.set_defaults(func=cmd_migrate_uploads)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import json
+import threading
+import time
+import traceback
+
+import metrics
+
+# ============================================================================
+# BACKGROUND JOB RUNS
+# ============================================================================
+# Long admin operations run in a daemon thread and record their progress in a
+# run table, so the request that submits them returns immediately and any
+# worker can answer progress polls.
+#
+# Single-flight: at most one queued/running job per table. The check-and-insert
+# happens inside BEGIN IMMEDIATE, which takes SQLite's write lock, so two
+# gunicorn workers submitting at the same moment cannot both create a run - the
+# second one gets the id of the first and simply attaches to it.
+#
+# A run whose row has not been touched for STALE_AFTER_SECONDS is presumed dead
+# (its worker process was killed) and expired on the next submit. A heartbeat
+# thread refreshes updated_at while the job runs, so only a dead worker goes
+# stale, however long one phase takes.
+
+ACTIVE_STATUSES = ('queued', 'running')
+STALE_AFTER_SECONDS = 15 * 60   # running jobs without a heartbeat for this long are presumed dead
+HEARTBEAT_INTERVAL = 60         # seconds between updated_at refreshes of a running job
+PROGRESS_WRITE_INTERVAL = 0.5   # seconds between progress writes inside one phase
+
+# Overall percent reached when each phase starts, per job kind
+ALLOCATION_PHASES = {
+    'queued': 0,
+    'loading': 2,
+    'duplicates': 18,
+    'validation': 20,
+    'scoring': 30,
+    'allocation': 80,
+    'persistence': 85,
+    'emails': 90,
+    'done': 100,
+}
+RESUME_IMPORT_PHASES = {
+    'queued': 0,
+    'reading': 2,
+    'analysis': 5,
+    'saving': 95,
+    'done': 100,
+}
+
+# Both maintenance jobs share the maintenance_runs table, so they never run at the same time
+STUDENT_DELETION_PHASES = {
+    'queued': 0,
+    'selecting': 2,
+    'deleting': 5,
+    'done': 100,
+}
+UPLOAD_GC_PHASES = {
+    'queued': 0,
+    'counting': 2,
+    'scanning': 5,
+    'done': 100,
+}
+SIMULATION_PHASES = {
+    'queued': 0,
+    'loading': 2,
+    'simulating': 20,
+    'done': 100,
+}
+
+_submit_lock = threading.Lock()
+
+
+def _now():
+    return time.time()
+
+
+def get_run(get_connection, run_id, table='allocation_runs'):
+    """Return a run row as a dict (JSON columns decoded), or None"""
+    with get_connection() as conn:
+        cur = conn.execute(f"SELECT * FROM {table} WHERE run_id = ?", (run_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        run = dict(zip([c[0] for c in cur.description], row))
+    run['options'] = json.loads(run['options'] or '{}')
+    run['timings'] = json.loads(run['timings'] or '{}')
+    run['summary'] = json.loads(run['summary'] or '{}')
+    return run
+
+
+def get_latest_run(get_connection, table='allocation_runs'):
+    with get_connection() as conn:
+        row = conn.execute(f"SELECT MAX(run_id) FROM {table}").fetchone()
+    return get_run(get_connection, row[0], table) if row and row[0] else None
+
+
+def update_run(get_connection, run_id, table='allocation_runs', **fields):
+    """Update columns of a run; dict values are stored as JSON"""
+    fields['updated_at'] = _now()
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            fields[key] = json.dumps(value)
+    assignments = ", ".join(f"{key} = ?" for key in fields)
+    with get_connection() as conn:
+        conn.execute(f"UPDATE {table} SET {assignments} WHERE run_id = ?", (*fields.values(), run_id))
+        conn.commit()
+
+
+def _heartbeat(get_connection, run_id, table, stopped):
+    """
+    Refresh updated_at of a running job every HEARTBEAT_INTERVAL until `stopped`
+    is set, so a long phase without progress writes (e.g. one large domain shard)
+    is never mistaken for a dead worker by _expire_stale_runs
+    """
+    while not stopped.wait(HEARTBEAT_INTERVAL):
+        try:
+            with get_connection() as conn:
+                conn.execute(f"UPDATE {table} SET updated_at = ? WHERE run_id = ? AND status = 'running'",
+                             (_now(), run_id))
+                conn.commit()
+        except Exception as e:
+            print(f"[JOB HEARTBEAT ERROR] {table} #{run_id}: {e}")
+
+
+def _expire_stale_runs(conn, table):
+    conn.execute(f"""
+        UPDATE {table}
+        SET status = 'failed', error = 'Worker stopped responding', finished_at = ?
+        WHERE status IN ('queued', 'running') AND updated_at < ?
+    """, (_now(), _now() - STALE_AFTER_SECONDS))
+
+
+class RunReporter:
+    """
+    Progress sink handed to a job: tracks the current phase, per-phase wall
+    time and percent complete, and writes them to the run row (throttled).
+    """
+
+    def __init__(self, get_connection, run_id, phases, table='allocation_runs'):
+        self.get_connection = get_connection
+        self.run_id = run_id
+        self.phases = phases
+        self.table = table
+        self.timings = {}
+        self.phase_name = None
+        self._phase_started = None
+        self._last_write = 0.0
+
+    def phase(self, name):
+        """Close the current phase (recording its duration) and start a new one"""
+        now = time.monotonic()
+        if self.phase_name is not None:
+            self.timings[self.phase_name] = round(now - self._phase_started, 3)
+        self.phase_name = name
+        self._phase_started = now
+        self._last_write = now
+        update_run(self.get_connection, self.run_id, self.table,
+                   phase=name, percent=self.phases.get(name, 0), timings=self.timings)
+
+    def progress(self, phase, done, total):
+        """Report `done` of `total` units in `phase`; usable as an ai_engine progress callback"""
+        if phase != self.phase_name:
+            self.phase(phase)
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_WRITE_INTERVAL and done < total:
+            return
+        self._last_write = now
+        start = self.phases.get(phase, 0)
+        names = list(self.phases)
+        end = self.phases[names[names.index(phase) + 1]] if phase in names[:-1] else start
+        percent = start + (end - start) * (done / total if total else 1)
+        update_run(self.get_connection, self.run_id, self.table, percent=round(percent, 1))
+
+    def finish(self, status='completed', summary=None, error=None):
+        if self.phase_name is not None:
+            self.timings[self.phase_name] = round(time.monotonic() - self._phase_started, 3)
+        fields = {'status': status, 'finished_at': _now(), 'timings': self.timings}
+        if status == 'completed':
+            fields.update(phase='done', percent=100)
+        if summary is not None:
+            fields['summary'] = summary
+        if error is not None:
+            fields['error'] = error
+        update_run(self.get_connection, self.run_id, self.table, **fields)
+
+
+def submit_run(get_connection, target, requested_by=None, options=None,
+               table='allocation_runs', phases=ALLOCATION_PHASES, wrap=None):
+    """
+    Start `target(reporter, **options)` in a background thread unless a job is
+    already active in `table`.
+
+    Args:
+        target: Callable doing the work; its return value is stored as the summary
+        wrap: Optional context-manager factory entered around target
+              (e.g. app.app_context for Flask-Mail)
+
+    Returns:
+        (run_id, created) - created is False when an active run was reused
+    """
+    options = options or {}
+    with _submit_lock, get_connection() as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _expire_stale_runs(conn, table)
+            active = conn.execute(
+                f"SELECT run_id FROM {table} WHERE status IN ('queued', 'running') ORDER BY run_id LIMIT 1"
+            ).fetchone()
+            if active:
+                conn.execute("COMMIT")
+                return active[0], False
+
+            now = _now()
+            cur = conn.execute(f"""
+                INSERT INTO {table} (status, phase, percent, requested_by, options, created_at, updated_at)
+                VALUES ('queued', 'queued', 0, ?, ?, ?, ?)
+            """, (requested_by, json.dumps(options), now, now))
+            run_id = cur.lastrowid
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def worker():
+        reporter = RunReporter(get_connection, run_id, phases, table)
+        update_run(get_connection, run_id, table, status='running', started_at=_now())
+        stopped = threading.Event()
+        threading.Thread(target=_heartbeat, args=(get_connection, run_id, table, stopped),
+                         name=f"{table}-{run_id}-heartbeat", daemon=True).start()
+        try:
+            if wrap is not None:
+                with wrap():
+                    summary = target(reporter, **options)
+            else:
+                summary = target(reporter, **options)
+            reporter.finish('completed', summary=summary or {})
+            metrics.inc('background_jobs_total', labels={'table': table, 'status': 'completed'})
+            print(f"[JOB] {table} #{run_id} completed in {sum(reporter.timings.values()):.1f}s")
+        except Exception as e:
+            traceback.print_exc()
+            reporter.finish('failed', error=str(e))
+            metrics.inc('background_jobs_total', labels={'table': table, 'status': 'failed'})
+            print(f"[JOB ERROR] {table} #{run_id}: {e}")
+        finally:
+            stopped.set()
+
+    threading.Thread(target=worker, name=f"{table}-{run_id}", daemon=True).start()
+    return run_id, True
@@ -0,0 +1,290 @@
+import os
+import time
+
+import cache
+from blob_store import CACHE_DIR, is_blob, remove_derived, store_blob, unreferenced
+from database import UPLOAD_REFERENCES, fill_vacancies
+from dedup_utils import remove_signatures
+from search_utils import remove_resumes
+
+# ============================================================================
+# BULK STUDENT DELETION
+# ============================================================================
+# Students are deleted in chunks of DELETE_CHUNK_SIZE IDs, one transaction per
+# chunk, so no statement binds more variables than SQLite allows (999 on older
+# builds) and the write lock is released between chunks. Upload files of a
+# chunk are removed once its rows are committed, except blobs other profiles
+# still reference (see blob_store.py).
+
+DELETE_CHUNK_SIZE = 500
+
+# Rows keyed by a student, deleted child tables first
+STUDENT_TABLES = [
+    ('allocations', 'student_id'),
+    ('allocation_exclusions', 'student_id'),
+    ('preferences', 'student_id'),
+    ('waitlists', 'student_id'),
+    ('student_profile', 'user_id'),
+    ('users', 'user_id'),
+]
+
+# Bulk deletions the admin can start: name -> query returning the user_ids to delete
+DELETE_CRITERIA = {
+    'without_resume': """
+        SELECT u.user_id
+        FROM users u
+        LEFT JOIN student_profile sp ON u.user_id = sp.user_id
+        WHERE u.role = 'student'
+        AND (sp.resume_path IS NULL OR sp.resume_path = '')
+        ORDER BY u.user_id
+    """,
+}
+
+
+def _in_clause(values):
+    return ','.join('?' * len(values))
+
+
+def delete_student_rows(conn, student_ids):
+    """
+    Delete up to DELETE_CHUNK_SIZE students and every row keyed by them (caller commits)
+
+    Returns: (files, freed_position_ids) - upload-relative paths of their resumes
+             and photos no other profile references, and the positions whose
+             seats they held
+    """
+    marks = _in_clause(student_ids)
+    files = [path for row in conn.execute(
+        f"SELECT resume_path, profile_photo FROM student_profile WHERE user_id IN ({marks})", student_ids)
+        for path in row if path]
+    freed = [row[0] for row in conn.execute(
+        f"SELECT position_id FROM allocations WHERE student_id IN ({marks})", student_ids)]
+    for table, column in STUDENT_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE {column} IN ({marks})", student_ids)
+    remove_resumes(conn, student_ids)
+    remove_signatures(conn, student_ids)
+    cache.invalidate(conn, 'students', 'allocations', *(f"student:{sid}" for sid in student_ids))
+    return unreferenced(conn, files), freed
+
+
+def remove_upload_files(upload_folder, paths, touched_before=None):
+    """
+    Delete upload-relative paths that resolve inside upload_folder, with their
+    cached derivatives
+
+    Args:
+        touched_before: keep blobs modified at or after this timestamp; storing
+                        a duplicate touches the blob, so a concurrent upload
+                        about to reference it is not pulled from under it
+
+    Returns: (files_removed, bytes_freed)
+    """
+    root = os.path.realpath(upload_folder)
+    removed = freed = 0
+    for path in paths:
+        full_path = os.path.realpath(os.path.join(root, path))
+        if not full_path.startswith(root + os.sep):
+            continue
+        try:
+            stat = os.stat(full_path)
+            if touched_before is not None and is_blob(path) and stat.st_mtime >= touched_before:
+                continue
+            os.remove(full_path)
+        except FileNotFoundError:
+            continue
+        remove_derived(root, path)
+        removed += 1
+        freed += stat.st_size
+    return removed, freed
+
+
+def delete_students_job(reporter, upload_folder, criteria='without_resume', get_connection=None,
+                        chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Background job: delete the students matching DELETE_CRITERIA[criteria]
+
+    Args:
+        reporter: jobs.RunReporter (phases: selecting, deleting)
+        get_connection: connection factory of the caller (bound with functools.partial)
+
+    Returns: summary dict (students, deleted, files_removed, bytes_freed, promoted)
+    """
+    reporter.phase('selecting')
+    with get_connection() as conn:
+        student_ids = [row[0] for row in conn.execute(DELETE_CRITERIA[criteria])]
+    summary = {'task': 'delete_students', 'criteria': criteria, 'students': len(student_ids),
+               'deleted': 0, 'files_removed': 0, 'bytes_freed': 0, 'promoted': 0}
+
+    reporter.phase('deleting')
+    with get_connection() as conn:
+        for start in range(0, len(student_ids), chunk_size):
+            chunk = student_ids[start:start + chunk_size]
+            files, freed_positions = delete_student_rows(conn, chunk)
+            for position_id in freed_positions:
+                summary['promoted'] += len(fill_vacancies(conn, position_id))
+            conn.commit()
+            removed, freed = remove_upload_files(upload_folder, files, time.time() - GC_GRACE_SECONDS)
+            summary['deleted'] += len(chunk)
+            summary['files_removed'] += removed
+            summary['bytes_freed'] += freed
+            reporter.progress('deleting', summary['deleted'], len(student_ids))
+
+    print(f"[DELETE STUDENTS] Removed {summary['deleted']} students ({criteria}), "
+          f"{summary['files_removed']} files, {summary['bytes_freed'] / 1e6:.1f} MB")
+    return summary
+
+
+# ============================================================================
+# UPLOAD GARBAGE COLLECTION
+# ============================================================================
+# Files under the upload folder that no student_profile / company_profile row
+# references (replaced resumes and photos, files of rows deleted before this
+# job existed) are reclaimed. The folder is walked in batches of GC_BATCH_SIZE
+# files and each batch is checked with a few IN queries, so memory stays flat
+# however many files there are. Files younger than GC_GRACE_SECONDS are left
+# alone: uploads are written before the row that references them is committed.
+# Derived data under uploads/cache is removed together with its blob, and the
+# blobs rows of reclaimed files are dropped.
+
+GC_BATCH_SIZE = 500
+GC_GRACE_SECONDS = 60 * 60
+TMP_GRACE_SECONDS = 24 * 60 * 60   # uploads/tmp holds ZIPs of running imports
+MAX_LISTED = 200
+
+
+def _iter_upload_files(upload_folder):
+    """Yield (relative_path, size, mtime) for every file below upload_folder, outside the derived-data cache"""
+    for directory, subdirectories, filenames in os.walk(upload_folder):
+        if directory == upload_folder and CACHE_DIR in subdirectories:
+            subdirectories.remove(CACHE_DIR)
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(full_path, upload_folder), stat.st_size, stat.st_mtime
+
+
+def referenced_paths(conn, paths):
+    """The subset of upload-relative paths referenced by a profile row"""
+    marks = _in_clause(paths)
+    found = set()
+    for table, column in UPLOAD_REFERENCES:
+        found.update(row[0] for row in conn.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({marks})", paths))
+    return found
+
+
+def collect_orphaned_uploads(reporter, upload_folder, dry_run=False, get_connection=None,
+                             grace_seconds=GC_GRACE_SECONDS, batch_size=GC_BATCH_SIZE):
+    """
+    Background job: remove upload files no profile row references
+
+    Args:
+        reporter: jobs.RunReporter (phases: counting, scanning)
+        dry_run: only report the orphans
+        get_connection: connection factory of the caller (bound with functools.partial)
+
+    Returns: summary dict (scanned, orphaned, removed, bytes_freed, skipped_recent, orphans)
+    """
+    summary = {'task': 'upload_gc', 'dry_run': dry_run, 'scanned': 0, 'orphaned': 0, 'removed': 0,
+               'bytes_freed': 0, 'skipped_recent': 0, 'orphans': []}
+    reporter.phase('counting')
+    total = sum(len(filenames) for _, _, filenames in os.walk(upload_folder))
+
+    reporter.phase('scanning')
+    now = time.time()
+    batch = []
+
+    def reclaim(conn):
+        referenced = referenced_paths(conn, [path for path, _ in batch])
+        orphans = [(path, size) for path, size in batch if path not in referenced]
+        summary['orphaned'] += len(orphans)
+        summary['orphans'].extend(path for path, _ in orphans[:MAX_LISTED - len(summary['orphans'])])
+        if dry_run:
+            summary['bytes_freed'] += sum(size for _, size in orphans)
+        else:
+            removed, freed = remove_upload_files(upload_folder, [path for path, _ in orphans],
+                                                 now - grace_seconds)
+            conn.executemany("DELETE FROM blobs WHERE path = ? AND refcount <= 0",
+                             [(path,) for path, _ in orphans if is_blob(path)])
+            conn.commit()
+            summary['removed'] += removed
+            summary['bytes_freed'] += freed
+        batch.clear()
+
+    with get_connection() as conn:
+        for path, size, mtime in _iter_upload_files(upload_folder):
+            summary['scanned'] += 1
+            grace = TMP_GRACE_SECONDS if path.split(os.sep, 1)[0] == 'tmp' else grace_seconds
+            if now - mtime < grace:
+                summary['skipped_recent'] += 1
+                continue
+            batch.append((path, size))
+            if len(batch) >= batch_size:
+                reclaim(conn)
+                reporter.progress('scanning', summary['scanned'], max(total, summary['scanned']))
+        if batch:
+            reclaim(conn)
+
+    outcome = "dry run" if dry_run else f"{summary['removed']} removed"
+    print(f"[UPLOAD GC] {summary['orphaned']} orphaned of {summary['scanned']} files ({outcome}), "
+          f"{summary['bytes_freed'] / 1e6:.1f} MB")
+    return summary
+
+
+# ============================================================================
+# LEGACY UPLOAD MIGRATION
+# ============================================================================
+# Files uploaded before the blob store (students/resumes/17_cv.pdf, ...) are
+# moved into it: each referenced file is stored by content, its row is pointed
+# at the blob and the old file is removed once the batch is committed.
+
+# Dashboard cache scopes of a profile table: (per-owner prefix, list scope)
+PROFILE_SCOPES = {
+    'student_profile': ('student', 'students'),
+    'company_profile': ('company', 'companies'),
+}
+
+
+def migrate_legacy_uploads(upload_folder, get_connection, batch_size=GC_BATCH_SIZE):
+    """
+    Move referenced files outside the blob store into it
+
+    Returns: summary dict (migrated, missing, deduplicated, bytes_freed)
+    """
+    summary = {'migrated': 0, 'missing': 0, 'deduplicated': 0, 'bytes_freed': 0}
+    with get_connection() as conn:
+        for table, column in UPLOAD_REFERENCES:
+            owner_scope, list_scope = PROFILE_SCOPES[table]
+            rows = conn.execute(f"""
+                SELECT user_id, {column} FROM {table}
+                WHERE {column} IS NOT NULL AND {column} != '' AND {column} NOT LIKE 'blobs/%'
+            """).fetchall()
+            for start in range(0, len(rows), batch_size):
+                moved = []
+                for user_id, path in rows[start:start + batch_size]:
+                    try:
+                        with open(os.path.join(upload_folder, path), 'rb') as source:
+                            new_path, created = store_blob(upload_folder, source, path)
+                    except FileNotFoundError:
+                        summary['missing'] += 1
+                        continue
+                    conn.execute(f"UPDATE {table} SET {column} = ? WHERE user_id = ?", (new_path, user_id))
+                    moved.append((user_id, path))
+                    summary['deduplicated'] += not created
+                if not moved:
+                    continue
+                cache.invalidate(conn, list_scope, *(f"{owner_scope}:{user_id}" for user_id, _ in moved))
+                conn.commit()
+                old_paths = [path for _, path in moved]
+                still_used = referenced_paths(conn, old_paths)
+                _, freed = remove_upload_files(upload_folder, [p for p in old_paths if p not in still_used])
+                summary['migrated'] += len(moved)
+                summary['bytes_freed'] += freed
+
+    print(f"[UPLOAD MIGRATION] {summary['migrated']} files moved to the blob store "
+          f"({summary['deduplicated']} duplicates, {summary['missing']} missing), "
+          f"{summary['bytes_freed'] / 1e6:.1f} MB freed")
+    return summary
@@ -0,0 +1,121 @@
+import math
+import threading
+
+# ============================================================================
+# IN-PROCESS METRICS REGISTRY (Prometheus text exposition format)
+# ============================================================================
+# Counters, gauges and histograms keyed by (name, sorted label pairs). Values
+# are per process: with several gunicorn workers every scrape reports the
+# worker that served it, which is what the `pid` label on /admin/metrics is for.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_help = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def describe(name, help_text, kind):
+    """Register HELP/TYPE lines for a metric family"""
+    _help[name] = (help_text, kind)
+
+
+def inc(name, amount=1, labels=None):
+    """Increase a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, labels=None):
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, value, labels=None, buckets=DEFAULT_BUCKETS):
+    """Record one observation in a histogram"""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(hist['buckets']):
+            if value <= bound:
+                hist['counts'][i] += 1
+        hist['sum'] += value
+        hist['count'] += 1
+
+
+def snapshot():
+    """Copy of all counters and gauges as {name: {labels: value}} (for JSON/debug views)"""
+    with _lock:
+        result = {}
+        for (name, labels), value in list(_counters.items()) + list(_gauges.items()):
+            result.setdefault(name, {})[','.join(f'{k}={v}' for k, v in labels)] = value
+        return result
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(const_labels=None):
+    """Render every metric in the Prometheus text exposition format (version 0.0.4)"""
+    const = tuple(sorted((const_labels or {}).items()))
+    lines = []
+    with _lock:
+        families = {}
+        for (name, labels), value in _counters.items():
+            families.setdefault(name, ('counter', []))[1].append((labels, value))
+        for (name, labels), value in _gauges.items():
+            families.setdefault(name, ('gauge', []))[1].append((labels, value))
+        for (name, labels), hist in _histograms.items():
+            families.setdefault(name, ('histogram', []))[1].append((labels, dict(hist, counts=list(hist['counts']))))
+
+    for name in sorted(families):
+        kind, samples = families[name]
+        help_text = _help.get(name, (name.replace('_', ' '), kind))[0]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(samples, key=lambda s: s[0]):
+            labels = labels + const
+            if kind != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for bound, count in zip(value['buckets'], value['counts']):
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_value(float(bound))),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+describe('http_request_duration_seconds', 'Latency of HTTP requests by endpoint', 'histogram')
+describe('http_request_sql_seconds', 'Time spent in SQLite per HTTP request', 'histogram')
+describe('http_request_queries', 'SQL statements executed per HTTP request', 'histogram')
+describe('background_jobs_total', 'Background jobs finished, by run table and status', 'counter')
+describe('pdfs_parsed_total', 'Resume PDFs parsed with PyMuPDF', 'counter')
+describe('pdf_text_cache_hits_total', 'Resume texts served from the content-hash text cache', 'counter')
+describe('thumbnails_generated_total', 'Photo and logo thumbnails made with Pillow', 'counter')
+describe('allocation_phase_seconds', 'Wall time of each phase of the last allocation run', 'gauge')
+describe('allocation_last_run_count', 'Counters of the last allocation run', 'gauge')
+describe('allocation_count_total', 'Counters summed over all allocation runs', 'counter')
+describe('dashboard_cache_requests_total', 'Dashboard cache lookups by query and result', 'counter')
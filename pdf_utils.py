@@ -0,0 +1,40 @@
+import metrics
+from blob_store import cache_path, write_atomic
+
+
+def extract_text_from_pdf(pdf_path):
+    """
+    Extract text from PDF using PyMuPDF
+
+    PDFs in the blob store are parsed once: the text is cached under the file's
+    SHA-256 (uploads/cache/text/) and reused by later uploads of the same file
+    and by every allocation run.
+    """
+    text_cache = cache_path(pdf_path, 'text', '.txt')
+    if text_cache:
+        try:
+            # Bytes, not text mode: newline translation would turn \r\n into \n and
+            # change the resume hash that keys the pair-score cache
+            with open(text_cache, 'rb') as f:
+                metrics.inc('pdf_text_cache_hits_total')
+                return f.read().decode('utf-8')
+        except OSError:
+            pass
+
+    import fitz  # PyMuPDF - loaded on first PDF, not at startup
+    metrics.inc('pdfs_parsed_total')
+    try:
+        text = ""
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                text += page.get_text()
+        text = text.strip()
+    except Exception as e:
+        print(f"[PDF ERROR] {str(e)}")
+        return ""
+    if text_cache:
+        try:
+            write_atomic(text_cache, text.encode('utf-8'))
+        except OSError as e:
+            print(f"[PDF CACHE ERROR] {str(e)}")
+    return text
@@ -0,0 +1,199 @@
+import collections
+import sqlite3
+import threading
+import time
+
+# ============================================================================
+# SQLITE QUERY PROFILING + SLOW-QUERY LOG
+# ============================================================================
+# get_connection() in app.py opens connections with factory=ProfiledConnection.
+# Every statement is timed from execute() until its cursor is done fetching;
+# the time is attributed to the current request (if any). A statement whose
+# accumulated time crosses SLOW_QUERY_SECONDS is logged once with its SQL, the
+# shape of its parameters (never the values) and EXPLAIN QUERY PLAN output.
+
+SLOW_QUERY_SECONDS = 0.1
+SLOW_QUERY_LOG_SIZE = 200
+
+_local = threading.local()
+_lock = threading.Lock()
+slow_queries = collections.deque(maxlen=SLOW_QUERY_LOG_SIZE)
+endpoint_stats = {}
+
+
+def configure(slow_query_ms=None):
+    global SLOW_QUERY_SECONDS
+    if slow_query_ms is not None:
+        SLOW_QUERY_SECONDS = slow_query_ms / 1000.0
+
+
+def _params_shape(params, many=False):
+    """Describe parameters by type only, e.g. '(int, str)' or '500 x (int, float)'"""
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else None
+        first = rows[0] if rows else None
+        shape = _params_shape(first) if first is not None else '()'
+        return f"{len(rows)} x {shape}" if rows is not None else f"iter x {shape}"
+    if isinstance(params, dict):
+        return '{' + ', '.join(f"{k}: {type(v).__name__}" for k, v in params.items()) + '}'
+    return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+
+class _Statement:
+    __slots__ = ('sql', 'params', 'values', 'seconds', 'rows', 'logged', 'plan', 'at')
+
+    def __init__(self, sql, params, values):
+        self.sql = ' '.join(sql.split())
+        self.params = params
+        self.values = values    # only bound into EXPLAIN, never logged or reported
+        self.seconds = 0.0
+        self.rows = 0
+        self.logged = False
+        self.plan = None
+        self.at = time.time()
+
+    def as_dict(self):
+        return {'sql': self.sql, 'params': self.params, 'ms': round(self.seconds * 1000, 2),
+                'rows': self.rows, 'plan': self.plan, 'at': self.at}
+
+
+def _record(cursor, statement, seconds, rows=0):
+    statement.seconds += seconds
+    statement.rows += rows
+    request = getattr(_local, 'request', None)
+    if request is not None:
+        request['sql_seconds'] += seconds
+
+    if statement.logged or statement.seconds < SLOW_QUERY_SECONDS:
+        return
+    statement.logged = True
+    statement.plan = _explain(cursor.connection, statement)
+    statement.values = None
+    if request is not None:
+        request['slow_queries'] += 1
+    with _lock:
+        slow_queries.append(statement)
+    print(f"[SLOW QUERY] {statement.seconds * 1000:.1f} ms | params {statement.params} | {statement.sql}")
+    for line in statement.plan or []:
+        print(f"    {line}")
+
+
+def _explain(conn, statement):
+    if statement.sql.split(' ', 1)[0].upper() not in ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT'):
+        return None
+    try:
+        # Plain Cursor: EXPLAIN must not be profiled (or logged) itself
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {statement.sql}", statement.values).fetchall()
+        return [f"{'  ' * (parent > 0)}{detail}" for _, parent, _, detail in rows]
+    except sqlite3.Error as e:
+        return [f"(EXPLAIN failed: {e})"]
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls of the statement it runs"""
+
+    _statement = None
+
+    def _timed(self, method, args, rows_of=None):
+        started = time.perf_counter()
+        result = method(*args)
+        if self._statement is not None:
+            rows = rows_of(result) if rows_of else 0
+            _record(self, self._statement, time.perf_counter() - started, rows)
+        return result
+
+    def execute(self, sql, params=()):
+        self._statement = _Statement(sql, _params_shape(params), params)
+        request = getattr(_local, 'request', None)
+        if request is not None:
+            request['queries'] += 1
+        return self._timed(super().execute, (sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        if not isinstance(seq_of_params, (list, tuple)):
+            seq_of_params = list(seq_of_params)
+        self._statement = _Statement(sql, _params_shape(seq_of_params, many=True),
+                                     seq_of_params[0] if seq_of_params else ())
+        request = getattr(_local, 'request', None)
+        if request is not None:
+            request['queries'] += 1
+        return self._timed(super().executemany, (sql, seq_of_params))
+
+    def fetchone(self):
+        return self._timed(super().fetchone, (), lambda row: 1 if row is not None else 0)
+
+    def fetchmany(self, size=None):
+        args = () if size is None else (size,)
+        return self._timed(super().fetchmany, args, len)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, (), len)
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            if self._statement is not None:
+                _record(self, self._statement, time.perf_counter() - started, 1)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection whose execute()/cursor() go through ProfiledCursor"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+# ============================================================================
+# PER-REQUEST ACCOUNTING
+# ============================================================================
+
+def begin_request():
+    _local.request = {'started': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0, 'slow_queries': 0}
+
+
+def end_request(endpoint):
+    """Finish the current request; returns its stats and folds them into endpoint_stats"""
+    request = getattr(_local, 'request', None)
+    _local.request = None
+    if request is None:
+        return None
+    request['total_seconds'] = time.perf_counter() - request.pop('started')
+
+    with _lock:
+        agg = endpoint_stats.setdefault(endpoint, {
+            'requests': 0, 'queries': 0, 'max_queries': 0,
+            'sql_seconds': 0.0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+        })
+        agg['requests'] += 1
+        agg['queries'] += request['queries']
+        agg['max_queries'] = max(agg['max_queries'], request['queries'])
+        agg['sql_seconds'] += request['sql_seconds']
+        agg['total_seconds'] += request['total_seconds']
+        agg['max_seconds'] = max(agg['max_seconds'], request['total_seconds'])
+    return request
+
+
+def debug_report():
+    """Recent slow queries (newest first) and per-endpoint query/latency averages"""
+    with _lock:
+        slow = [s.as_dict() for s in reversed(slow_queries)]
+        endpoints = {
+            endpoint: {
+                'requests': agg['requests'],
+                'avg_queries': round(agg['queries'] / agg['requests'], 2),
+                'max_queries': agg['max_queries'],
+                'avg_sql_ms': round(agg['sql_seconds'] / agg['requests'] * 1000, 2),
+                'avg_total_ms': round(agg['total_seconds'] / agg['requests'] * 1000, 2),
+                'max_total_ms': round(agg['max_seconds'] * 1000, 2),
+            }
+            for endpoint, agg in sorted(endpoint_stats.items())
+        }
+    return {'slow_query_threshold_ms': SLOW_QUERY_SECONDS * 1000, 'slow_queries': slow, 'endpoints': endpoints}
@@ -0,0 +1,180 @@
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from werkzeug.utils import secure_filename
+
+import cache
+from blob_store import discard_blob, store_blob
+from ai_engine import analyze_resume_quality, extract_skills_from_text
+from database import encode_skills
+from dedup_utils import store_signature
+from pdf_utils import extract_text_from_pdf
+from search_utils import index_resume
+
+# ============================================================================
+# BULK RESUME INGESTION (ZIP)
+# ============================================================================
+# A ZIP of PDFs is read entry by entry: each matched PDF is copied straight
+# from the archive into the upload blob store (nothing else is extracted),
+# then parsed and scored in a process pool. Results are written back in
+# batches. A file belongs to a student when its name (or one of its folders)
+# is the student's email or user ID, e.g. 17.pdf, jane@uni.edu.pdf or
+# jane@uni.edu/CV.pdf. The acceptance rule is the one of the upload form.
+
+MIN_RESUME_SCORE = 50          # same threshold as student_dashboard
+SAVE_BATCH_SIZE = 100          # student_profile rows updated per transaction
+MAX_ENTRY_BYTES = 10 * 1024 * 1024
+MAX_LISTED = 200               # unmatched/rejected entries listed in the summary
+
+_EMAIL = re.compile(r'[^@\s/\\]+@[^@\s/\\]+\.[A-Za-z]{2,}')
+
+
+def match_entry(name, ids_by_email, student_ids):
+    """user_id a ZIP entry belongs to (by email or numeric ID in its path), or None"""
+    parts = re.split(r'[/\\]', name)
+    stem = os.path.splitext(parts[-1])[0]
+    for part in reversed([stem] + parts[:-1]):
+        part = part.strip().lower()
+        if part in ids_by_email:
+            return ids_by_email[part]
+        if part.isdigit() and int(part) in student_ids:
+            return int(part)
+        email = _EMAIL.search(part)
+        if email and email.group() in ids_by_email:
+            return ids_by_email[email.group()]
+    return None
+
+
+def analyze_resume_file(full_path, domain):
+    """
+    Process-pool worker: the upload form's analysis for one stored PDF
+
+    Returns: (resume_text, score, extracted_skills or None)
+    """
+    resume_text = extract_text_from_pdf(full_path)
+    if not resume_text:
+        return resume_text, 0, None
+    score, _ = analyze_resume_quality(resume_text, domain)
+    skills = extract_skills_from_text(resume_text)
+    return resume_text, score, ', '.join(skills) if skills else None
+
+
+def _save_batch(conn, accepted):
+    """Store accepted resumes: [(student_id, resume_path, resume_text, extracted_skills), ...]"""
+    conn.executemany("""
+        UPDATE student_profile SET resume_path = ?, extracted_skills = ?, extracted_skills_mask = ?
+        WHERE user_id = ?
+    """, [(path, skills, encode_skills(conn, skills), student_id) for student_id, path, _, skills in accepted])
+    for student_id, _, resume_text, _ in accepted:
+        index_resume(conn, student_id, resume_text)
+        store_signature(conn, student_id, resume_text)
+    cache.invalidate(conn, 'students', *(f"student:{student_id}" for student_id, _, _, _ in accepted))
+    conn.commit()
+
+
+def ingest_resume_zip(reporter, zip_path, upload_folder, workers=1, get_connection=None):
+    """
+    Background job: attach the resumes in a ZIP to existing students
+
+    Args:
+        reporter: jobs.RunReporter (phases: reading, analysis, saving)
+        zip_path: the uploaded archive; deleted when the job ends
+        get_connection: connection factory of the caller (bound with functools.partial)
+
+    Returns: summary dict (entries, matched, accepted, rejected, unmatched, ...)
+    """
+    summary = {'entries': 0, 'matched': 0, 'accepted': 0, 'rejected': 0, 'failed': 0,
+               'unmatched': [], 'rejected_files': []}
+    try:
+        reporter.phase('reading')
+        with get_connection() as conn:
+            rows = conn.execute("""
+                SELECT u.user_id, LOWER(u.email), sp.interest_domain
+                FROM users u JOIN student_profile sp ON sp.user_id = u.user_id
+                WHERE u.role = 'student'
+            """).fetchall()
+        ids_by_email = {email: user_id for user_id, email, _ in rows}
+        domains = {user_id: domain or "General" for user_id, _, domain in rows}
+
+        with zipfile.ZipFile(zip_path) as archive, \
+                ProcessPoolExecutor(max_workers=max(1, workers)) as pool, \
+                get_connection() as conn:
+            entries = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith('.pdf')
+                       and not os.path.basename(info.filename).startswith('.')]
+            summary['entries'] = len(entries)
+            pending = {}
+            accepted = []
+            created_blobs = set()   # blobs first stored by this import, discarded at the end if unused
+            done = 0
+
+            def reject(entry_name, student_id, reason):
+                summary['rejected'] += 1
+                if len(summary['rejected_files']) < MAX_LISTED:
+                    summary['rejected_files'].append({'file': entry_name, 'student_id': student_id,
+                                                      'reason': reason})
+
+            def collect(futures):
+                nonlocal done
+                for future in futures:
+                    student_id, resume_path, entry_name = pending.pop(future)
+                    done += 1
+                    reporter.progress('analysis', done, len(entries))
+                    try:
+                        resume_text, score, skills = future.result()
+                    except Exception as e:
+                        print(f"[RESUME ZIP ERROR] {entry_name}: {e}")
+                        summary['failed'] += 1
+                        resume_text, score, skills = None, 0, None
+                    if resume_text and score >= MIN_RESUME_SCORE:
+                        accepted.append((student_id, resume_path, resume_text, skills))
+                        summary['accepted'] += 1
+                    else:
+                        reject(entry_name, student_id, f"resume score {score} below {MIN_RESUME_SCORE}"
+                               if resume_text else "no text could be extracted")
+                    if len(accepted) >= SAVE_BATCH_SIZE:
+                        _save_batch(conn, accepted)
+                        accepted.clear()
+
+            for info in entries:
+                student_id = match_entry(info.filename, ids_by_email, domains)
+                if student_id is None:
+                    done += 1
+                    if len(summary['unmatched']) < MAX_LISTED:
+                        summary['unmatched'].append(info.filename)
+                    continue
+                summary['matched'] += 1
+                if info.file_size > MAX_ENTRY_BYTES:
+                    done += 1
+                    reject(info.filename, student_id, f"larger than {MAX_ENTRY_BYTES // (1024 * 1024)} MB")
+                    continue
+                filename = secure_filename(os.path.basename(info.filename)) or 'resume.pdf'
+                with archive.open(info) as source:
+                    resume_path, created = store_blob(upload_folder, source, filename)
+                if created:
+                    created_blobs.add(resume_path)
+                future = pool.submit(analyze_resume_file, os.path.join(upload_folder, resume_path),
+                                     domains[student_id])
+                pending[future] = (student_id, resume_path, info.filename)
+                # Bounded in flight: parsed texts come back as they finish instead of piling up
+                if len(pending) >= max(1, workers) * 4:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(list(pending))
+
+            reporter.phase('saving')
+            if accepted:
+                _save_batch(conn, accepted)
+            # Identical PDFs share a blob, so rejected ones are only dropped once every entry is settled
+            for resume_path in created_blobs:
+                discard_blob(conn, upload_folder, resume_path)
+            conn.commit()
+    finally:
+        os.remove(zip_path)
+
+    summary['unmatched_count'] = summary['entries'] - summary['matched']
+    print(f"[RESUME ZIP] {summary['accepted']} accepted, {summary['rejected']} rejected, "
+          f"{summary['unmatched_count']} unmatched of {summary['entries']} PDFs")
+    return summary
@@ -0,0 +1,84 @@
+import sqlite3
+import time
+
+from ai_engine import SCORING_VERSION, position_score_key, student_score_key
+
+# ============================================================================
+# PERSISTENT PAIR-SCORE CACHE
+# ============================================================================
+# Scores of student-position pairs survive between allocation runs in the
+# pair_scores table. Both halves of the key are content digests (see
+# ai_engine.student_score_key / position_score_key): a new resume, a changed
+# CGPA or an edited position produces a new key, so stale entries are never
+# read - they are simply left behind until prune() removes them.
+#
+# The cache is handed to run_smart_allocation and may be pickled into shard
+# worker processes; every process opens its own connection on first use.
+
+WRITE_TIMEOUT_SECONDS = 30   # shard workers write concurrently; wait for SQLite's lock instead of failing
+
+
+class PairScoreCache:
+    """SQLite-backed {(student key, position key): score} for one scoring version"""
+
+    def __init__(self, db_path, version=SCORING_VERSION):
+        self.db_path = db_path
+        self.version = version
+        self._conn = None
+
+    def __getstate__(self):
+        return {'db_path': self.db_path, 'version': self.version, '_conn': None}
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=WRITE_TIMEOUT_SECONDS)
+        return self._conn
+
+    def lookup(self, position_key):
+        """Cached scores for one position: {student_key: score}"""
+        return dict(self._connection().execute(
+            "SELECT student_key, score FROM pair_scores WHERE position_key = ? AND scoring_version = ?",
+            (position_key, self.version)
+        ))
+
+    def store(self, position_key, entries):
+        """Persist [(student_key, score), ...] computed for one position"""
+        if not entries:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.executemany("""
+            INSERT OR REPLACE INTO pair_scores (position_key, student_key, scoring_version, score, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(position_key, student_key, self.version, score, now) for student_key, score in entries])
+        conn.commit()
+
+    def prune(self, students, positions, resume_texts):
+        """
+        Drop entries of other scoring versions and of students/positions whose
+        current key differs (edited, deleted). Call after a full allocation run.
+
+        Returns: number of rows deleted
+        """
+        conn = self._connection()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_student_keys (key INTEGER PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_position_keys (key INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM live_student_keys")
+        conn.execute("DELETE FROM live_position_keys")
+        conn.executemany("INSERT OR IGNORE INTO live_student_keys VALUES (?)",
+                         [(student_score_key(s, resume_texts.get(s[0])),) for s in students])
+        conn.executemany("INSERT OR IGNORE INTO live_position_keys VALUES (?)",
+                         [(position_score_key(p),) for p in positions])
+        deleted = conn.execute("""
+            DELETE FROM pair_scores
+            WHERE scoring_version != ?
+               OR position_key NOT IN (SELECT key FROM live_position_keys)
+               OR student_key NOT IN (SELECT key FROM live_student_keys)
+        """, (self.version,)).rowcount
+        conn.commit()
+        return deleted
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
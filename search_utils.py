@@ -0,0 +1,101 @@
+import html
+import re
+
+# ============================================================================
+# RESUME FULL-TEXT SEARCH (SQLite FTS5)
+# ============================================================================
+# resume_fts holds the extracted text of every accepted resume, keyed by
+# rowid = student user_id. It is written when a resume is uploaded (and by
+# `python -m internship reindex` for resumes uploaded before the index existed),
+# so searching never opens a PDF.
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+SNIPPET_TOKENS = 16
+
+# Control characters SQLite puts around matches; swapped for <mark> after HTML-escaping the snippet
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+_TERM = re.compile(r'\w+\*?')
+
+
+def index_resume(conn, student_id, resume_text):
+    """Replace the indexed resume text of a student (caller commits)"""
+    conn.execute("DELETE FROM resume_fts WHERE rowid = ?", (student_id,))
+    if resume_text:
+        conn.execute("INSERT INTO resume_fts (rowid, resume_text) VALUES (?, ?)", (student_id, resume_text))
+
+
+def remove_resumes(conn, student_ids):
+    conn.executemany("DELETE FROM resume_fts WHERE rowid = ?", [(sid,) for sid in student_ids])
+
+
+def fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must appear, a trailing *
+    keeps prefix matching. Operators and quotes typed by the user are ignored,
+    so no input can raise an FTS5 syntax error.
+
+    Returns: MATCH expression, or None if the text has no searchable words
+    """
+    terms = []
+    for term in _TERM.findall(text or ''):
+        prefix = term.endswith('*')
+        word = term.rstrip('*')
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms) or None
+
+
+def search_resumes(conn, query, domain=None, min_cgpa=None, max_cgpa=None, page=1, per_page=DEFAULT_PER_PAGE):
+    """
+    Ranked (bm25) resume search with domain/CGPA filters and pagination
+
+    Returns: {'total', 'page', 'per_page', 'results': [{student_id, name, email,
+              domain, cgpa, experience_years, score, snippet}, ...]}
+              where snippet is HTML-escaped text with matches wrapped in <mark>
+    """
+    match = fts_query(query)
+    page = max(int(page), 1)
+    per_page = min(max(int(per_page), 1), MAX_PER_PAGE)
+    if match is None:
+        return {'total': 0, 'page': page, 'per_page': per_page, 'results': []}
+
+    conditions = ["resume_fts MATCH ?"]
+    params = [match]
+    if domain:
+        conditions.append("LOWER(sp.interest_domain) = LOWER(?)")
+        params.append(domain.strip())
+    if min_cgpa is not None:
+        conditions.append("sp.cgpa >= ?")
+        params.append(float(min_cgpa))
+    if max_cgpa is not None:
+        conditions.append("sp.cgpa <= ?")
+        params.append(float(max_cgpa))
+    where = " AND ".join(conditions)
+    joins = """
+        FROM resume_fts
+        JOIN student_profile sp ON sp.user_id = resume_fts.rowid
+        JOIN users u ON u.user_id = resume_fts.rowid
+    """
+
+    total = conn.execute(f"SELECT COUNT(*) {joins} WHERE {where}", params).fetchone()[0]
+    rows = conn.execute(f"""
+        SELECT u.user_id, u.name, u.email, sp.interest_domain, sp.cgpa, sp.experience_years,
+               bm25(resume_fts) AS rank_score,
+               snippet(resume_fts, 0, ?, ?, '…', ?)
+        {joins}
+        WHERE {where}
+        ORDER BY rank_score, u.user_id
+        LIMIT ? OFFSET ?
+    """, [_MARK_OPEN, _MARK_CLOSE, SNIPPET_TOKENS, *params, per_page, (page - 1) * per_page]).fetchall()
+
+    results = [{
+        'student_id': row[0],
+        'name': row[1],
+        'email': row[2],
+        'domain': row[3],
+        'cgpa': row[4],
+        'experience_years': row[5],
+        'score': round(-row[6], 4),   # bm25() is lower-is-better; flip so higher means more relevant
+        'snippet': html.escape(row[7] or '').replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'),
+    } for row in rows]
+    return {'total': total, 'page': page, 'per_page': per_page, 'results': results}
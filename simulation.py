@@ -0,0 +1,194 @@
+import contextlib
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ai_engine
+from ai_engine import ALLOCATION_ENGINES, DEFAULT_WEIGHTS
+
+# ============================================================================
+# WHAT-IF ALLOCATION SIMULATOR
+# ============================================================================
+# Runs the allocation engines with other parameters over one snapshot of
+# students, positions and ResumeFeatures and compares the outcomes. Nothing is
+# written: resumes are parsed and reduced to features once by the caller, every
+# variant is allocated from that snapshot, and a report comes back.
+#
+# A variant is a dict; missing keys keep the production settings
+# (round-robin engine, ai_engine.DEFAULT_WEIGHTS):
+#
+#     {"name": "strict ATS", "engine": "stable", "min_ats": 60,
+#      "weights": {"cgpa": 30, "experience": 5}}
+#
+# Variants always run in a process pool, one process per variant up to the CPU
+# count by default. Each worker receives the snapshot once (pool initializer)
+# rather than once per variant, and silences the engine's output in its own
+# process only: the caller (a web server thread) keeps its stdout. Workers are
+# spawned, not forked, since the caller is usually one thread among many.
+
+MAX_VARIANTS = 8
+WEIGHT_FIELDS = ('ats', 'cgpa', 'experience', 'experience_per_year')
+VARIANT_KEYS = {'name', 'engine', 'min_ats', 'weights'}
+
+
+def _number(value, label, maximum=None):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{label} must be a number")
+    if not math.isfinite(number) or number < 0 or (maximum is not None and number > maximum):
+        raise ValueError(f"{label} must be between 0 and {maximum}" if maximum is not None
+                         else f"{label} must be a non-negative number")
+    return number
+
+
+def parse_variants(raw):
+    """
+    Validate variant dicts (ValueError with a readable message on a bad one)
+
+    Returns: [(name, engine, ScoringWeights), ...]
+    """
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("variants must be a non-empty list")
+    if len(raw) > MAX_VARIANTS:
+        raise ValueError(f"at most {MAX_VARIANTS} variants per simulation")
+    parsed = []
+    for index, variant in enumerate(raw, 1):
+        if not isinstance(variant, dict):
+            raise ValueError(f"variant {index} must be an object")
+        unknown = set(variant) - VARIANT_KEYS
+        if unknown:
+            raise ValueError(f"variant {index}: unknown keys {', '.join(sorted(unknown))}")
+        name = str(variant.get('name') or f"variant {index}")
+        if name in {existing for existing, _, _ in parsed}:
+            raise ValueError(f"variant {index}: duplicate name '{name}'")
+        engine = variant.get('engine', 'round-robin')
+        if engine not in ALLOCATION_ENGINES:
+            raise ValueError(f"variant {index}: engine must be one of {', '.join(ALLOCATION_ENGINES)}")
+        weights = variant.get('weights') or {}
+        if not isinstance(weights, dict) or set(weights) - set(WEIGHT_FIELDS):
+            raise ValueError(f"variant {index}: weights may only set {', '.join(WEIGHT_FIELDS)}")
+        values = {field: _number(value, f"variant {index}: weights.{field}") for field, value in weights.items()}
+        if variant.get('min_ats') is not None:
+            values['min_ats'] = _number(variant['min_ats'], f"variant {index}: min_ats", 100)
+        parsed.append((name, engine, DEFAULT_WEIGHTS._replace(**values)))
+    return parsed
+
+
+def outcome_metrics(allocations, positions, baseline=None):
+    """
+    Comparable numbers of one allocation outcome
+
+    Args:
+        allocations: [(student_id, company_id, position_id, score, rank), ...]
+        baseline: optional {student_id: position_id} to count students_changed against
+
+    Returns: dict (allocated, seats, fill_rate, mean_score, company_fill_spread,
+             company_score_spread, companies, students_changed)
+    """
+    seats = sum(position[5] for position in positions)
+    companies = {}
+    for position in positions:
+        company = companies.setdefault(position[1], {'seats': 0, 'allocated': 0, 'score_sum': 0.0})
+        company['seats'] += position[5]
+    for _, company_id, _, score, _ in allocations:
+        company = companies.setdefault(company_id, {'seats': 0, 'allocated': 0, 'score_sum': 0.0})
+        company['allocated'] += 1
+        company['score_sum'] += score
+
+    for company in companies.values():
+        company['fill_rate'] = round(company['allocated'] / company['seats'], 4) if company['seats'] else 0.0
+        company['mean_score'] = round(company.pop('score_sum') / company['allocated'], 2) if company['allocated'] else None
+    fill_rates = [c['fill_rate'] for c in companies.values() if c['seats']]
+    mean_scores = [c['mean_score'] for c in companies.values() if c['mean_score'] is not None]
+
+    metrics = {
+        'allocated': len(allocations),
+        'seats': seats,
+        'fill_rate': round(len(allocations) / seats, 4) if seats else 0.0,
+        'mean_score': round(sum(a[3] for a in allocations) / len(allocations), 2) if allocations else 0.0,
+        'company_fill_spread': round(max(fill_rates) - min(fill_rates), 4) if fill_rates else 0.0,
+        'company_score_spread': round(max(mean_scores) - min(mean_scores), 2) if mean_scores else 0.0,
+        'companies': {str(company_id): company for company_id, company in sorted(companies.items())},
+    }
+    if baseline is not None:
+        placed = {a[0]: a[2] for a in allocations}
+        metrics['students_changed'] = sum(1 for student_id in placed.keys() | baseline.keys()
+                                          if placed.get(student_id) != baseline.get(student_id))
+    return metrics
+
+
+# Snapshot of the running simulation in each worker:
+# (students, positions, resume_features, preferences, stored_skill_masks)
+_snapshot = None
+
+
+def _load_snapshot(snapshot, skill_ids):
+    global _snapshot
+    _snapshot = snapshot
+    ai_engine.set_skill_ids(skill_ids)   # bit positions of the stored masks
+
+
+def _run_variant(engine, weights):
+    """Pool worker: allocate the snapshot with one variant; returns (allocations, seconds)"""
+    # Only ever called in a pool process, where replacing sys.stdout affects nobody else
+    students, positions, resume_features, preferences, stored_skill_masks = _snapshot
+    options = {'preferences': preferences} if engine == 'stable' else {}
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        allocations = ALLOCATION_ENGINES[engine](students, positions, resume_features, stats={},
+                                                 weights=weights, stored_skill_masks=stored_skill_masks,
+                                                 **options)
+    return allocations, round(time.perf_counter() - started, 4)
+
+
+def simulate(students, positions, resume_features, variants, preferences=None, baseline=None,
+             workers=None, progress=None, stored_skill_masks=None):
+    """
+    Allocate the same inputs once per variant and compare the outcomes
+
+    Args:
+        resume_features: {student_id: ResumeFeatures} (see ai_engine.extract_resume_features)
+        variants: the output of parse_variants
+        preferences: student rankings for 'stable' variants (database.load_preferences)
+        baseline: optional current allocations (student_id, company_id, position_id, score, rank);
+                  students_changed counts against it, otherwise against the first variant
+        workers: run this many variants at once, in processes (default: one per
+                 variant, up to the CPU count)
+        progress: optional callback progress('simulating', done, total)
+        stored_skill_masks: optional decoded *_mask columns, as for ai_engine.run_smart_allocation
+
+    Returns: {'baseline': metrics or None, 'variants': [{name, engine, weights, seconds, **metrics}]}
+    """
+    if progress is None:
+        progress = lambda phase, done, total: None
+    snapshot = (students, positions, resume_features, preferences or {}, stored_skill_masks)
+    results = [None] * len(variants)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    progress('simulating', 0, len(variants))
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(variants))),
+                             mp_context=multiprocessing.get_context('spawn'), initializer=_load_snapshot,
+                             initargs=(snapshot, dict(ai_engine.SKILL_IDS))) as pool:
+        futures = {pool.submit(_run_variant, engine, weights): index
+                   for index, (_, engine, weights) in enumerate(variants)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            progress('simulating', done, len(variants))
+
+    report = {'baseline': None, 'variants': []}
+    if baseline is not None:
+        report['baseline'] = outcome_metrics(baseline, positions)
+        reference = {a[0]: a[2] for a in baseline}
+    else:
+        reference = {a[0]: a[2] for a in results[0][0]}
+    for (name, engine, weights), (allocations, seconds) in zip(variants, results):
+        report['variants'].append({'name': name, 'engine': engine, 'weights': weights._asdict(),
+                                   'seconds': seconds, **outcome_metrics(allocations, positions, reference)})
+
+    print("[SIMULATION] " + "; ".join(
+        f"{v['name']}: fill {v['fill_rate']:.1%}, mean {v['mean_score']:.1f}, {v['students_changed']} changed"
+        for v in report['variants']))
+    return report
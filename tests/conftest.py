@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh platform.db with the full schema; database.get_connection() points at it"""
+    path = str(tmp_path / 'platform.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.create_tables()
+    return path
+
+
+@pytest.fixture
+def upload_folder(tmp_path):
+    """An empty upload folder, kept apart from the database file"""
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    return folder
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import random
+
+import pytest
+
+import ai_engine
+from score_cache import PairScoreCache
+
+DOMAINS = ['AI', 'Data Science', 'Web Development', 'Cyber Security', 'Cloud Computing', 'DevOps']
+WORDS = ("education university bachelor degree cgpa experience internship developed implemented designed "
+         "built improved optimized achieved led managed skills programming software project projects "
+         "certifications technology system application database algorithm framework team delivered").split()
+
+
+def make_inputs(n_students, n_positions, seed):
+    """Deterministic synthetic (students, positions, resume_texts) in the engine's row shapes"""
+    rng = random.Random(seed)
+    students, texts = [], {}
+    for sid in range(1, n_students + 1):
+        domain = rng.choice(DOMAINS)
+        skills = ai_engine.DOMAIN_REQUIRED_SKILLS[domain]
+        extracted = ', '.join(rng.sample(skills, 3)).title() if rng.random() < 0.8 else None
+        students.append((sid, f"S{sid}", f"s{sid}@example.com", "python", round(rng.uniform(5, 10), 1),
+                         rng.choice([domain, domain.lower(), domain.replace(' ', '-')]),
+                         rng.randint(0, 4), f"r{sid}.pdf", None, extracted))
+        if rng.random() < 0.9:
+            words = []
+            for _ in range(rng.randint(40, 300)):
+                r = rng.random()
+                if r < 0.15:
+                    words.append(rng.choice(skills))
+                elif r < 0.2:
+                    words.append(f"{rng.randint(1, 99)}%")
+                else:
+                    words.append(rng.choice(WORDS) + rng.choice(['', '', ',', '.']))
+            if rng.random() < 0.05:
+                words.append('lorem ipsum')
+            texts[sid] = ' '.join(words)
+    positions = []
+    for pid in range(100, 100 + n_positions):
+        domain = rng.choice(DOMAINS)
+        required = ', '.join(rng.sample(ai_engine.DOMAIN_REQUIRED_SKILLS[domain], rng.randint(1, 5)))
+        positions.append((pid, 1000 + pid % 4, domain, required, rng.choice([0, 6.0, 7.5]),
+                          rng.randint(0, 6), 10000))
+    return students, positions, texts
+
+
+def baseline_round_robin(students, positions, resume_texts):
+    """The original single-pass allocator: score every pair, then one seat per position per round"""
+    valid = [s for s in students if resume_texts.get(s[0]) and not ai_engine.is_resume_fake_or_spam(resume_texts[s[0]])[0]]
+    candidates = {}
+    for position in positions:
+        scored = [(s[0], ai_engine.student_company_position_score(s, position, resume_texts[s[0]])) for s in valid]
+        candidates[position[0]] = sorted([c for c in scored if c[1] > 0], key=lambda c: c[1], reverse=True)
+
+    allocations, taken = [], set()
+    allocated = {position[0]: 0 for position in positions}
+    active = list(positions)
+    while active:
+        allocated_this_round = 0
+        remove = []
+        for position in active:
+            pid = position[0]
+            if allocated[pid] >= position[5]:
+                remove.append(position)
+                continue
+            pick = next(((sid, score) for sid, score in candidates[pid] if sid not in taken), None)
+            if pick is None:
+                remove.append(position)
+                continue
+            allocated[pid] += 1
+            taken.add(pick[0])
+            allocations.append((pick[0], position[1], pid, pick[1], allocated[pid]))
+            allocated_this_round += 1
+        active = [position for position in active if position not in remove]
+        if not allocated_this_round:
+            break
+    return allocations
+
+
+def run(engine, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return engine(*args, **kwargs)
+
+
+def features_of(students, positions, texts):
+    term_index = ai_engine.TermIndex(positions)
+    domains = {s[0]: s[5] for s in students}
+    return {sid: ai_engine.extract_resume_features(text, domains[sid], term_index) for sid, text in texts.items()}
+
+
+@pytest.fixture(params=[1, 2, 3])
+def inputs(request):
+    return make_inputs(150, 25, request.param)
+
+
+def test_round_robin_matches_baseline(inputs):
+    students, positions, texts = inputs
+    expected = baseline_round_robin(students, positions, texts)
+    assert expected
+    assert run(ai_engine.run_smart_allocation, students, positions, texts) == expected
+    assert run(ai_engine.run_smart_allocation, students, positions, features_of(students, positions, texts)) == expected
+    assert run(ai_engine.run_smart_allocation, students, positions, texts, workers=2) == expected
+
+
+def test_round_robin_rescoring_matches_baseline(inputs, monkeypatch):
+    students, positions, texts = inputs
+    # Keep no margin, so positions run out of kept candidates and rescore
+    monkeypatch.setattr(ai_engine, '_candidate_limit', lambda capacity, shard_capacity: capacity)
+    stats = {}
+    assert run(ai_engine.run_smart_allocation, students, positions, texts, stats=stats) == \
+        baseline_round_robin(students, positions, texts)
+    assert stats['counters']['topk_expansions'] > 0
+
+
+def test_round_robin_with_score_cache_matches_baseline(inputs, db_path):
+    students, positions, texts = inputs
+    expected = baseline_round_robin(students, positions, texts)
+    cache = PairScoreCache(db_path)
+    try:
+        first, second = {}, {}
+        assert run(ai_engine.run_smart_allocation, students, positions, texts, stats=first,
+                   score_cache=cache) == expected
+        assert run(ai_engine.run_smart_allocation, students, positions, texts, stats=second,
+                   score_cache=cache) == expected
+    finally:
+        cache.close()
+    assert first['counters']['score_cache_misses'] > 0
+    assert second['counters']['score_cache_misses'] == second['counters']['pairs_scored'] == 0
+
+
+def test_stable_matching_has_no_blocking_pair(inputs):
+    students, positions, texts = inputs
+    allocations = run(ai_engine.run_stable_allocation, students, positions, texts)
+    assert allocations == run(ai_engine.run_stable_allocation, students, positions, texts, workers=2)
+    assert allocations == run(ai_engine.run_stable_allocation, students, positions,
+                              features_of(students, positions, texts))
+
+    valid = [s for s in students if s[0] in texts and not ai_engine.is_resume_fake_or_spam(texts[s[0]])[0]]
+    placed = {sid: (pid, score) for sid, _, pid, score, _ in allocations}
+    assert len(placed) == len(allocations)
+    held = {position[0]: [score for _, _, pid, score, _ in allocations if pid == position[0]]
+            for position in positions}
+    for position in positions:
+        assert len(held[position[0]]) <= position[5]
+        for student in valid:
+            score = ai_engine.student_company_position_score(student, position, texts[student[0]])
+            if score <= 0 or placed.get(student[0], (None,))[0] == position[0]:
+                continue
+            student_prefers = student[0] not in placed or score > placed[student[0]][1]
+            position_prefers = len(held[position[0]]) < position[5] or score > min(held[position[0]], default=100)
+            assert not (student_prefers and position_prefers), (student[0], position[0])
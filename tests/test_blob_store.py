@@ -0,0 +1,78 @@
+import io
+import os
+
+import blob_store
+import database
+import maintenance
+
+
+def add_student(conn, user_id, resume_path=None, photo=None):
+    conn.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (?, ?, ?, 'x', 'student')",
+                 (user_id, f"S{user_id}", f"s{user_id}@example.com"))
+    conn.execute("INSERT INTO student_profile (user_id, cgpa, resume_path, profile_photo) VALUES (?, 8, ?, ?)",
+                 (user_id, resume_path, photo))
+
+
+def refcount(conn, path):
+    row = conn.execute("SELECT refcount FROM blobs WHERE path = ?", (path,)).fetchone()
+    return row and row[0]
+
+
+def test_identical_uploads_share_one_blob(upload_folder):
+    first, created = blob_store.store_blob(str(upload_folder), io.BytesIO(b'%PDF resume'), 'cv.PDF')
+    second, created_again = blob_store.store_blob(str(upload_folder), io.BytesIO(b'%PDF resume'), 'other.pdf')
+    assert (created, created_again) == (True, False)
+    assert first == second and first.endswith('.pdf')
+    assert blob_store.blob_digest(first) == os.path.basename(first)[:-4]
+    with open(upload_folder / first, 'rb') as f:
+        assert f.read() == b'%PDF resume'
+    assert os.listdir(upload_folder / 'blobs' / 'tmp') == []
+
+
+def test_triggers_count_references(db_path, upload_folder):
+    path, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'shared'), 'a.pdf')
+    other, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'other'), 'b.pdf')
+    with database.get_connection() as conn:
+        add_student(conn, 1, path)
+        add_student(conn, 2, path)
+        assert refcount(conn, path) == 2
+        conn.execute("UPDATE student_profile SET resume_path = ? WHERE user_id = 1", (other,))
+        assert (refcount(conn, path), refcount(conn, other)) == (1, 1)
+        conn.execute("DELETE FROM student_profile WHERE user_id = 2")
+        assert refcount(conn, path) == 0
+        assert blob_store.unreferenced(conn, [path, other, 'students/legacy.pdf']) == ['students/legacy.pdf', path]
+        assert refcount(conn, path) is None and refcount(conn, other) == 1
+
+
+def test_discard_blob_keeps_referenced_files(db_path, upload_folder):
+    path, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'kept'), 'a.pdf')
+    rejected, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'rejected'), 'b.pdf')
+    derived = blob_store.cache_path(str(upload_folder / rejected), 'text', '.txt')
+    blob_store.write_atomic(derived, b'text')
+    with database.get_connection() as conn:
+        add_student(conn, 1, path)
+        blob_store.discard_blob(conn, str(upload_folder), path)
+        blob_store.discard_blob(conn, str(upload_folder), rejected)
+    assert os.path.exists(upload_folder / path)
+    assert not os.path.exists(upload_folder / rejected) and not os.path.exists(derived)
+
+
+def test_migrate_legacy_uploads_moves_files_into_the_store(db_path, upload_folder):
+    os.makedirs(upload_folder / 'students' / 'resumes')
+    for name in ('1_cv.pdf', '2_cv.pdf'):
+        with open(upload_folder / 'students' / 'resumes' / name, 'wb') as f:
+            f.write(b'same resume')
+    with database.get_connection() as conn:
+        add_student(conn, 1, 'students/resumes/1_cv.pdf')
+        add_student(conn, 2, 'students/resumes/2_cv.pdf')
+        add_student(conn, 3, 'students/resumes/missing.pdf')
+        conn.commit()
+
+    summary = maintenance.migrate_legacy_uploads(str(upload_folder), database.get_connection)
+    assert (summary['migrated'], summary['deduplicated'], summary['missing']) == (2, 1, 1)
+    with database.get_connection() as conn:
+        paths = {row[0] for row in conn.execute("SELECT resume_path FROM student_profile WHERE user_id IN (1, 2)")}
+        assert len(paths) == 1
+        path = paths.pop()
+        assert blob_store.is_blob(path) and refcount(conn, path) == 2
+    assert os.listdir(upload_folder / 'students' / 'resumes') == []
@@ -0,0 +1,34 @@
+import ai_engine
+import database
+
+
+def test_scoped_save_clears_waitlists_of_every_position_in_scope(db_path):
+    with database.get_connection() as conn:
+        conn.executemany("INSERT INTO waitlists (position_id, student_id, score, rank) VALUES (?, ?, ?, ?)",
+                         [(1, 10, 50.0, 1), (2, 11, 40.0, 1), (3, 12, 30.0, 1)])
+        # Position 2 has nobody left to wait for it in the re-run: no waitlists entry at all
+        database.save_allocation_results(conn, [(13, 100, 1, 70.0, 1)], {11: "No matching position"},
+                                         scope_student_ids=[10, 11, 13], waitlists={1: [(10, 55.0)]},
+                                         scope_position_ids=[1, 2])
+        rows = conn.execute("SELECT position_id, student_id, score FROM waitlists ORDER BY position_id").fetchall()
+    assert [tuple(row) for row in rows] == [(1, 10, 55.0), (3, 12, 30.0)]
+
+
+def test_allocation_inputs_carry_the_stored_skill_masks(db_path):
+    with database.get_connection() as conn:
+        conn.execute("INSERT INTO users (user_id, name, email, password, role) "
+                     "VALUES (1, 'S1', 's1@example.com', 'x', 'student')")
+        conn.execute("INSERT INTO student_profile (user_id, cgpa, interest_domain, extracted_skills, "
+                     "extracted_skills_mask) VALUES (1, 8, 'AI', 'Python, SQL', ?)",
+                     (database.encode_skills(conn, 'Python, SQL'),))
+        conn.execute("INSERT INTO company_positions (position_id, company_id, domain, required_skills, "
+                     "required_skills_mask) VALUES (5, 9, 'AI', 'SQL', ?)", (database.encode_skills(conn, 'SQL'),))
+        conn.execute("INSERT INTO company_positions (position_id, company_id, domain, required_skills) "
+                     "VALUES (6, 9, 'AI', 'Go')")
+        students, positions, (student_masks, position_masks) = database.load_allocation_inputs(conn)
+
+    assert [len(row) for row in students + positions] == [10, 7, 7]
+    assert set(position_masks) == {5}
+    assert ai_engine.calculate_skill_match(student_masks[1], position_masks[5]) == 100.0
+    assert ai_engine.skill_masks(students, positions, (student_masks, position_masks)) == (
+        student_masks, {5: position_masks[5], 6: ai_engine.skill_mask('Go')})
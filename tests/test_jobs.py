@@ -0,0 +1,55 @@
+import threading
+import time
+
+import database
+import jobs
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_slow_job_is_not_expired_while_running(db_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'STALE_AFTER_SECONDS', 0.5)
+    monkeypatch.setattr(jobs, 'HEARTBEAT_INTERVAL', 0.1)
+    release = threading.Event()
+
+    def slow_job(reporter):
+        reporter.phase('scoring')
+        release.wait(5)   # one long phase without any progress write
+        return {'done': True}
+
+    run_id, created = jobs.submit_run(database.get_connection, slow_job)
+    assert created
+    assert _wait_for(lambda: jobs.get_run(database.get_connection, run_id)['status'] == 'running')
+
+    time.sleep(1.2)   # more than twice STALE_AFTER_SECONDS without a progress write
+    second_id, second_created = jobs.submit_run(database.get_connection, slow_job)
+    assert (second_id, second_created) == (run_id, False)
+    assert jobs.get_run(database.get_connection, run_id)['status'] == 'running'
+
+    release.set()
+    assert _wait_for(lambda: jobs.get_run(database.get_connection, run_id)['status'] == 'completed')
+    assert jobs.get_run(database.get_connection, run_id)['summary'] == {'done': True}
+
+
+def test_run_of_dead_worker_is_expired(db_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'STALE_AFTER_SECONDS', 0.5)
+    with database.get_connection() as conn:
+        dead_id = conn.execute("""
+            INSERT INTO allocation_runs (status, phase, percent, options, created_at, updated_at)
+            VALUES ('running', 'scoring', 30, '{}', ?, ?)
+        """, (time.time() - 60, time.time() - 60)).lastrowid
+        conn.commit()
+
+    run_id, created = jobs.submit_run(database.get_connection, lambda reporter: {})
+    assert created and run_id != dead_id
+    dead = jobs.get_run(database.get_connection, dead_id)
+    assert dead['status'] == 'failed'
+    assert dead['error'] == 'Worker stopped responding'
+    assert _wait_for(lambda: jobs.get_run(database.get_connection, run_id)['status'] == 'completed')
@@ -0,0 +1,85 @@
+import io
+import os
+import time
+
+import blob_store
+import database
+import maintenance
+
+
+class Reporter:
+    """Stand-in for jobs.RunReporter that records progress"""
+
+    def __init__(self):
+        self.progress_calls = []
+
+    def phase(self, name):
+        pass
+
+    def progress(self, phase, done, total):
+        self.progress_calls.append((phase, done, total))
+
+
+def add_student(conn, user_id, resume_path=None):
+    conn.execute("INSERT INTO users (user_id, name, email, password, role) VALUES (?, ?, ?, 'x', 'student')",
+                 (user_id, f"S{user_id}", f"s{user_id}@example.com"))
+    conn.execute("INSERT INTO student_profile (user_id, cgpa, resume_path) VALUES (?, 8, ?)", (user_id, resume_path))
+
+
+def age(upload_folder, path, seconds=2 * maintenance.GC_GRACE_SECONDS):
+    then = time.time() - seconds
+    os.utime(upload_folder / path, (then, then))
+
+
+def test_delete_students_in_chunks(db_path, upload_folder):
+    shared, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'shared photo'), 'p.png')
+    age(upload_folder, shared)
+    with database.get_connection() as conn:
+        for user_id in range(1, 8):
+            add_student(conn, user_id)
+        add_student(conn, 8, 'r.pdf')
+        conn.execute("UPDATE student_profile SET profile_photo = ? WHERE user_id IN (1, 8)", (shared,))
+        conn.execute("INSERT INTO company_positions (position_id, company_id, domain, positions) VALUES (1, 9, 'AI', 1)")
+        conn.execute("INSERT INTO allocations (student_id, company_id, position_id, score, rank) VALUES (2, 9, 1, 50, 1)")
+        conn.execute("INSERT INTO waitlists (position_id, student_id, score, rank) VALUES (1, 8, 40, 1)")
+        conn.commit()
+
+    reporter = Reporter()
+    summary = maintenance.delete_students_job(reporter, str(upload_folder),
+                                              get_connection=database.get_connection, chunk_size=3)
+    assert (summary['students'], summary['deleted'], summary['promoted']) == (7, 7, 1)
+    assert [done for _, done, _ in reporter.progress_calls] == [3, 6, 7]
+    assert summary['files_removed'] == 0   # student 8 still shows the shared photo
+    with database.get_connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT user_id FROM users")] == [8]
+        assert conn.execute("SELECT student_id, position_id FROM allocations").fetchall() == [(8, 1)]
+        assert conn.execute("SELECT refcount FROM blobs WHERE path = ?", (shared,)).fetchone() == (1,)
+    assert os.path.exists(upload_folder / shared)
+
+
+def test_upload_gc_removes_only_old_orphans(db_path, upload_folder):
+    kept, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'referenced'), 'a.pdf')
+    orphan, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'replaced'), 'b.pdf')
+    recent, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'just uploaded'), 'c.pdf')
+    derived = blob_store.cache_path(str(upload_folder / orphan), 'text', '.txt')
+    blob_store.write_atomic(derived, b'text')
+    for path in (kept, orphan):
+        age(upload_folder, path)
+    with database.get_connection() as conn:
+        add_student(conn, 1, kept)
+        add_student(conn, 2, orphan)
+        conn.execute("UPDATE student_profile SET resume_path = NULL WHERE user_id = 2")
+        conn.commit()
+
+    dry = maintenance.collect_orphaned_uploads(Reporter(), str(upload_folder), dry_run=True,
+                                               get_connection=database.get_connection, batch_size=1)
+    assert (dry['orphaned'], dry['removed'], dry['orphans']) == (1, 0, [orphan])
+    assert os.path.exists(upload_folder / orphan)
+
+    summary = maintenance.collect_orphaned_uploads(Reporter(), str(upload_folder),
+                                                   get_connection=database.get_connection, batch_size=1)
+    assert (summary['scanned'], summary['skipped_recent'], summary['removed']) == (3, 1, 1)
+    assert os.path.exists(upload_folder / kept) and os.path.exists(upload_folder / recent)
+    assert not os.path.exists(upload_folder / orphan) and not os.path.exists(derived)
+    with database.get_connection() as conn:
+        assert conn.execute("SELECT path FROM blobs ORDER BY path").fetchall() == [(kept,)]
@@ -0,0 +1,12 @@
+import io
+
+import blob_store
+from pdf_utils import extract_text_from_pdf
+
+
+def test_cached_text_is_returned_exactly(upload_folder):
+    path, _ = blob_store.store_blob(str(upload_folder), io.BytesIO(b'%PDF-1.4 not parsed'), 'cv.pdf')
+    full_path = str(upload_folder / path)
+    text = "Line one\r\nLine two\rLine three\nPython, SQL"
+    blob_store.write_atomic(blob_store.cache_path(full_path, 'text', '.txt'), text.encode('utf-8'))
+    assert extract_text_from_pdf(full_path) == text
@@ -0,0 +1,48 @@
+import sys
+import threading
+
+import ai_engine
+import simulation
+from test_allocation import make_inputs, run
+
+
+def test_simulate_runs_variants_without_touching_the_callers_stdout(capsys):
+    students, positions, texts = make_inputs(80, 12, 4)
+    variants = simulation.parse_variants([{'name': 'today'}, {'name': 'stable', 'engine': 'stable'},
+                                          {'name': 'strict', 'min_ats': 60}])
+    stdout = sys.stdout
+    stop = threading.Event()
+
+    def other_request():
+        while not stop.is_set():
+            print("[OTHER] still logging")
+            stop.wait(0.01)
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    try:
+        report = simulation.simulate(students, positions, texts, variants, workers=1)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert sys.stdout is stdout
+    output = capsys.readouterr().out
+    assert "[OTHER] still logging" in output and "PHASE 2" not in output
+    expected = run(ai_engine.run_smart_allocation, students, positions, texts)
+    assert report['variants'][0]['allocated'] == len(expected)
+    assert [v['name'] for v in report['variants']] == ['today', 'stable', 'strict']
+
+
+def test_explanation_follows_the_scoring_weights():
+    students, positions, texts = make_inputs(40, 6, 5)
+    weights = ai_engine.DEFAULT_WEIGHTS._replace(ats=0.4, cgpa=30, experience=5)
+    explained = [ai_engine.explain_student_position_score(s, p, texts.get(s[0]), weights)
+                 for s in students for p in positions]
+    eligible = [e for e in explained if e['eligible']]
+    assert eligible
+    for explanation in eligible:
+        components = explanation['components']
+        assert (components['ats']['weight'], components['cgpa']['max'], components['experience']['max']) == (0.4, 30, 5)
+        total = sum(c['points'] for c in components.values())
+        assert abs(min(total, 100.0) - explanation['score']) < 0.05
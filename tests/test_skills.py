@@ -0,0 +1,16 @@
+import ai_engine
+
+
+def test_ambiguous_aliases_are_not_found_in_prose():
+    text = "Took a REST day, then balanced each node of the tree; TS forecasting with a torch lit."
+    assert ai_engine.extract_skills_from_text(text) == []
+
+
+def test_ambiguous_aliases_count_in_skill_fields():
+    assert ai_engine.skill_names("Py, TS, Node, REST, Kube, RN, Torch") == {
+        "python", "typescript", "node.js", "rest api", "kubernetes", "react native", "pytorch"}
+
+
+def test_unambiguous_aliases_are_found_in_prose():
+    assert ai_engine.extract_skills_from_text("Built RESTful services in NodeJS and sklearn") == [
+        "Node.Js", "Rest Api", "Scikit-Learn"]